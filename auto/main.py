@@ -3,10 +3,11 @@ import time
 from datetime import datetime
 
 import pygetwindow as gw
-import schedule
 import win32con
 import win32gui
 
+from scheduler import TradingCalendar, TriggerScheduler, run_playback_task
+
 # 导入我们之前写好的回放功能
 # 假设 player.py 和 main.py 在同一目录下
 try:
@@ -18,6 +19,11 @@ except ImportError:
     exit()
 
 WINDOW_TITLE_KEYWORD = "联储证券"
+# 回放倍速
+PLAYBACK_SPEED = 2.2
+# 上午和下午的触发时间
+MORNING_TIMES = ["09:30", "10:00", "10:10", "10:40", "11:00", "11:30"]
+AFTERNOON_TIMES = ["13:00", "14:00", "14:10", "15:00"]
 
 
 def find_and_focus_window(title_keyword):
@@ -58,58 +64,36 @@ def run_scheduled_task():
     """
     这是一个组合任务：先置顶窗口，然后执行回放脚本。
     """
-    print("\n" + "=" * 40)
-    print("⏰ 到达预定时间，准备执行任务...")
-
-    # 1. 查找并置顶窗口
-    if find_and_focus_window(WINDOW_TITLE_KEYWORD):
-        # 2. 如果窗口置顶成功，则执行鼠标回放
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] 🚀 开始执行鼠标回放脚本...")
-        try:
-            playback_script(2.2)
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] ✅ 鼠标回放脚本执行完成。")
-        except Exception as e:
-            print(
-                f"[{datetime.now().strftime('%H:%M:%S')}] ❌ 执行回放脚本时发生错误: {e}"
-            )
-    else:
-        print(
-            f"[{datetime.now().strftime('%H:%M:%S')}] 🛑 因未能找到或激活目标窗口，任务中断。"
-        )
-    print("=" * 40 + "\n")
+    run_playback_task(
+        focus_window=lambda: find_and_focus_window(WINDOW_TITLE_KEYWORD),
+        playback=lambda: playback_script(PLAYBACK_SPEED),
+    )
 
 
 def setup_schedule():
     """
-    设置所有定时任务
+    创建调度器：只在交易日的预定时间点触发
     """
     print("--- 任务调度器已启动 ---")
     print(f"将在以下时间点，自动置顶 '{WINDOW_TITLE_KEYWORD}' 窗口并执行脚本：")
-
-    # --- 设置上午的定时任务 ---
-    morning_times = ["09:30", "10:00", "10:10", "10:40", "11:00", "11:30"]
-    for time_str in morning_times:
-        schedule.every().day.at(time_str).do(run_scheduled_task)
-    print(f"  - 上午: {' 、'.join(morning_times)}")
-
-    # --- 设置下午的定时任务 ---
-    afternoon_times = ["13:00", "14:00", "14:10", "15:00"]
-    for time_str in afternoon_times:
-        schedule.every().day.at(time_str).do(run_scheduled_task)
-    print(f"  - 下午: {' 、'.join(afternoon_times)}")
+    print(f"  - 上午: {' 、'.join(MORNING_TIMES)}")
+    print(f"  - 下午: {' 、'.join(AFTERNOON_TIMES)}")
+    print("  - 周末和交易日历中的节假日不执行")
+
+    scheduler = TriggerScheduler(
+        MORNING_TIMES + AFTERNOON_TIMES,
+        run_scheduled_task,
+        calendar=TradingCalendar.from_file(),
+    )
 
     print("\n脚本正在后台运行，请勿关闭此窗口...")
     print("按 Ctrl+C 停止运行。")
+    return scheduler
 
 
 if __name__ == "__main__":
-    setup_schedule()
+    scheduler = setup_schedule()
 
-    # 启动时立即执行一次任务
+    # 启动时立即执行一次任务, 之后睡眠到下一个触发时间
     print("\n🚀 启动时立即执行一次任务...")
-    run_scheduled_task()
-
-    # 持续运行，等待任务触发
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+    scheduler.run_forever(run_immediately=True)
@@ -1,6 +1,6 @@
 # player.py (修复版)
 import ctypes
-import json
+import os
 import sys
 import time
 
@@ -9,13 +9,22 @@ from pynput.keyboard import Listener as KeyboardListener
 from pynput.mouse import Button
 from pynput.mouse import Controller as MouseController
 
+import script_format
+from replay import DEFAULT_EPSILON, build_timeline, replay_timeline, simplify_timeline
+
 # 文件名
-SCRIPT_FILENAME = "mouse_script.json"
+SCRIPT_FILENAME = "mouse_script.bin"
+# 旧版 recorder 保存的 JSON 脚本, 二进制脚本不存在时使用
+LEGACY_SCRIPT_FILENAME = "mouse_script.json"
 mouse = MouseController()
 # 添加一个锁，防止在回放时重复触发
 is_playing = False
 # 默认回放倍速
 playback_speed = 1.0
+# move 路径简化容差(像素), 小于 0 表示不简化
+simplify_epsilon = DEFAULT_EPSILON
+# 已解析并预处理的脚本缓存, 文件的 mtime 和大小不变时定时触发直接复用
+_script_cache = {"key": None, "event_count": 0, "timeline": None}
 
 
 def block_input(block=True):
@@ -55,6 +64,35 @@ def get_button_from_string(button_str):
     return None
 
 
+def resolve_script_path():
+    """优先使用二进制脚本, 不存在时回退到旧的 JSON 脚本"""
+    if not os.path.exists(SCRIPT_FILENAME) and os.path.exists(LEGACY_SCRIPT_FILENAME):
+        return LEGACY_SCRIPT_FILENAME
+    return SCRIPT_FILENAME
+
+
+def load_timeline(path, epsilon=DEFAULT_EPSILON):
+    """
+    加载脚本并预处理为回放时间线, 文件未变化时返回缓存
+
+    返回:
+        tuple: (原始事件数, 时间线, 是否命中缓存)
+
+    异常:
+        FileNotFoundError: 文件不存在
+        ValueError / KeyError: 文件格式不正确
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, epsilon)
+    if _script_cache["key"] == key:
+        return _script_cache["event_count"], _script_cache["timeline"], True
+
+    events = script_format.load_script(path)
+    timeline = simplify_timeline(build_timeline(events), epsilon)
+    _script_cache.update(key=key, event_count=len(events), timeline=timeline)
+    return len(events), timeline, False
+
+
 def playback_script(speed=1.0):
     """
     加载并回放脚本
@@ -77,23 +115,29 @@ def playback_script(speed=1.0):
 
     is_playing = True
 
+    script_path = resolve_script_path()
     try:
-        with open(SCRIPT_FILENAME, "r") as f:
-            events = json.load(f)
+        event_count, timeline, cached = load_timeline(script_path, simplify_epsilon)
     except FileNotFoundError:
         print(
-            f"❌ 错误：找不到脚本文件 '{SCRIPT_FILENAME}'。请先运行 recorder.py 进行录制。"
+            f"❌ 错误：找不到脚本文件 '{script_path}'。请先运行 recorder.py 进行录制。"
         )
         is_playing = False
         return
-    except json.JSONDecodeError:
-        print(f"❌ 错误：脚本文件 '{SCRIPT_FILENAME}' 格式不正确。")
+    except (ValueError, KeyError) as e:
+        print(f"❌ 错误：脚本文件 '{script_path}' 格式不正确: {e}")
         is_playing = False
         return
 
-    print(f"📖 脚本 '{SCRIPT_FILENAME}' 加载成功，包含 {len(events)} 个事件。")
+    if cached:
+        print(f"📖 脚本 '{script_path}' 未变化，使用缓存({event_count} 个事件)。")
+    else:
+        print(f"📖 脚本 '{script_path}' 加载成功，包含 {event_count} 个事件。")
+        if len(timeline) < event_count:
+            print(f"✂️  路径简化: {event_count} -> {len(timeline)} 个事件。")
     if speed != 1.0:
         print(f"⚡ 回放倍速: {speed}x")
+
     # print("3秒后开始回放，请将鼠标移动到安全位置...")
     time.sleep(1)
     print("🚀 回放开始！")
@@ -103,28 +147,14 @@ def playback_script(speed=1.0):
     block_input(True)
 
     try:
-        for event in events:
-            # 根据倍速调整等待时间
-            time.sleep(event["time_since_last"] / speed)
-
-            action = event["action"]
-
-            if action == "move":
-                mouse.position = (event["x"], event["y"])
-
-            elif action == "click":
-                button = get_button_from_string(event["button"])
-                if button:
-                    mouse.position = (event["x"], event["y"])
-                    if event["action_type"] == "press":
-                        mouse.press(button)
-                    else:
-                        mouse.release(button)
-
-            elif action == "scroll":
-                mouse.position = (event["x"], event["y"])
-                mouse.scroll(event["dx"], event["dy"])
-
+        stats = replay_timeline(timeline, mouse, get_button_from_string, speed=speed)
+        if stats["skipped"]:
+            print(f"⏩ 为追赶时间线跳过了 {stats['skipped']} 个 move 事件。")
+        print(
+            f"⏱️  实际用时 {stats['duration']:.2f} 秒"
+            f"(预期 {timeline[-1][0] / speed if timeline else 0:.2f} 秒)，"
+            f"最大落后 {stats['max_behind'] * 1000:.1f} 毫秒。"
+        )
         print("✅ 回放完成！")
     finally:
         # 无论是否发生异常，都要恢复用户输入
@@ -161,7 +191,7 @@ if __name__ == "__main__":
 
     print("--- 鼠标操作回放器 ---")
     print("用法:")
-    print(f"  - 确保 '{SCRIPT_FILENAME}' 文件存在。")
+    print(f"  - 确保 '{SCRIPT_FILENAME}'(或旧版 '{LEGACY_SCRIPT_FILENAME}')文件存在。")
     print("  - 按 F12 开始回放。")
     if playback_speed != 1.0:
         print(f"  - 当前倍速: {playback_speed}x")
@@ -1,5 +1,5 @@
 # recorder.py (修复版)
-import json
+import argparse
 import threading
 import time
 
@@ -8,11 +8,22 @@ from pynput.keyboard import Key
 from pynput.keyboard import Listener as KeyboardListener
 from pynput.mouse import Controller as MouseController
 
+import script_format
+
 # --- 全局变量 ---
 recorded_events = []
 is_recording = False
 last_event_time = None
-SCRIPT_FILENAME = "mouse_script.json"
+SCRIPT_FILENAME = "mouse_script.bin"
+
+# move 事件抽稀: 距上一个已记录的 move 时间过短或距离过近的移动不记录, 0 表示不限制
+move_min_interval = 0.01
+move_min_distance = 2.0
+# 上一个已记录的 move 事件的时间和坐标
+last_move_time = None
+last_move_position = None
+# 被抽稀丢弃的 move 事件数
+dropped_moves = 0
 
 mouse = MouseController()
 
@@ -26,11 +37,15 @@ mouse_listener = None
 def start_recording():
     """开始录制"""
     global is_recording, last_event_time, recorded_events, mouse_listener
+    global last_move_time, last_move_position, dropped_moves
     if not is_recording:
         print("▶️  开始录制... 按 F10 停止。")
         is_recording = True
         recorded_events = []
         last_event_time = time.time()
+        last_move_time = None
+        last_move_position = None
+        dropped_moves = 0
         # 启动鼠标监听
         if mouse_listener and not mouse_listener.running:
             mouse_listener.start()
@@ -53,10 +68,11 @@ def save_script():
         print("没有录制任何事件。")
         return
 
+    if dropped_moves:
+        print(f"✂️  抽稀丢弃了 {dropped_moves} 个 move 事件。")
     print(f"💾 正在保存脚本到 {SCRIPT_FILENAME}...")
-    with open(SCRIPT_FILENAME, "w") as f:
-        json.dump(recorded_events, f, indent=4)
-    print("✅ 保存成功！")
+    script_format.save_script(SCRIPT_FILENAME, recorded_events)
+    print(f"✅ 保存成功！共 {len(recorded_events)} 个事件。")
 
 
 def record_event(action, **kwargs):
@@ -73,8 +89,31 @@ def record_event(action, **kwargs):
         last_event_time = current_time
 
 
+def should_record_move(x, y, current_time):
+    """判断 move 事件是否满足最小时间间隔和最小距离, 不满足的丢弃"""
+    if last_move_time is None:
+        return True
+    if move_min_interval > 0 and current_time - last_move_time < move_min_interval:
+        return False
+    if move_min_distance > 0:
+        last_x, last_y = last_move_position
+        if ((x - last_x) ** 2 + (y - last_y) ** 2) ** 0.5 < move_min_distance:
+            return False
+    return True
+
+
 # --- 鼠标事件回调函数 ---
 def on_move(x, y):
+    global last_move_time, last_move_position, dropped_moves
+    if not is_recording:
+        return
+    current_time = time.time()
+    if not should_record_move(x, y, current_time):
+        # 不更新 last_event_time, 被丢弃的时间会累加到下一个事件的间隔中
+        dropped_moves += 1
+        return
+    last_move_time = current_time
+    last_move_position = (x, y)
     record_event("move", x=x, y=y)
 
 
@@ -102,6 +141,23 @@ def on_key_press(key):
 
 # --- 主程序 ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="鼠标操作录制器")
+    parser.add_argument(
+        "--min-interval",
+        type=float,
+        default=move_min_interval,
+        help=f"相邻两次记录的 move 事件的最小间隔秒数, 0 表示不限制(默认 {move_min_interval})",
+    )
+    parser.add_argument(
+        "--min-distance",
+        type=float,
+        default=move_min_distance,
+        help=f"相邻两次记录的 move 事件的最小距离像素, 0 表示不限制(默认 {move_min_distance})",
+    )
+    args = parser.parse_args()
+    move_min_interval = args.min_interval
+    move_min_distance = args.min_distance
+
     print("--- 鼠标操作录制器 ---")
     print("用法:")
     print("  - 按 F9 开始录制")
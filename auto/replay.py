@@ -0,0 +1,172 @@
+# replay.py
+import time
+
+# 路径简化的默认容差(像素): 删除的 move 点离保留折线的距离不超过该值
+DEFAULT_EPSILON = 1.0
+# 落后时间线超过该秒数时, 跳过中间的 move 事件追赶进度(click / scroll 永不跳过)
+DEFAULT_MAX_LAG = 0.05
+
+
+def build_timeline(events):
+    """
+    将录制的相对时间(time_since_last)转换为从 0 开始的绝对时间线。
+
+    返回:
+        list[tuple[float, dict]]: (相对开始的秒数, 事件) 列表
+    """
+    timeline = []
+    offset = 0.0
+    for event in events:
+        offset += event["time_since_last"]
+        timeline.append((offset, event))
+    return timeline
+
+
+def _point_line_distance(point, start, end):
+    """点到线段所在直线的距离, 线段退化为点时返回两点距离"""
+    (px, py), (sx, sy), (ex, ey) = point, start, end
+    dx = ex - sx
+    dy = ey - sy
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        return ((px - sx) ** 2 + (py - sy) ** 2) ** 0.5
+    return abs(dy * px - dx * py + ex * sy - ey * sx) / length_sq**0.5
+
+
+def rdp_keep_indices(points, epsilon):
+    """
+    Ramer–Douglas–Peucker 路径简化(非递归实现, 避免长路径超出递归深度)。
+
+    返回:
+        list[int]: 需要保留的点下标(升序), 首尾点总是保留
+    """
+    count = len(points)
+    if count < 3:
+        return list(range(count))
+
+    keep = [False] * count
+    keep[0] = keep[-1] = True
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        max_distance = -1.0
+        index = first
+        for i in range(first + 1, last):
+            distance = _point_line_distance(points[i], points[first], points[last])
+            if distance > max_distance:
+                max_distance = distance
+                index = i
+        if max_distance > epsilon:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [i for i in range(count) if keep[i]]
+
+
+def simplify_timeline(timeline, epsilon=DEFAULT_EPSILON):
+    """
+    合并冗余的连续 move 事件。
+
+    每段连续的 move 事件单独做 RDP 简化, 段首段尾保留, 保留点的时间不变;
+    click 和 scroll 事件原样保留, 它们自带坐标, 因此点击和滚动位置完全准确。
+    """
+    if epsilon < 0:
+        return list(timeline)
+
+    simplified = []
+    run = []
+
+    def flush_run():
+        points = [(event["x"], event["y"]) for _, event in run]
+        simplified.extend(run[i] for i in rdp_keep_indices(points, epsilon))
+        run.clear()
+
+    for item in timeline:
+        if item[1]["action"] == "move":
+            run.append(item)
+        else:
+            flush_run()
+            simplified.append(item)
+    flush_run()
+    return simplified
+
+
+def apply_event(mouse, event, resolve_button):
+    """在鼠标控制器上执行单个事件"""
+    action = event["action"]
+
+    if action == "move":
+        mouse.position = (event["x"], event["y"])
+
+    elif action == "click":
+        button = resolve_button(event["button"])
+        if button:
+            mouse.position = (event["x"], event["y"])
+            if event["action_type"] == "press":
+                mouse.press(button)
+            else:
+                mouse.release(button)
+
+    elif action == "scroll":
+        mouse.position = (event["x"], event["y"])
+        mouse.scroll(event["dx"], event["dy"])
+
+
+def replay_timeline(
+    timeline,
+    mouse,
+    resolve_button,
+    speed=1.0,
+    clock=time.monotonic,
+    sleep=time.sleep,
+    max_lag=DEFAULT_MAX_LAG,
+):
+    """
+    按绝对单调时间线回放事件。
+
+    每个事件的目标时刻 = 开始时刻 + 偏移 / 倍速, 只睡眠到该时刻, 系统睡眠的超时
+    不会逐个事件累积。落后超过 max_lag 时跳过紧跟着另一个 move 的 move 事件,
+    直到追上时间线。
+
+    参数:
+        timeline: build_timeline / simplify_timeline 的结果
+        mouse: 鼠标控制器, 需提供 position 属性和 press / release / scroll 方法
+        resolve_button: 将录制的按键字符串转换为控制器按键对象的函数
+        speed (float): 回放倍速
+        clock / sleep: 单调时钟和睡眠函数, 测试时可替换
+
+    返回:
+        dict: 回放统计(执行/跳过的事件数, 最大落后秒数)
+    """
+    start = clock()
+    played = 0
+    skipped = 0
+    max_behind = 0.0
+    last_index = len(timeline) - 1
+
+    for i, (offset, event) in enumerate(timeline):
+        target = start + offset / speed
+        remaining = target - clock()
+        if remaining > 0:
+            sleep(remaining)
+        else:
+            behind = -remaining
+            max_behind = max(max_behind, behind)
+            if (
+                behind > max_lag
+                and event["action"] == "move"
+                and i < last_index
+                and timeline[i + 1][1]["action"] == "move"
+            ):
+                skipped += 1
+                continue
+
+        apply_event(mouse, event, resolve_button)
+        played += 1
+
+    return {
+        "played": played,
+        "skipped": skipped,
+        "max_behind": max_behind,
+        "duration": clock() - start,
+    }
@@ -0,0 +1,227 @@
+# scheduler.py
+import json
+import time
+from datetime import date, datetime, timedelta
+
+# 交易日历文件, 与 service/trading_calendar.json 格式相同(只使用其中的 holidays)
+CALENDAR_FILENAME = "trading_calendar.json"
+# 单次睡眠的最长秒数: 分段睡眠, 系统时间调整或休眠唤醒后能及时校正
+MAX_SLEEP_CHUNK = 60.0
+# 回放期间错过的触发, 超过该时长后不再补跑
+DEFAULT_MAX_LATENESS = timedelta(minutes=5)
+# 向后查找下一个交易日的最大天数(覆盖最长的节假日)
+MAX_LOOKAHEAD_DAYS = 60
+SATURDAY = 5
+
+
+class SystemClock:
+    """真实时钟: 本地时间 + time.sleep。测试时可替换为假时钟"""
+
+    def now(self):
+        return datetime.now()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class TradingCalendar:
+    """交易日历: 周末和节假日不触发"""
+
+    def __init__(self, holidays=()):
+        self.holidays = frozenset(holidays)
+
+    @classmethod
+    def from_file(cls, path=CALENDAR_FILENAME):
+        """
+        从 JSON 文件加载节假日。文件缺失或格式错误时只跳过周末。
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            holidays = [date.fromisoformat(day) for day in raw.get("holidays", [])]
+        except FileNotFoundError:
+            print(f"⚠️  警告: 找不到交易日历 '{path}'，仅跳过周末。")
+            return cls()
+        except (json.JSONDecodeError, ValueError) as e:
+            print(f"⚠️  警告: 交易日历 '{path}' 格式不正确({e})，仅跳过周末。")
+            return cls()
+        print(f"📅 交易日历 '{path}' 加载成功，包含 {len(holidays)} 个节假日。")
+        return cls(holidays)
+
+    def is_trading_day(self, day):
+        return day.weekday() < SATURDAY and day not in self.holidays
+
+
+def parse_times(time_strs):
+    """将 "HH:MM" 字符串列表解析为排好序、去重的 time 列表"""
+    return sorted({datetime.strptime(s, "%H:%M").time() for s in time_strs})
+
+
+def run_playback_task(focus_window, playback, clock=None):
+    """
+    组合任务：先置顶窗口，然后执行回放脚本。
+
+    参数:
+        focus_window: 无参函数，查找并激活目标窗口，成功返回 True
+        playback: 无参函数，执行鼠标回放
+        clock: 用于打印时间戳的时钟，默认使用系统时钟
+
+    窗口和鼠标操作都通过参数传入，在非 Windows 环境下可以替换为桩实现。
+    """
+    clock = clock or SystemClock()
+
+    def stamp():
+        return clock.now().strftime("%H:%M:%S")
+
+    print("\n" + "=" * 40)
+    print("⏰ 到达预定时间，准备执行任务...")
+
+    # 1. 查找并置顶窗口
+    if focus_window():
+        # 2. 如果窗口置顶成功，则执行鼠标回放
+        print(f"[{stamp()}] 🚀 开始执行鼠标回放脚本...")
+        try:
+            playback()
+            print(f"[{stamp()}] ✅ 鼠标回放脚本执行完成。")
+        except Exception as e:
+            print(f"[{stamp()}] ❌ 执行回放脚本时发生错误: {e}")
+    else:
+        print(f"[{stamp()}] 🛑 因未能找到或激活目标窗口，任务中断。")
+    print("=" * 40 + "\n")
+
+
+class TriggerScheduler:
+    """
+    事件驱动的定时调度器。
+
+    - 计算下一个交易日触发时间并精确睡眠到该时刻，不再每秒轮询
+    - 周末和节假日不触发
+    - 任务在当前线程同步执行；执行期间到达的触发不会被丢弃，
+      结束后合并为一次补跑(超过 max_lateness 的触发直接跳过)
+    """
+
+    def __init__(
+        self, times, task, calendar=None, clock=None, max_lateness=DEFAULT_MAX_LATENESS
+    ):
+        """
+        参数:
+            times: "HH:MM" 触发时间列表
+            task: 无参函数，每次触发时执行
+            calendar: 交易日历，默认只跳过周末
+            clock: 提供 now() 和 sleep(seconds) 的时钟，默认使用系统时钟
+            max_lateness: 错过的触发在多长时间内仍会补跑
+        """
+        self.times = parse_times(times)
+        self.task = task
+        self.calendar = calendar or TradingCalendar()
+        self.clock = clock or SystemClock()
+        self.max_lateness = max_lateness
+        # 已处理到的时间点, 该时间点(含)之前的触发都已执行、合并或跳过
+        self.checked_until = None
+        self.run_count = 0
+        self.coalesced_count = 0
+        self.skipped_count = 0
+
+    def stamp(self):
+        return self.clock.now().strftime("%H:%M:%S")
+
+    def next_trigger(self, after):
+        """返回严格晚于 after 的下一个交易日触发时间，找不到时返回 None"""
+        day = after.date()
+        for _ in range(MAX_LOOKAHEAD_DAYS):
+            if self.calendar.is_trading_day(day):
+                for trigger_time in self.times:
+                    candidate = datetime.combine(day, trigger_time)
+                    if candidate > after:
+                        return candidate
+            day += timedelta(days=1)
+        return None
+
+    def due_triggers(self, since, until):
+        """返回 (since, until] 区间内的全部触发时间"""
+        due = []
+        cursor = since
+        while True:
+            trigger = self.next_trigger(cursor)
+            if trigger is None or trigger > until:
+                return due
+            due.append(trigger)
+            cursor = trigger
+
+    def sleep_until(self, target):
+        """分段睡眠直到 target，每段醒来后按当前时间重新计算剩余时长"""
+        while True:
+            remaining = (target - self.clock.now()).total_seconds()
+            if remaining <= 0:
+                return
+            self.clock.sleep(min(remaining, MAX_SLEEP_CHUNK))
+
+    def fire(self):
+        """执行一次任务，任务异常不会中断调度"""
+        self.run_count += 1
+        try:
+            self.task()
+        except Exception as e:
+            print(f"[{self.stamp()}] ❌ 定时任务执行失败: {e}")
+
+    def run_pending(self):
+        """
+        处理截至当前时间已到达的触发: 多个触发合并为一次执行。
+
+        返回:
+            bool: 是否执行了任务
+        """
+        now = self.clock.now()
+        if self.checked_until is None:
+            self.checked_until = now
+            return False
+        due = self.due_triggers(self.checked_until, now)
+        self.checked_until = max(self.checked_until, now)
+        if not due:
+            return False
+
+        fresh = [trigger for trigger in due if now - trigger <= self.max_lateness]
+        skipped = len(due) - len(fresh)
+        if skipped:
+            self.skipped_count += skipped
+            print(f"[{self.stamp()}] ⏭️  跳过 {skipped} 个已过期的触发。")
+        if not fresh:
+            return False
+        if len(fresh) > 1:
+            self.coalesced_count += len(fresh) - 1
+            times = "、".join(trigger.strftime("%H:%M") for trigger in fresh)
+            print(f"[{self.stamp()}] 🔁 回放期间错过的触发 {times} 合并为一次执行。")
+        self.fire()
+        return True
+
+    def run_once(self):
+        """
+        等待并处理下一次触发。
+
+        返回:
+            bool: False 表示日历中已没有后续触发
+        """
+        if self.checked_until is None:
+            self.checked_until = self.clock.now()
+        # 上一次任务执行期间错过的触发, 先补跑
+        if self.run_pending():
+            return True
+
+        trigger = self.next_trigger(self.checked_until)
+        if trigger is None:
+            print(
+                f"[{self.stamp()}] 🛑 未来 {MAX_LOOKAHEAD_DAYS} 天内没有交易日，调度结束。"
+            )
+            return False
+        print(f"[{self.stamp()}] 💤 下一次触发: {trigger.strftime('%Y-%m-%d %H:%M')}")
+        self.sleep_until(trigger)
+        self.run_pending()
+        return True
+
+    def run_forever(self, run_immediately=False):
+        """持续调度；run_immediately 为 True 时先立即执行一次任务"""
+        self.checked_until = self.clock.now()
+        if run_immediately:
+            self.fire()
+        while self.run_once():
+            pass
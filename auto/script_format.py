@@ -0,0 +1,137 @@
+# script_format.py
+"""
+鼠标脚本的紧凑二进制格式。
+
+文件结构(小端):
+    文件头: 魔数 b"MREC" + 版本(u8) + 事件数(u32)
+    每个事件: 类型(u8) + 距上一事件的微秒数(u32) + x(i32) + y(i32)
+        click 事件额外跟一个按键编号(u8)
+        scroll 事件额外跟 dx(i16) + dy(i16)
+
+单个 move 事件 13 字节, 相比 indent=4 的 JSON 约小一个数量级。
+解码结果与旧 JSON 脚本的事件字典结构完全一致, 回放逻辑无需区分格式。
+"""
+
+import json
+import struct
+
+MAGIC = b"MREC"
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct("<4sBI")
+EVENT = struct.Struct("<BIii")
+BUTTON = struct.Struct("<B")
+SCROLL = struct.Struct("<hh")
+
+# 事件类型
+TAG_MOVE = 0
+TAG_PRESS = 1
+TAG_RELEASE = 2
+TAG_SCROLL = 3
+
+# 按键编号 <-> 录制时的按键字符串(str(pynput.mouse.Button.xxx))
+BUTTON_CODES = {"Button.left": 1, "Button.right": 2, "Button.middle": 3}
+BUTTON_NAMES = {code: name for name, code in BUTTON_CODES.items()}
+
+MAX_DELAY_US = 2**32 - 1
+
+
+def _button_code(button_str):
+    for name, code in BUTTON_CODES.items():
+        if name.split(".")[-1] in button_str:
+            return code
+    return 0
+
+
+def encode_event(event):
+    """将单个事件字典编码为字节串"""
+    action = event["action"]
+    delay_us = min(round(event["time_since_last"] * 1_000_000), MAX_DELAY_US)
+    x = round(event["x"])
+    y = round(event["y"])
+
+    if action == "move":
+        return EVENT.pack(TAG_MOVE, delay_us, x, y)
+    if action == "click":
+        tag = TAG_PRESS if event["action_type"] == "press" else TAG_RELEASE
+        return EVENT.pack(tag, delay_us, x, y) + BUTTON.pack(
+            _button_code(event["button"])
+        )
+    if action == "scroll":
+        return EVENT.pack(TAG_SCROLL, delay_us, x, y) + SCROLL.pack(
+            event["dx"], event["dy"]
+        )
+    raise ValueError(f"未知的事件类型: {action}")
+
+
+def encode_events(events):
+    """将事件列表编码为完整的二进制脚本"""
+    parts = [HEADER.pack(MAGIC, FORMAT_VERSION, len(events))]
+    parts.extend(encode_event(event) for event in events)
+    return b"".join(parts)
+
+
+def decode_events(data):
+    """
+    解码二进制脚本为事件字典列表。
+
+    异常:
+        ValueError: 魔数、版本不匹配或数据被截断
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("脚本文件过短")
+    magic, version, count = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("不是二进制鼠标脚本")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"不支持的脚本版本: {version}")
+
+    events = []
+    offset = HEADER.size
+    try:
+        for _ in range(count):
+            tag, delay_us, x, y = EVENT.unpack_from(data, offset)
+            offset += EVENT.size
+            event = {
+                "action": "move",
+                "time_since_last": delay_us / 1_000_000,
+                "x": x,
+                "y": y,
+            }
+            if tag in (TAG_PRESS, TAG_RELEASE):
+                (code,) = BUTTON.unpack_from(data, offset)
+                offset += BUTTON.size
+                event["action"] = "click"
+                event["button"] = BUTTON_NAMES.get(code, "Button.unknown")
+                event["action_type"] = "press" if tag == TAG_PRESS else "release"
+            elif tag == TAG_SCROLL:
+                event["dx"], event["dy"] = SCROLL.unpack_from(data, offset)
+                offset += SCROLL.size
+                event["action"] = "scroll"
+            elif tag != TAG_MOVE:
+                raise ValueError(f"未知的事件类型编号: {tag}")
+            events.append(event)
+    except struct.error as e:
+        raise ValueError(f"脚本数据被截断: {e}") from e
+    return events
+
+
+def save_script(path, events):
+    """以二进制格式保存脚本"""
+    with open(path, "wb") as f:
+        f.write(encode_events(events))
+
+
+def load_script(path):
+    """
+    加载脚本, 根据文件头自动识别二进制格式或旧的 JSON 格式。
+
+    异常:
+        FileNotFoundError: 文件不存在
+        ValueError: 文件格式不正确(json.JSONDecodeError 也是 ValueError 的子类)
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if data.startswith(MAGIC):
+        return decode_events(data)
+    return json.loads(data.decode("utf-8"))
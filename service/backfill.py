@@ -0,0 +1,182 @@
+"""离线日志回灌: 直接解析 QMT 日志重建数据状态, 不经过 Vector 和 HTTP.
+
+用法:
+    python backfill.py C:/QMT/userdata/log --output data_record.json
+    python backfill.py XtClient_FormulaOutput_20251011.log --base data_record.json --offline
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from operator import itemgetter
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from config import config, setup_logging
+from data_handler import DataHandler
+from data_persistence import persistence_for_path
+from data_stock_name import get_stock_name
+from qmt_log_parser import iter_events
+from scoring import ScoringEngine
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 常量定义
+LOG_FILE_PATTERN = "XtClient_FormulaOutput_*.log"
+DEFAULT_BATCH_SIZE = 10000
+
+_event_time = itemgetter("timestamp")
+
+
+def collect_log_files(paths: Iterable[str], pattern: str = LOG_FILE_PATTERN) -> list[Path]:
+    """收集日志文件, 目录按文件名模式展开."""
+    files: list[Path] = []
+    for raw_path in paths:
+        path = Path(raw_path)
+        if path.is_dir():
+            files.extend(sorted(path.glob(pattern)))
+        elif path.is_file():
+            files.append(path)
+        else:
+            logger.warning("日志路径不存在, 已跳过: %s", path)
+    return files
+
+
+def parse_log_file(path: Path, encoding: str = "utf-8") -> list[dict[str, Any]]:
+    """解析单个日志文件, 返回按时间戳排序的事件列表(在子进程中执行)."""
+    with path.open("r", encoding=encoding, errors="replace") as f:
+        events = list(iter_events(f))
+    # 多行超时等原因可能导致文件内轻微乱序, 稳定排序保持同一时间戳的原始顺序
+    events.sort(key=_event_time)
+    return events
+
+
+def parse_log_files(
+    files: list[Path],
+    encoding: str = "utf-8",
+    workers: int | None = None,
+) -> list[list[dict[str, Any]]]:
+    """多进程并行解析多个日志文件."""
+    workers = min(workers or os.cpu_count() or 1, len(files))
+    if workers <= 1:
+        return [parse_log_file(path, encoding) for path in files]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(parse_log_file, files, [encoding] * len(files)))
+
+
+def merge_events(per_file_events: Iterable[list[dict[str, Any]]]) -> Iterator[dict[str, Any]]:
+    """按时间戳对多个有序事件列表做归并."""
+    return heapq.merge(*per_file_events, key=_event_time)
+
+
+def iter_batches(events: Iterator[dict[str, Any]], batch_size: int) -> Iterator[list[dict[str, Any]]]:
+    """将事件流切分为批次."""
+    while batch := list(islice(events, batch_size)):
+        yield batch
+
+
+def build_name_lookup(snapshot: list[dict[str, Any]], *, offline: bool) -> Callable[[str], dict[str, str] | None]:
+    """优先使用快照中已有的名称, 避免回灌时逐个在线查询."""
+    known_names = {row["etfCode"]: row["etfName"] for row in snapshot if row.get("etfCode") and row.get("etfName")}
+
+    def lookup(etf_code: str) -> dict[str, str] | None:
+        name = known_names.get(etf_code)
+        if name and name != etf_code:
+            return {"code": etf_code, "name": name, "source": "snapshot"}
+        return None if offline else get_stock_name(etf_code)
+
+    return lookup
+
+
+def backfill(
+    files: list[Path],
+    handler: DataHandler,
+    *,
+    encoding: str = "utf-8",
+    workers: int | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> tuple[int, int]:
+    """解析日志文件并按时间顺序批量写入 DataHandler.
+
+    Returns:
+        (成功处理条数, 失败条数)
+    """
+    per_file_events = parse_log_files(files, encoding, workers)
+    logger.info("解析完成: %d 个文件, 共 %d 条事件", len(files), sum(len(events) for events in per_file_events))
+
+    processed = errors = 0
+    for batch in iter_batches(merge_events(per_file_events), batch_size):
+        result = handler.accept(batch)
+        processed += result.processed
+        errors += result.errors
+    return processed, errors
+
+
+def main(argv: list[str] | None = None) -> int:
+    """命令行入口."""
+    parser = argparse.ArgumentParser(description="从 QMT 日志离线重建数据状态")
+    parser.add_argument("paths", nargs="+", help=f"日志文件或目录(目录下匹配 {LOG_FILE_PATTERN})")
+    parser.add_argument(
+        "--output",
+        default=config.data_file_path,
+        help="输出快照文件, .sqlite/.sqlite3/.db 后缀写入 SQLite",
+    )
+    parser.add_argument("--base", help="在已有快照的基础上回灌, 默认从空状态重建")
+    parser.add_argument("--names-from", help="读取股票名称的快照文件, 默认使用 --base 或 --output")
+    parser.add_argument("--offline", action="store_true", help="快照中没有的名称不做在线查询, 直接使用代码")
+    parser.add_argument("--encoding", default="utf-8", help="日志文件编码")
+    parser.add_argument("--workers", type=int, default=None, help="解析进程数, 默认CPU核数")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="每批写入条数")
+    args = parser.parse_args(argv)
+
+    files = collect_log_files(args.paths)
+    if not files:
+        logger.error("没有找到日志文件")
+        return 1
+
+    started = time.perf_counter()
+    base_snapshot = persistence_for_path(args.base).load_data() if args.base else []
+    names_path = args.names_from or args.base or args.output
+    name_snapshot = base_snapshot if names_path == args.base else persistence_for_path(names_path).load_data()
+
+    handler = DataHandler(
+        stock_name_lookup=build_name_lookup(name_snapshot, offline=args.offline),
+        scoring=ScoringEngine.from_file(config.scoring_strategies_path),
+    )
+    if base_snapshot:
+        handler.load_from_dict_list(base_snapshot)
+
+    processed, errors = backfill(
+        files,
+        handler,
+        encoding=args.encoding,
+        workers=args.workers,
+        batch_size=args.batch_size,
+    )
+    if not persistence_for_path(args.output).save_data(handler.get_all_data()):
+        return 1
+
+    logger.info(
+        "回灌完成: 成功 %d 条, 失败 %d 条, 共 %d 条记录, 耗时 %.2f 秒",
+        processed,
+        errors,
+        len(handler.data_record),
+        time.perf_counter() - started,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    setup_logging(config)
+    sys.exit(main())
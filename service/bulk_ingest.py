@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import IO, TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+    from data_handler import AcceptResult
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BulkIngestReport:
+    """NDJSON批量导入的逐行结果报告."""
+
+    # 最多保留的错误明细条数, 超出部分只计数
+    max_error_details: int = 100
+    # 非空行数
+    lines: int = 0
+    # 成功处理条数
+    processed: int = 0
+    # 失败条数
+    errors: int = 0
+    # 错误明细: {"line": 行号, "error": 错误描述}
+    error_details: list[dict[str, Any]] = field(default_factory=list)
+
+    def add_error(self, line_no: int, message: str) -> None:
+        """记录一行的错误."""
+        self.errors += 1
+        if len(self.error_details) < self.max_error_details:
+            self.error_details.append({"line": line_no, "error": message})
+
+    def to_dict(self) -> dict[str, Any]:
+        """将报告转换为字典."""
+        return {
+            "lines": self.lines,
+            "processed": self.processed,
+            "errors": self.errors,
+            "errorDetails": self.error_details,
+            "errorDetailsTruncated": self.errors > len(self.error_details),
+        }
+
+
+def open_ndjson_stream(raw: IO[bytes], content_encoding: str | None) -> IO[bytes]:
+    """根据Content-Encoding包装请求体, gzip压缩的请求体边读边解压."""
+    if content_encoding and content_encoding.strip().lower() in {"gzip", "x-gzip"}:
+        return gzip.GzipFile(fileobj=raw, mode="rb")
+    return raw
+
+
+def ingest_ndjson(
+    lines: Iterable[bytes],
+    apply_batch: Callable[[list[Any]], AcceptResult],
+    report: BulkIngestReport,
+    batch_size: int = 1000,
+) -> BulkIngestReport:
+    """逐行解析NDJSON并分批应用.
+
+    内存中最多只保留一个批次的数据, 解析失败或处理失败的行记入报告, 不影响其他行.
+
+    Args:
+        lines: 按行迭代的字节流
+        apply_batch: 处理一个批次的回调, 返回该批次的处理结果
+        report: 结果报告, 流读取中途出错时调用方仍可拿到已处理部分的统计
+        batch_size: 每批条数
+    """
+    batch: list[Any] = []
+    line_numbers: list[int] = []
+
+    def flush() -> None:
+        result = apply_batch(batch)
+        report.processed += result.processed
+        for position, message in result.failed:
+            report.add_error(line_numbers[position], message)
+        batch.clear()
+        line_numbers.clear()
+
+    for line_no, raw_line in enumerate(lines, start=1):
+        line = raw_line.strip()
+        if not line:
+            continue
+        report.lines += 1
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            report.add_error(line_no, f"JSON解析失败: {e}")
+            continue
+        batch.append(item)
+        line_numbers.append(line_no)
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+
+    logger.info("NDJSON导入完成: 共 %d 行, 成功 %d 条, 失败 %d 条", report.lines, report.processed, report.errors)
+    return report
@@ -2,9 +2,16 @@
 
 from __future__ import annotations
 
+import atexit
+import json
 import logging
+import logging.handlers
 import os
-from dataclasses import dataclass
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
 from pathlib import Path
 
 
@@ -22,15 +29,84 @@ class AppConfig:
 
     # 数据持久化配置
     data_file_path: str = "data_record.json"
+    # 持久化后端: json(每次重写整个文件) 或 sqlite(WAL 模式, 每批只写入变化的行)
+    persistence_backend: str = "json"
+    # sqlite 后端的数据库文件
+    sqlite_file_path: str = "data_record.sqlite3"
     auto_save_interval: int = 10
+    # 内存映射的共享状态文件, 供其他进程零拷贝读取最新数据, 为空表示不启用
+    shared_state_path: str = ""
+
+    # 数据去重与乱序保护
+    ingest_dedup_window: int = 10000
+    ingest_drop_stale: bool = True
+
+    # NDJSON批量导入配置
+    bulk_ingest_batch_size: int = 1000
+    bulk_ingest_max_errors: int = 100
+
+    # 交易日历与前端轮询配置
+    trading_calendar_path: str = "trading_calendar.json"
+    # 交易时段前后的缓冲(分钟), 覆盖开盘前和收盘后的日志延迟
+    session_grace_minutes: int = 10
+    # 交易时段内建议的轮询间隔(秒)
+    poll_interval_open: int = 10
+    # 休市时建议的轮询间隔(秒)
+    poll_interval_closed: int = 600
+
+    # 交易日滚动: 每个交易日在该时间(交易所时间, HH:MM)归档当日快照并移除过期记录, 为空表示不定时执行
+    rollover_time: str = "15:30"
+    # 归档文件目录, 每个命名空间一个子目录, 每个交易日一个 <YYYY-MM-DD>.json.gz
+    archive_dir: str = "archive"
+    # 实时表保留最近多少个交易日(含当日)有更新的记录, 0 表示不移除
+    row_ttl_days: int = 10
+
+    # 主备复制: 设置主节点地址(如 http://127.0.0.1:5000)时以备用节点运行, 写接口关闭直到被提升
+    replicate_from: str = ""
+    # 变更日志保留的条数, 备用节点的游标落后超过该值时改为拉取全量快照; 0 表示不提供复制
+    replication_log_size: int = 10000
+    # 备用节点长轮询的等待时间(秒)
+    replication_wait: float = 25.0
+
+    # 端到端延迟预算(毫秒): QMT 写日志到数据可读超过该值时告警, 0 表示不告警
+    latency_budget_ms: int = 5000
+
+    # 评分策略文件(内置主策略之外的附加策略), 不存在时只使用内置主策略
+    scoring_strategies_path: str = "scoring_strategies.json"
+
+    # 命名空间配置: 每个 QMT 终端/账户的数据互相隔离
+    # 使用主密钥时, 通过该请求头指定命名空间(读接口也可用 namespace 查询参数)
+    namespace_header: str = "X-Namespace"
+    # 终端专用密钥 -> 命名空间, 使用这些密钥提交的数据固定写入对应命名空间
+    namespace_keys: dict[str, str] = field(default_factory=dict)
 
     # 股票名称API配置
     stock_api_timeout: int = 5
     stock_api_max_workers: int = 3
+    # 对冲延迟的上下限(毫秒): 首选渠道超过其最近 p90 耗时仍未返回时请求下一个渠道
+    stock_api_hedge_min_ms: int = 50
+    stock_api_hedge_max_ms: int = 1000
+    # 渠道连续失败多少次后熔断, 以及熔断时长(秒)
+    stock_api_breaker_failures: int = 3
+    stock_api_breaker_cooldown: float = 60.0
 
     # 日志配置
     log_level: str = "INFO"
     log_format: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    # 日志目录
+    log_dir: str = "logs"
+    # 异步日志: 请求线程只入队, 由后台线程写盘
+    log_queue: bool = True
+    # 以JSON行格式写入日志文件
+    log_json: bool = False
+    # 单个日志文件最大字节数, 0 表示不轮转
+    log_max_bytes: int = 10 * 1024 * 1024
+    # 保留的轮转日志文件数
+    log_backup_count: int = 5
+    # 同类重复告警在一个时间窗口内最多输出的条数
+    log_rate_limit_burst: int = 5
+    # 重复告警限流的时间窗口(秒)
+    log_rate_limit_interval: float = 60.0
 
     @classmethod
     def from_env(cls) -> AppConfig:
@@ -41,27 +117,189 @@ class AppConfig:
             debug=os.getenv("DEBUG", "true").lower() == "true",
             api_secret_key=os.getenv("API_SECRET_KEY", "123456"),
             data_file_path=os.getenv("DATA_FILE_PATH", "data_record.json"),
+            persistence_backend=os.getenv("PERSISTENCE_BACKEND", "json").lower(),
+            sqlite_file_path=os.getenv("SQLITE_FILE_PATH", "data_record.sqlite3"),
             auto_save_interval=int(os.getenv("AUTO_SAVE_INTERVAL", "300")),
+            shared_state_path=os.getenv("SHARED_STATE_PATH", ""),
+            ingest_dedup_window=int(os.getenv("INGEST_DEDUP_WINDOW", "10000")),
+            ingest_drop_stale=os.getenv("INGEST_DROP_STALE", "true").lower() == "true",
+            bulk_ingest_batch_size=int(os.getenv("BULK_INGEST_BATCH_SIZE", "1000")),
+            bulk_ingest_max_errors=int(os.getenv("BULK_INGEST_MAX_ERRORS", "100")),
+            trading_calendar_path=os.getenv("TRADING_CALENDAR_PATH", "trading_calendar.json"),
+            session_grace_minutes=int(os.getenv("SESSION_GRACE_MINUTES", "10")),
+            poll_interval_open=int(os.getenv("POLL_INTERVAL_OPEN", "10")),
+            poll_interval_closed=int(os.getenv("POLL_INTERVAL_CLOSED", "600")),
+            rollover_time=os.getenv("ROLLOVER_TIME", "15:30"),
+            archive_dir=os.getenv("ARCHIVE_DIR", "archive"),
+            row_ttl_days=int(os.getenv("ROW_TTL_DAYS", "10")),
+            replicate_from=os.getenv("REPLICATE_FROM", ""),
+            replication_log_size=int(os.getenv("REPLICATION_LOG_SIZE", "10000")),
+            replication_wait=float(os.getenv("REPLICATION_WAIT", "25")),
+            latency_budget_ms=int(os.getenv("LATENCY_BUDGET_MS", "5000")),
+            scoring_strategies_path=os.getenv("SCORING_STRATEGIES_PATH", "scoring_strategies.json"),
+            namespace_header=os.getenv("NAMESPACE_HEADER", "X-Namespace"),
+            namespace_keys=parse_key_map(os.getenv("NAMESPACE_KEYS", "")),
             stock_api_timeout=int(os.getenv("STOCK_API_TIMEOUT", "5")),
             stock_api_max_workers=int(os.getenv("STOCK_API_MAX_WORKERS", "3")),
+            stock_api_hedge_min_ms=int(os.getenv("STOCK_API_HEDGE_MIN_MS", "50")),
+            stock_api_hedge_max_ms=int(os.getenv("STOCK_API_HEDGE_MAX_MS", "1000")),
+            stock_api_breaker_failures=int(os.getenv("STOCK_API_BREAKER_FAILURES", "3")),
+            stock_api_breaker_cooldown=float(os.getenv("STOCK_API_BREAKER_COOLDOWN", "60")),
             log_level=os.getenv("LOG_LEVEL", "INFO"),
+            log_dir=os.getenv("LOG_DIR", "logs"),
+            log_queue=os.getenv("LOG_QUEUE", "true").lower() == "true",
+            log_json=os.getenv("LOG_JSON", "false").lower() == "true",
+            log_max_bytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+            log_backup_count=int(os.getenv("LOG_BACKUP_COUNT", "5")),
+            log_rate_limit_burst=int(os.getenv("LOG_RATE_LIMIT_BURST", "5")),
+            log_rate_limit_interval=float(os.getenv("LOG_RATE_LIMIT_INTERVAL", "60")),
+        )
+
+
+def parse_key_map(raw: str) -> dict[str, str]:
+    """解析 "密钥=命名空间,密钥=命名空间" 格式的映射, 忽略空项和格式错误的项."""
+    result: dict[str, str] = {}
+    for item in raw.split(","):
+        key, sep, value = item.partition("=")
+        key, value = key.strip(), value.strip()
+        if sep and key and value:
+            result[key] = value
+    return result
+
+
+class JsonLineFormatter(logging.Formatter):
+    """将日志记录格式化为单行JSON."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": datetime.fromtimestamp(record.created, tz=UTC).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class LogRateLimiter:
+    """按key对重复日志限流.
+
+    每个key在一个时间窗口内最多放行 burst 条, 超出部分只计数;
+    窗口结束后放行的第一条日志会附带上一窗口被抑制的条数.
+    """
+
+    def __init__(self, burst: int = 5, interval: float = 60.0) -> None:
+        self.burst = burst
+        self.interval = interval
+        self._lock = threading.Lock()
+        # key -> [窗口开始时间, 已放行条数, 已抑制条数]
+        self._windows: dict[str, list[float]] = {}
+
+    def allow(self, key: str) -> tuple[bool, int]:
+        """判断key对应的日志是否放行.
+
+        Returns:
+            (是否放行, 上一窗口被抑制的条数)
+        """
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = int(window[2]) if window else 0
+                self._windows[key] = [now, 1, 0]
+                return True, suppressed
+            if window[1] < self.burst:
+                window[1] += 1
+                return True, 0
+            window[2] += 1
+            return False, 0
+
+    def log(
+        self,
+        target: logging.Logger,
+        level: int,
+        key: str,
+        msg: str,
+        *args: object,
+        exc_info: bool = False,
+    ) -> None:
+        """限流输出日志."""
+        if not target.isEnabledFor(level):
+            return
+        allowed, suppressed = self.allow(key)
+        if not allowed:
+            return
+        if suppressed:
+            msg = f"{msg} (此前 {self.interval:.0f} 秒内抑制了 {suppressed} 条同类日志)"
+        target.log(level, msg, *args, exc_info=exc_info)
+
+
+_queue_listener: logging.handlers.QueueListener | None = None
+
+
+def stop_logging() -> None:
+    """停止后台日志线程并刷出队列中剩余的日志."""
+    global _queue_listener  # noqa: PLW0603
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
+def _build_file_handler(config: AppConfig) -> logging.Handler:
+    """创建文件日志处理器, 按配置启用轮转."""
+    log_path = Path(config.log_dir) / "app.log"
+    if config.log_max_bytes > 0:
+        return logging.handlers.RotatingFileHandler(
+            log_path,
+            maxBytes=config.log_max_bytes,
+            backupCount=config.log_backup_count,
+            encoding="utf-8",
         )
+    return logging.FileHandler(log_path, encoding="utf-8")
 
 
 def setup_logging(config: AppConfig) -> None:
-    """设置日志配置."""
+    """设置日志配置.
+
+    开启 log_queue 时, 根日志器只挂一个 QueueHandler, 真正的控制台和文件输出
+    由 QueueListener 后台线程完成, 持锁的请求线程不会阻塞在磁盘IO上.
+    """
+    global _queue_listener  # noqa: PLW0603
+
+    stop_logging()
+
+    # 确保日志目录存在
+    Path(config.log_dir).mkdir(parents=True, exist_ok=True)
+
+    text_formatter = logging.Formatter(config.log_format)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(text_formatter)
+    file_handler = _build_file_handler(config)
+    file_handler.setFormatter(JsonLineFormatter() if config.log_json else text_formatter)
+    handlers: list[logging.Handler] = [stream_handler, file_handler]
+
+    if config.log_queue:
+        log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+        _queue_listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _queue_listener.start()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        # 入队时只合并消息参数, 最终格式由监听线程上的处理器决定
+        queue_handler.setFormatter(logging.Formatter("%(message)s"))
+        handlers = [queue_handler]
+
     logging.basicConfig(
         level=getattr(logging, config.log_level.upper()),
-        format=config.log_format,
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler(Path("logs") / "app.log", encoding="utf-8"),
-        ],
+        handlers=handlers,
+        force=True,
     )
 
-    # 确保日志目录存在
-    Path("logs").mkdir(exist_ok=True)
 
+atexit.register(stop_logging)
 
 # 全局配置实例
 config = AppConfig.from_env()
+
+# 重复告警限流器
+log_rate_limiter = LogRateLimiter(config.log_rate_limit_burst, config.log_rate_limit_interval)
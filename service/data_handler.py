@@ -2,16 +2,24 @@ from __future__ import annotations
 
 import logging
 import threading
-from dataclasses import asdict, dataclass
-from typing import Any
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field, fields
+from typing import TYPE_CHECKING, Any, NamedTuple
 
+from config import log_rate_limiter
 from data_stock_name import get_stock_name
+from latency import from_epoch_ms, parse_log_time, to_epoch_ms
+from scoring import DEFAULT_STRATEGY_NAME, ScoringEngine
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Sequence
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
 # 常量定义
-SCORE_THRESHOLD = 0.5  # 评分阈值
+MARKET_SIGNAL_THRESHOLD = 50  # 大盘趋势阈值(Ma均值占比, 百分比)
 
 
 @dataclass
@@ -50,6 +58,14 @@ class FinalDataLine:
     total_stock_count: int | None = None
     # 最新价格
     latest_price: float | None = None
+    # 各评分策略的分数: 策略名 -> 分数
+    strategy_scores: dict[str, Any] | None = None
+    # 各评分策略的多空信号: 策略名 -> 信号
+    strategy_signals: dict[str, str | None] | None = None
+    # 最近应用的事件在 QMT 日志中的时间(epoch 秒, 保留毫秒), 用于计算数据年龄
+    log_time: float | None = None
+    # 最近一次应用事件的时间(epoch 秒)
+    applied_at: float | None = None
 
     def to_dict(self) -> dict[str, Any]:
         """将对象转换为字典."""
@@ -72,15 +88,166 @@ class FinalDataLine:
             "growthStockCount": result["growth_stock_count"],
             "totalStockCount": result["total_stock_count"],
             "latestPrice": result["latest_price"],
+            "strategyScores": result["strategy_scores"],
+            "strategySignals": result["strategy_signals"],
+            "logTime": to_epoch_ms(result["log_time"]),
+            "appliedAt": to_epoch_ms(result["applied_at"]),
         }
 
 
+@dataclass
+class AcceptResult:
+    """一批数据的处理结果."""
+
+    # 成功处理条数
+    processed: int = 0
+    # 失败条数
+    errors: int = 0
+    # 重复数据条数(去重窗口内已处理过, 已忽略)
+    duplicates: int = 0
+    # 过期数据条数(早于同一ETF同类型最近已应用的时间, 已忽略)
+    stale: int = 0
+    # 处理失败的数据项明细: (批内序号, 错误描述)
+    failed: list[tuple[int, str]] = field(default_factory=list)
+    # 已应用事件的延迟追踪: (etf_code, log_type, 日志时间, 应用时间), 时间为 epoch 秒
+    traces: list[tuple[str, str, float | None, float]] = field(default_factory=list)
+    # 批量校验未通过时的错误明细: (批内序号, 错误描述)
+    rejected: list[tuple[int, str]] = field(default_factory=list)
+    # 本批次修改过的记录代码, 供增量持久化只写入变化的行
+    changed_codes: set[str] = field(default_factory=set)
+
+
+def _to_basis_points(value: float) -> int:
+    """占比转换为整数万分位, 累加时不产生浮点误差."""
+    return round(value * 10000)
+
+
+@dataclass
+class MarketStats:
+    """全市场汇总统计, 随记录变化按差量增量维护.
+
+    与页面头部统计口径一致: M5/M10/M20 占比均值只统计有值的记录,
+    增长股数与总股数为所有记录之和.
+    """
+
+    m5_count: int = 0
+    m5_sum: int = 0
+    m10_count: int = 0
+    m10_sum: int = 0
+    m20_count: int = 0
+    m20_sum: int = 0
+    growth_stock_sum: int = 0
+    total_stock_sum: int = 0
+    row_count: int = 0
+
+    def add(self, data: FinalDataLine, sign: int = 1) -> None:
+        """把一条记录计入统计, sign 为 -1 时扣除该记录."""
+        self.row_count += sign
+        if data.m5_percent is not None:
+            self.m5_count += sign
+            self.m5_sum += sign * _to_basis_points(data.m5_percent)
+        if data.m10_percent is not None:
+            self.m10_count += sign
+            self.m10_sum += sign * _to_basis_points(data.m10_percent)
+        if data.m20_percent is not None:
+            self.m20_count += sign
+            self.m20_sum += sign * _to_basis_points(data.m20_percent)
+        self.growth_stock_sum += sign * (data.growth_stock_count or 0)
+        self.total_stock_sum += sign * (data.total_stock_count or 0)
+
+    def remove(self, data: FinalDataLine) -> None:
+        """从统计中扣除一条记录."""
+        self.add(data, -1)
+
+    def reset(self) -> None:
+        """清空统计."""
+        for stats_field in fields(self):
+            setattr(self, stats_field.name, 0)
+
+    @staticmethod
+    def _average_percent(total: int, count: int) -> float:
+        """万分位之和转换为百分比均值, 保留两位小数."""
+        return round(total / count / 100, 2) if count else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        """将统计转换为字典."""
+        avg_m5 = self._average_percent(self.m5_sum, self.m5_count)
+        avg_m10 = self._average_percent(self.m10_sum, self.m10_count)
+        avg_m20 = self._average_percent(self.m20_sum, self.m20_count)
+        ma_avg = round((avg_m5 + avg_m10 + avg_m20) / 3, 2)
+        return {
+            "m5Signal": "买" if ma_avg > MARKET_SIGNAL_THRESHOLD else "卖",
+            "avgM5Percent": avg_m5,
+            "avgM10Percent": avg_m10,
+            "avgM20Percent": avg_m20,
+            "maAvg": ma_avg,
+            "growthStockSum": self.growth_stock_sum,
+            "totalStockSum": self.total_stock_sum,
+            "rowCount": self.row_count,
+        }
+
+
+class _IngestRoute(NamedTuple):
+    """单个log_type的预编译入库路由: 必需字段与已绑定的处理函数."""
+
+    required_fields: tuple[str, ...]
+    handler: Callable[[dict[str, Any]], None]
+
+
+# 各类型数据的必需字段
+THREE_LINE_FIELDS = ("buy_etf", "timestamp", "last_price", "m5", "m10", "m20")
+MN_STOCK_FIELDS = ("buy_etf", "timestamp", "rise_count", "total_count", "last_price")
+
+# 加仓Mn股票类型 -> 仓位写入的字段(M5 有额外逻辑, 单独处理)
+MN_PERCENT_FIELDS = {
+    "加仓M10股票": "m10_percent",
+    "加仓M20股票": "m20_percent",
+    "加仓M0股票": "m0_percent",
+}
+
+
 class DataHandler:
     """数据处理和计算服务, 专注于数据逻辑处理."""
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        stock_name_lookup: Callable[[str], dict[str, str] | None] | None = None,
+        *,
+        dedup_window: int = 10000,
+        drop_stale: bool = True,
+        scoring: ScoringEngine | None = None,
+    ) -> None:
+        """初始化.
+
+        Args:
+            stock_name_lookup: 新建记录时查询股票名称的函数, 默认使用 get_stock_name 在线查询
+            dedup_window: 去重窗口大小(最近处理过的事件数), 0 表示不去重
+            drop_stale: 是否丢弃早于同一ETF同类型最近已应用时间的事件
+            scoring: 评分引擎, 默认只包含内置主策略
+        """
+        self.stock_name_lookup = stock_name_lookup or get_stock_name
+        self.scoring = scoring or ScoringEngine()
+        self.drop_stale = drop_stale
+        # (etf_code, log_type) -> 最近已应用事件的完整时间戳(保留毫秒)
+        self._last_applied: dict[tuple[str, str], str] = {}
+        # 最近处理过的事件哈希, 集合用于查重, 队列用于按先后淘汰
+        self._recent_events: set[int] = set()
+        self._recent_order: deque[int] = deque(maxlen=dedup_window)
         self.data_record: list[FinalDataLine] = []
+        # etf_code -> 记录, 与 data_record 同步维护
+        self._index: dict[str, FinalDataLine] = {}
+        # 全市场汇总统计
+        self.market_stats = MarketStats()
+        # 数据版本号, 每次数据变化后递增, 用于判断客户端数据是否已是最新
+        self.version = 0
         self.lock = threading.Lock()
+        # log_type -> 入库路由, 字段列表与处理函数只在此解析一次
+        self._routes: dict[str, _IngestRoute] = {
+            "加仓三线": _IngestRoute(THREE_LINE_FIELDS, self._handle_three_line),
+            "加仓M5股票": _IngestRoute(MN_STOCK_FIELDS, self._bind_mn_stock(self._handle_m5_stock)),
+        }
+        for log_type, field_name in MN_PERCENT_FIELDS.items():
+            self._routes[log_type] = _IngestRoute(MN_STOCK_FIELDS, self._bind_mn_stock(_percent_setter(field_name)))
 
     def get_all_data(self) -> list[dict[str, Any]]:
         """获取所有数据,返回字典列表."""
@@ -90,9 +257,21 @@ class DataHandler:
         """获取所有数据的字典形式."""
         return [data.to_dict() for data in self.data_record]
 
+    def get_market_stats(self) -> dict[str, Any]:
+        """获取全市场汇总统计."""
+        return self.market_stats.to_dict()
+
     def get_data_by_code(self, code: str) -> FinalDataLine | None:
         """获取指定代码的记录, 没有则返回None."""
-        return next((data for data in self.data_record if data.etf_code == code), None)
+        return self._index.get(code)
+
+    def get_data_by_codes(self, codes: Iterable[str]) -> list[dict[str, Any]]:
+        """获取指定代码的记录字典, 忽略不存在的代码."""
+        return [row.to_dict() for row in self.get_rows_by_codes(codes)]
+
+    def get_rows_by_codes(self, codes: Iterable[str]) -> list[FinalDataLine]:
+        """获取指定代码的记录对象, 忽略不存在的代码."""
+        return [row for code in codes if (row := self._index.get(code)) is not None]
 
     def get_data_since(self, since_time: str) -> list[dict[str, Any]]:
         """获取指定时间之后的数据."""
@@ -105,91 +284,281 @@ class DataHandler:
             # 如果筛选失败, 返回所有数据
             return self.get_all_data()
 
+    @staticmethod
+    def _row_from_dict(data_dict: dict[str, Any]) -> FinalDataLine:
+        """由记录字典(to_dict 的结果)创建记录对象."""
+        # 使用 dataclass 的字段来创建对象
+        update_time = data_dict.get("updateTime")
+        return FinalDataLine(
+            # 时间格式化为 2025-10-11 15:15:36,005  -> 2025-10-11 15:15:36
+            update_time=update_time[:19] if update_time else None,
+            etf_code=data_dict.get("etfCode"),
+            etf_name=data_dict.get("etfName"),
+            m5_signal=data_dict.get("m5Signal"),
+            total_score=data_dict.get("totalScore"),
+            m5_percent=data_dict.get("m5Percent"),
+            m10_percent=data_dict.get("m10Percent"),
+            m20_percent=data_dict.get("m20Percent"),
+            ma_mean_ratio=data_dict.get("maMeanRatio"),
+            m0_percent=data_dict.get("m0Percent"),
+            greater_than_m5_price=data_dict.get("greaterThanM5Price"),
+            greater_than_m10_price=data_dict.get("greaterThanM10Price"),
+            greater_than_m20_price=data_dict.get("greaterThanM20Price"),
+            growth_stock_count=data_dict.get("growthStockCount"),
+            total_stock_count=data_dict.get("totalStockCount"),
+            latest_price=data_dict.get("latestPrice"),
+            log_time=from_epoch_ms(data_dict.get("logTime")),
+            applied_at=from_epoch_ms(data_dict.get("appliedAt")),
+        )
+
     def load_from_dict_list(self, data_list: list[dict[str, Any]]) -> None:
         """从字典列表加载数据(用于持久化服务调用)."""
         with self.lock:
             self.data_record.clear()
+            self._index.clear()
+            self.market_stats.reset()
             for data_dict in data_list:
                 try:
-                    # 使用 dataclass 的字段来创建对象
-                    update_time = data_dict.get("updateTime")
-                    final_data = FinalDataLine(
-                        # 时间格式化为 2025-10-11 15:15:36,005  -> 2025-10-11 15:15:36
-                        update_time=update_time[:19] if update_time else None,
-                        etf_code=data_dict.get("etfCode"),
-                        etf_name=data_dict.get("etfName"),
-                        m5_signal=data_dict.get("m5Signal"),
-                        total_score=data_dict.get("totalScore"),
-                        m5_percent=data_dict.get("m5Percent"),
-                        m10_percent=data_dict.get("m10Percent"),
-                        m20_percent=data_dict.get("m20Percent"),
-                        ma_mean_ratio=data_dict.get("maMeanRatio"),
-                        m0_percent=data_dict.get("m0Percent"),
-                        greater_than_m5_price=data_dict.get("greaterThanM5Price"),
-                        greater_than_m10_price=data_dict.get("greaterThanM10Price"),
-                        greater_than_m20_price=data_dict.get("greaterThanM20Price"),
-                        growth_stock_count=data_dict.get("growthStockCount"),
-                        total_stock_count=data_dict.get("totalStockCount"),
-                        latest_price=data_dict.get("latestPrice"),
-                    )
+                    final_data = self._row_from_dict(data_dict)
+                    # 按当前配置的策略重新评分, 策略可能与保存快照时不同
+                    self._cal_row_score(final_data)
                     self.data_record.append(final_data)
+                    self.market_stats.add(final_data)
+                    if final_data.etf_code is not None:
+                        self._index[final_data.etf_code] = final_data
                 except (ValueError, KeyError, TypeError) as e:
                     logger.warning("跳过无效数据记录: %s", e)
                     continue
+            self.version += 1
             logger.info("成功加载 %d 条数据记录", len(self.data_record))
 
-    def accept(self, data_list: list[dict[str, Any]]) -> None:
-        """接收并处理数据列表."""
-        if not data_list:
-            logger.warning("接收到空数据列表")
-            return
+    def apply_replicated(
+        self,
+        rows: Iterable[dict[str, Any]],
+        deletes: Iterable[str] = (),
+    ) -> tuple[set[str], set[str]]:
+        """应用主节点复制过来的行变化(备用节点调用), 调用方需持有命名空间的锁.
 
-        processed_count = 0
-        error_count = 0
+        整行覆盖, 重复应用同一变化不会改变结果; 已有记录原地更新, 其他线程持有的引用仍然有效.
 
-        for data in data_list:
-            try:
-                logger.debug("开始处理数据项: %s", data)
+        Args:
+            rows: 变化后的完整记录字典
+            deletes: 已被移除的代码
 
-                # 基础数据验证
-                if not isinstance(data, dict):
-                    logger.error("数据格式错误, 期望字典类型: %s", type(data))
-                    error_count += 1
+        Returns:
+            (新增或更新的代码, 移除的代码)
+        """
+        changed: set[str] = set()
+        for data_dict in rows:
+            try:
+                incoming = self._row_from_dict(data_dict)
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning("跳过无效的复制记录: %s", e)
+                continue
+            code = incoming.etf_code
+            if code is None:
+                continue
+            self._cal_row_score(incoming)
+            current = self._index.get(code)
+            if current is None:
+                self.data_record.append(incoming)
+                self._index[code] = incoming
+            else:
+                self.market_stats.remove(current)
+                for row_field in fields(FinalDataLine):
+                    setattr(current, row_field.name, getattr(incoming, row_field.name))
+                incoming = current
+            self.market_stats.add(incoming)
+            changed.add(code)
+
+        removed = {code for code in deletes if code in self._index}
+        if removed:
+            self.data_record[:] = [row for row in self.data_record if row.etf_code not in removed]
+            for code in removed:
+                self.market_stats.remove(self._index.pop(code))
+        if changed or removed:
+            self.version += 1
+        return changed, removed
+
+    def evict_before(self, cutoff: str) -> list[str]:
+        """从实时表中移除更新时间早于 cutoff 的记录, 返回被移除的代码.
+
+        没有更新时间的记录无法判断是否过期, 予以保留. 调用方需持有命名空间的锁.
+
+        Args:
+            cutoff: 与 update_time 同格式的时间字符串, 如 "2025-10-11 00:00:00"
+        """
+        evicted = [row for row in self.data_record if row.update_time is not None and row.update_time < cutoff]
+        if not evicted:
+            return []
+        self.data_record[:] = [row for row in self.data_record if row.update_time is None or row.update_time >= cutoff]
+        codes = set()
+        for row in evicted:
+            self.market_stats.remove(row)
+            if row.etf_code is not None:
+                self._index.pop(row.etf_code, None)
+                codes.add(row.etf_code)
+        # 被移除的 ETF 再次出现时按新记录处理, 不再受旧的乱序保护时间约束
+        self._last_applied = {key: value for key, value in self._last_applied.items() if key[0] not in codes}
+        self.version += 1
+        return sorted(codes)
+
+    def validate_batch(self, data_list: list[dict[str, Any]]) -> list[tuple[int, str]]:
+        """一次性校验整批数据, 返回所有不合法数据项的 (批内序号, 错误描述)."""
+        rejected: list[tuple[int, str]] = []
+        for position, data in enumerate(data_list):
+            try:
+                route = self._resolve_route(data)
+                self._validate_data(data, route.required_fields)
+            except ValueError as e:
+                rejected.append((position, str(e)))
+        return rejected
+
+    def accept(self, data_list: list[dict[str, Any]], *, strict: bool = False) -> AcceptResult:
+        """接收并处理数据列表.
+
+        Args:
+            data_list: 数据列表
+            strict: 为True时先整批校验, 任意一项不合法则整批拒绝, 不做任何修改
+        """
+        result = AcceptResult()
+        if not data_list:
+            logger.warning("接收到空数据列表")
+            return result
+
+        if strict:
+            result.rejected = self.validate_batch(data_list)
+            if result.rejected:
+                result.errors = len(data_list)
+                log_rate_limiter.log(
+                    logger,
+                    logging.ERROR,
+                    "accept.batch",
+                    "整批数据校验失败, 共 %d 项不合法: %s",
+                    len(result.rejected),
+                    result.rejected[:5],
+                )
+                return result
+
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        for position, data in enumerate(data_list):
+            try:
+                if debug_enabled:
+                    logger.debug("开始处理数据项: %s", data)
+
+                # 根据类型查表处理数据
+                route = self._resolve_route(data)
+                self._validate_data(data, route.required_fields)
+                skip_reason = self._check_replay(data, route)
+                if skip_reason is not None:
+                    if skip_reason == "duplicate":
+                        result.duplicates += 1
+                    else:
+                        result.stale += 1
                     continue
+                self._apply(route, data)
+                result.processed += 1
+                result.changed_codes.add(data["buy_etf"])
+                self._stamp(data, result)
+
+            except ValueError as e:
+                log_rate_limiter.log(logger, logging.ERROR, "accept.value", "数据验证失败: %s", e)
+                result.failed.append((position, str(e)))
+            except KeyError as e:
+                log_rate_limiter.log(logger, logging.ERROR, "accept.key", "缺少必需字段", exc_info=True)
+                result.failed.append((position, f"缺少必需字段: {e}"))
+            except Exception as e:
+                log_rate_limiter.log(logger, logging.ERROR, "accept.other", "处理数据异常", exc_info=True)
+                result.failed.append((position, f"处理数据异常: {e}"))
+
+        result.errors = len(result.failed)
+        if result.processed:
+            self.version += 1
+        logger.info(
+            "数据处理完成: 成功 %d 条, 失败 %d 条, 重复 %d 条, 过期 %d 条",
+            result.processed,
+            result.errors,
+            result.duplicates,
+            result.stale,
+        )
+        return result
+
+    def _stamp(self, data: dict[str, Any], result: AcceptResult) -> None:
+        """记录事件的日志时间和应用时间, 用于数据年龄和延迟统计."""
+        applied_at = time.time()
+        log_time = parse_log_time(data["timestamp"])
+        final_data = self._index.get(data["buy_etf"])
+        if final_data is not None:
+            final_data.applied_at = applied_at
+            if log_time is not None and (final_data.log_time is None or log_time > final_data.log_time):
+                final_data.log_time = log_time
+        result.traces.append((data["buy_etf"], data["log_type"], log_time, applied_at))
+
+    def _resolve_route(self, data: Any) -> _IngestRoute:  # noqa: ANN401
+        """基础数据验证并查找数据项对应的入库路由.
+
+        Raises:
+            ValueError: 数据项不是字典、缺少log_type或类型未知
+        """
+        if not isinstance(data, dict):
+            msg = f"数据格式错误, 期望字典类型: {type(data).__name__}"
+            raise ValueError(msg)  # noqa: TRY004
 
-                if "log_type" not in data:
-                    logger.error("缺少log_type字段: %s", data)
-                    error_count += 1
-                    continue
+        if "log_type" not in data:
+            msg = "缺少log_type字段"
+            raise ValueError(msg)
 
-                # 根据类型处理数据
-                log_type = data["log_type"]
-                match log_type:
-                    case "加仓三线":
-                        self._handle_three_line(data)
-                        processed_count += 1
-                    case "加仓M5股票" | "加仓M10股票" | "加仓M20股票" | "加仓M0股票":
-                        self._handle_mn_stock(data)
-                        processed_count += 1
-                    case _:
-                        logger.error("未知类型数据: %s", log_type)
-                        error_count += 1
-
-            except ValueError:
-                logger.exception("数据验证失败")
-                error_count += 1
-            except KeyError:
-                logger.exception("缺少必需字段")
-                error_count += 1
-            except Exception:
-                logger.exception("处理数据异常")
-                error_count += 1
-
-        logger.info("数据处理完成: 成功 %d 条, 失败 %d 条", processed_count, error_count)
-
-    def _validate_data(self, data: dict[str, Any], required_fields: list[str]) -> None:
+        log_type = data["log_type"]
+        route = self._routes.get(log_type) if isinstance(log_type, str) else None
+        if route is None:
+            msg = f"未知类型数据: {log_type}"
+            raise ValueError(msg)
+        return route
+
+    def _apply(self, route: _IngestRoute, data: dict[str, Any]) -> None:
+        """应用一条事件, 并按该记录变化前后的差量更新汇总统计."""
+        etf_code = data["buy_etf"]
+        final_data = self._index.get(etf_code)
+        if final_data is not None:
+            self.market_stats.remove(final_data)
+        try:
+            route.handler(data)
+        finally:
+            final_data = self._index.get(etf_code)
+            if final_data is not None:
+                self.market_stats.add(final_data)
+
+    def _check_replay(self, data: dict[str, Any], route: _IngestRoute) -> str | None:
+        """检查重发和乱序事件, 需要忽略时返回原因("duplicate"/"stale"), 否则登记该事件并返回None."""
+        recent_order = self._recent_order
+        event_hash: int | None = None
+        if recent_order.maxlen:
+            try:
+                event_hash = hash((data["log_type"], *[data[name] for name in route.required_fields]))
+            except TypeError:
+                # 字段值不可哈希时不参与去重
+                event_hash = None
+            if event_hash is not None and event_hash in self._recent_events:
+                return "duplicate"
+
+        timestamp = data["timestamp"]
+        order_key = (data["buy_etf"], data["log_type"])
+        last_applied = self._last_applied.get(order_key)
+        if self.drop_stale and last_applied is not None and timestamp < last_applied:
+            return "stale"
+
+        if last_applied is None or timestamp > last_applied:
+            self._last_applied[order_key] = timestamp
+        if event_hash is not None:
+            if len(recent_order) == recent_order.maxlen:
+                self._recent_events.discard(recent_order[0])
+            recent_order.append(event_hash)
+            self._recent_events.add(event_hash)
+        return None
+
+    def _validate_data(self, data: dict[str, Any], required_fields: Sequence[str]) -> None:
         """验证数据完整性."""
-        missing_fields = [field for field in required_fields if field not in data or data[field] is None]
+        missing_fields = [name for name in required_fields if name not in data or data[name] is None]
         if missing_fields:
             msg = f"缺少必需字段: {missing_fields}"
             raise ValueError(msg)
@@ -197,20 +566,30 @@ class DataHandler:
     def _get_stock_name_safely(self, etf_code: str) -> str:
         """安全获取股票名称."""
         try:
-            stock_info = get_stock_name(etf_code)
+            stock_info = self.stock_name_lookup(etf_code)
             return stock_info["name"] if stock_info else etf_code
         except (ValueError, KeyError, TypeError, ConnectionError) as e:
-            logger.warning("获取股票名称失败 %s: %s", etf_code, e)
+            log_rate_limiter.log(logger, logging.WARNING, "stock_name", "获取股票名称失败 %s: %s", etf_code, e)
             return etf_code
 
     def _get_or_create_final_data(self, etf_code: str) -> FinalDataLine:
         """获取或创建数据记录."""
-        final_data = self.get_data_by_code(etf_code)
+        final_data = self._index.get(etf_code)
         if final_data is None:
             final_data = FinalDataLine(etf_code=etf_code, etf_name=self._get_stock_name_safely(etf_code))
             self.data_record.append(final_data)
+            self._index[etf_code] = final_data
         return final_data
 
+    @staticmethod
+    def _touch_update_time(final_data: FinalDataLine, timestamp: str) -> None:
+        """更新记录时间, 只前进不后退(其他类型的较早事件不会把时间改回去)."""
+        if not timestamp:
+            return
+        update_time = timestamp[:19]
+        if final_data.update_time is None or update_time > final_data.update_time:
+            final_data.update_time = update_time
+
     def _handle_three_line(self, data: dict[str, Any]) -> None:
         """处理加仓三线数据.
 
@@ -224,17 +603,14 @@ class DataHandler:
             "m10": 1.635,
             "m20": 1.624
         }.
-        """
-        # 验证必需字段
-        required_fields = ["buy_etf", "timestamp", "last_price", "m5", "m10", "m20"]
-        self._validate_data(data, required_fields)
 
+        必需字段已由入库路由校验.
+        """
         # 获取或创建数据记录
         final_data = self._get_or_create_final_data(data["buy_etf"])
 
         # 更新数据(时间格式化为前19个字符)
-        timestamp = data["timestamp"]
-        final_data.update_time = timestamp[:19] if timestamp else None
+        self._touch_update_time(final_data, data["timestamp"])
         final_data.latest_price = data["last_price"]
 
         # 计算价格比较(添加安全检查)
@@ -243,9 +619,24 @@ class DataHandler:
             final_data.greater_than_m10_price = final_data.latest_price > data["m10"]
             final_data.greater_than_m20_price = final_data.latest_price > data["m20"]
 
-        self.cal_score()
+        self._cal_row_score(final_data)
+
+    def _bind_mn_stock(
+        self,
+        apply_position: Callable[[FinalDataLine, float, dict[str, Any]], None],
+    ) -> Callable[[dict[str, Any]], None]:
+        """为某个加仓Mn股票类型绑定仓位写入函数, 返回该类型的处理函数."""
+
+        def handler(data: dict[str, Any]) -> None:
+            self._handle_mn_stock(data, apply_position)
+
+        return handler
 
-    def _handle_mn_stock(self, data: dict[str, Any]) -> None:
+    def _handle_mn_stock(
+        self,
+        data: dict[str, Any],
+        apply_position: Callable[[FinalDataLine, float, dict[str, Any]], None],
+    ) -> None:
         """处理加仓Mn股票数据.
 
         新的数据结构:
@@ -257,48 +648,27 @@ class DataHandler:
             "total_count": 31,
             "last_price": 0.583,
         }.
-        """
-        # 验证必需字段
-        required_fields = [
-            "buy_etf",
-            "timestamp",
-            "rise_count",
-            "total_count",
-            "last_price",
-        ]
-        self._validate_data(data, required_fields)
 
+        必需字段已由入库路由校验, apply_position 为该类型预先绑定的仓位写入函数.
+        """
         # 获取或创建数据记录
         final_data = self._get_or_create_final_data(data["buy_etf"])
 
         # 更新基础数据(时间格式化为前19个字符)
-        timestamp = data["timestamp"]
-        final_data.update_time = timestamp[:19] if timestamp else None
-        data_type = data["log_type"]
+        self._touch_update_time(final_data, data["timestamp"])
 
         # 安全计算仓位: 涨的数量 / 总的数量
         total_count = data["total_count"]
         if total_count == 0:
-            logger.warning("总数量为0, 无法计算仓位: %s", data)
+            log_rate_limiter.log(logger, logging.WARNING, "mn_stock.zero_total", "总数量为0, 无法计算仓位: %s", data)
             calculated_position = 0.0
         else:
             calculated_position = round(data["rise_count"] / total_count, 2)
 
-        # 使用字典映射简化条件判断
-        type_mapping: dict[str, Any] = {
-            "加仓M5股票": lambda: self._handle_m5_stock(final_data, calculated_position, data),
-            "加仓M10股票": lambda: setattr(final_data, "m10_percent", calculated_position),
-            "加仓M20股票": lambda: setattr(final_data, "m20_percent", calculated_position),
-            "加仓M0股票": lambda: setattr(final_data, "m0_percent", calculated_position),
-        }
-
-        if data_type in type_mapping:
-            type_mapping[data_type]()
-        else:
-            logger.warning("未知的股票类型: %s", data_type)
+        apply_position(final_data, calculated_position, data)
 
-        self.cal_ma_mean()
-        self.cal_score()
+        self._cal_row_ma_mean(final_data)
+        self._cal_row_score(final_data)
 
     def _handle_m5_stock(
         self,
@@ -307,42 +677,49 @@ class DataHandler:
         data: dict[str, Any],
     ) -> None:
         """处理M5股票的特殊逻辑."""
+        # m5_signal 由主评分策略的信号规则在 _cal_row_score 中计算
         final_data.m5_percent = calculated_position
-        final_data.m5_signal = "多" if final_data.m5_percent > SCORE_THRESHOLD else "空"
         final_data.growth_stock_count = data["rise_count"]
         final_data.total_stock_count = data["total_count"]
 
     def cal_ma_mean(self) -> None:
         """计算MA均值."""
         for data in self.data_record:
-            # 只有当三个百分比都存在时才计算均值
-            if data.m5_percent is not None and data.m10_percent is not None and data.m20_percent is not None:
-                ma_mean = (data.m5_percent + data.m10_percent + data.m20_percent) / 3
-                data.ma_mean_ratio = round(ma_mean, 2)
-            else:
-                data.ma_mean_ratio = None
+            self._cal_row_ma_mean(data)
 
     def cal_score(self) -> None:
         """计算分数."""
-        # 判断[m5,m10,m20,m0]Percent是否大于阈值 大于则算一分
-        # 如果 greater_than_m5_price,greater_than_m10_price,greater_than_m20_price 都为True 则算一分
         for data in self.data_record:
-            total_score = 0
-            if data.m5_percent is not None and data.m5_percent > SCORE_THRESHOLD:
-                total_score += 1
-            if data.m10_percent is not None and data.m10_percent > SCORE_THRESHOLD:
-                total_score += 1
-            if data.m20_percent is not None and data.m20_percent > SCORE_THRESHOLD:
-                total_score += 1
-            if data.m0_percent is not None and data.m0_percent > SCORE_THRESHOLD:
-                total_score += 1
-            if data.ma_mean_ratio is not None and data.ma_mean_ratio > SCORE_THRESHOLD:
-                total_score += 1
-            if data.greater_than_m5_price is True:
-                total_score += 1
-            if data.greater_than_m10_price is True:
-                total_score += 1
-            if data.greater_than_m20_price is True:
-                total_score += 1
-
-            data.total_score = total_score
+            self._cal_row_score(data)
+
+    @staticmethod
+    def _cal_row_ma_mean(data: FinalDataLine) -> None:
+        """计算单条记录的MA均值."""
+        # 只有当三个百分比都存在时才计算均值
+        if data.m5_percent is not None and data.m10_percent is not None and data.m20_percent is not None:
+            ma_mean = (data.m5_percent + data.m10_percent + data.m20_percent) / 3
+            data.ma_mean_ratio = round(ma_mean, 2)
+        else:
+            data.ma_mean_ratio = None
+
+    def _cal_row_score(self, data: FinalDataLine) -> None:
+        """计算单条记录在所有评分策略下的分数和信号.
+
+        主策略的分数写入 total_score, 信号写入 m5_signal(无信号时保持原值).
+        """
+        scores, signals = self.scoring.evaluate(data)
+        data.strategy_scores = scores
+        data.strategy_signals = signals
+        data.total_score = scores.get(DEFAULT_STRATEGY_NAME)
+        signal = signals.get(DEFAULT_STRATEGY_NAME)
+        if signal is not None:
+            data.m5_signal = signal
+
+
+def _percent_setter(field_name: str) -> Callable[[FinalDataLine, float, dict[str, Any]], None]:
+    """创建写入指定仓位字段的函数."""
+
+    def apply_position(final_data: FinalDataLine, calculated_position: float, _data: dict[str, Any]) -> None:
+        setattr(final_data, field_name, calculated_position)
+
+    return apply_position
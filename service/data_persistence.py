@@ -2,18 +2,48 @@ from __future__ import annotations
 
 import json
 import logging
+import sqlite3
 import threading
 import time
 from pathlib import Path
 from typing import TYPE_CHECKING, Any
 
 if TYPE_CHECKING:
-    from collections.abc import Callable
+    from collections.abc import Callable, Iterable
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
 
+# 记录字典键 -> (SQLite 列名, 列类型), 其余键(如 strategyScores)以 JSON 存入 extra 列
+SQLITE_COLUMNS: tuple[tuple[str, str, str], ...] = (
+    ("etfCode", "etf_code", "TEXT PRIMARY KEY"),
+    ("updateTime", "update_time", "TEXT"),
+    ("etfName", "etf_name", "TEXT"),
+    ("m5Signal", "m5_signal", "TEXT"),
+    ("totalScore", "total_score", "NUMERIC"),
+    ("m5Percent", "m5_percent", "REAL"),
+    ("m10Percent", "m10_percent", "REAL"),
+    ("m20Percent", "m20_percent", "REAL"),
+    ("maMeanRatio", "ma_mean_ratio", "REAL"),
+    ("m0Percent", "m0_percent", "REAL"),
+    ("greaterThanM5Price", "greater_than_m5_price", "BOOLEAN"),
+    ("greaterThanM10Price", "greater_than_m10_price", "BOOLEAN"),
+    ("greaterThanM20Price", "greater_than_m20_price", "BOOLEAN"),
+    ("growthStockCount", "growth_stock_count", "INTEGER"),
+    ("totalStockCount", "total_stock_count", "INTEGER"),
+    ("latestPrice", "latest_price", "REAL"),
+)
+SQLITE_TABLE = "etf_rows"
+# SQLite 没有布尔类型, 读取时把 0/1 还原为布尔值
+_BOOLEAN_KEYS = frozenset(key for key, _, column_type in SQLITE_COLUMNS if column_type == "BOOLEAN")
+_COLUMN_KEYS = frozenset(key for key, _, _ in SQLITE_COLUMNS)
+
+
+# 按文件后缀识别 SQLite 数据库
+SQLITE_SUFFIXES = frozenset({".sqlite", ".sqlite3", ".db"})
+
+
 class DataPersistence:
     """数据持久化服务, 负责数据的保存、加载和自动保存功能."""
 
@@ -99,3 +129,144 @@ class DataPersistence:
 
         self.auto_save_thread = None
         logger.info("自动保存线程已停止")
+
+
+class SqlitePersistence(DataPersistence):
+    """SQLite(WAL 模式)持久化后端.
+
+    每行一条记录, 以 etfCode 为主键; 每个批次只 upsert 被修改的行, 写入成本与变化量成正比.
+    WAL 模式下其他进程可以在写入的同时直接查询数据库文件, 不需要经过 Flask.
+    """
+
+    def __init__(self, data_file_path: str = "data_record.sqlite3") -> None:
+        super().__init__(data_file_path)
+        self._conn: sqlite3.Connection | None = None
+        columns = [column for _, column, _ in SQLITE_COLUMNS]
+        updates = ", ".join(f"{column} = excluded.{column}" for column in [*columns[1:], "extra"])
+        self._upsert_sql = (
+            f"INSERT INTO {SQLITE_TABLE} ({', '.join(columns)}, extra) "  # noqa: S608
+            f"VALUES ({', '.join('?' * (len(columns) + 1))}) "
+            f"ON CONFLICT(etf_code) DO UPDATE SET {updates}"
+        )
+        self._select_sql = f"SELECT {', '.join(columns)}, extra FROM {SQLITE_TABLE} ORDER BY rowid"  # noqa: S608
+
+    def _connection(self) -> sqlite3.Connection:
+        """获取数据库连接, 首次使用时创建并初始化表结构. 调用方需持有 self.lock."""
+        if self._conn is None:
+            self.data_file_path.parent.mkdir(parents=True, exist_ok=True)
+            # 由调用方显式管理事务; 连接在多个线程间共用, 由 self.lock 串行化
+            conn = sqlite3.connect(self.data_file_path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            column_defs = ", ".join(f"{column} {column_type}" for _, column, column_type in SQLITE_COLUMNS)
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {SQLITE_TABLE} ({column_defs}, extra TEXT)")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _to_params(row: dict[str, Any]) -> tuple[Any, ...]:
+        """记录字典转换为一行的参数."""
+        extra = {key: value for key, value in row.items() if key not in _COLUMN_KEYS}
+        values = [row.get(key) for key, _, _ in SQLITE_COLUMNS]
+        return (*values, json.dumps(extra, ensure_ascii=False) if extra else None)
+
+    @staticmethod
+    def _from_row(values: tuple[Any, ...]) -> dict[str, Any]:
+        """数据库中的一行转换为记录字典."""
+        row = {key: values[i] for i, (key, _, _) in enumerate(SQLITE_COLUMNS)}
+        for key in _BOOLEAN_KEYS:
+            if row[key] is not None:
+                row[key] = bool(row[key])
+        extra = values[-1]
+        if extra:
+            row.update(json.loads(extra))
+        return row
+
+    def upsert_rows(self, rows: Iterable[dict[str, Any]]) -> bool:
+        """在一个事务内写入(插入或更新)指定的行."""
+        params = [self._to_params(row) for row in rows]
+        if not params:
+            return True
+        try:
+            with self.lock:
+                conn = self._connection()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.executemany(self._upsert_sql, params)
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+                conn.execute("COMMIT")
+        except Exception:
+            logger.exception("写入数据库失败: %s", self.data_file_path)
+            return False
+        logger.debug("已写入 %d 行到 %s", len(params), self.data_file_path)
+        return True
+
+    def save_data(self, data_list: list[dict[str, Any]]) -> bool:
+        """用完整的数据列表替换数据库内容(同一事务内 upsert 全部行并删除已不存在的行)."""
+        params = [self._to_params(row) for row in data_list]
+        try:
+            with self.lock:
+                conn = self._connection()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.executemany(self._upsert_sql, params)
+                    codes = [row.get("etfCode") for row in data_list]
+                    conn.execute("CREATE TEMP TABLE IF NOT EXISTS keep_codes (etf_code TEXT PRIMARY KEY)")
+                    conn.execute("DELETE FROM keep_codes")
+                    conn.executemany("INSERT OR IGNORE INTO keep_codes VALUES (?)", [(code,) for code in codes])
+                    conn.execute(
+                        f"DELETE FROM {SQLITE_TABLE} WHERE etf_code NOT IN (SELECT etf_code FROM keep_codes)",  # noqa: S608
+                    )
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+                conn.execute("COMMIT")
+        except Exception:
+            logger.exception("保存数据失败")
+            return False
+        logger.info("数据已保存到 %s, 共 %d 条记录", self.data_file_path, len(data_list))
+        return True
+
+    def load_data(self) -> list[dict[str, Any]]:
+        """一次查询加载全部记录."""
+        if not self.data_file_path.exists():
+            logger.warning("数据库文件不存在: %s, 将从空数据开始", self.data_file_path)
+            return []
+        try:
+            with self.lock:
+                rows = self._connection().execute(self._select_sql).fetchall()
+            data_list = [self._from_row(values) for values in rows]
+        except (sqlite3.Error, ValueError):
+            logger.exception("加载数据失败")
+            return []
+        logger.info("从 %s 加载了 %d 条记录", self.data_file_path, len(data_list))
+        return data_list
+
+    def close(self) -> None:
+        """关闭数据库连接."""
+        with self.lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def create_persistence(data_file_path: str | Path, backend: str = "json") -> DataPersistence:
+    """按后端名称创建持久化服务.
+
+    Raises:
+        ValueError: 未知的后端名称
+    """
+    if backend == "json":
+        return DataPersistence(str(data_file_path))
+    if backend == "sqlite":
+        return SqlitePersistence(str(data_file_path))
+    msg = f"未知的持久化后端: {backend}"
+    raise ValueError(msg)
+
+
+def persistence_for_path(data_file_path: str | Path) -> DataPersistence:
+    """按文件后缀选择持久化后端: .sqlite/.sqlite3/.db 使用 SQLite, 其他使用 JSON."""
+    backend = "sqlite" if Path(data_file_path).suffix in SQLITE_SUFFIXES else "json"
+    return create_persistence(data_file_path, backend)
@@ -3,22 +3,37 @@ from __future__ import annotations
 import logging
 import re
 import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
 
 import requests
 
 from config import config
 
+if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+
 # 配置日志
 logger = logging.getLogger(__name__)
 
 # 常量定义
-HTTP_OK = 200  # HTTP 成功状态码
+# 每个渠道保留的最近耗时样本数
+LATENCY_WINDOW = 50
+# 熔断器状态
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
 
 
 def query_sina_api(stock_code: str) -> str | None:
     """使用新浪财经API查询.
 
+    网络错误和非 200 响应抛出 requests.RequestException(计入渠道的失败统计), 查不到时返回 None.
+
     Args:
         stock_code: 完整股票代码, 如 "513050.SH" 或 "513050.SZ"
     """
@@ -40,7 +55,7 @@ def query_sina_api(stock_code: str) -> str | None:
             data = content.split('"')[1].split(",")
             if len(data) > 0 and data[0]:
                 return str(data[0])  # 股票名称在第一个位置
-    except (ValueError, ConnectionError, TimeoutError) as e:
+    except (ValueError, IndexError) as e:
         logger.debug("新浪API查询失败: %s", e)
     return None
 
@@ -48,6 +63,8 @@ def query_sina_api(stock_code: str) -> str | None:
 def query_eastmoney_api(stock_code: str) -> str | None:
     """使用东方财富API查询.
 
+    网络错误和非 200 响应抛出 requests.RequestException, 查不到时返回 None.
+
     Args:
         stock_code: 完整股票代码, 如 "513050.SH" 或 "513050.SZ"
     """
@@ -63,11 +80,11 @@ def query_eastmoney_api(stock_code: str) -> str | None:
 
         url = f"http://push2.eastmoney.com/api/qt/stock/get?secid={market_id}.{code}&fields=f57,f58,f107,f162"
         response = requests.get(url, timeout=config.stock_api_timeout)
-        if response.status_code == HTTP_OK:
-            data = response.json()
-            if data.get("data") and data["data"].get("f58"):
-                return str(data["data"]["f58"])
-    except (ValueError, ConnectionError, TimeoutError) as e:
+        response.raise_for_status()
+        data = response.json()
+        if data.get("data") and data["data"].get("f58"):
+            return str(data["data"]["f58"])
+    except (ValueError, AttributeError) as e:
         logger.debug("东方财富API查询失败: %s", e)
     return None
 
@@ -75,6 +92,8 @@ def query_eastmoney_api(stock_code: str) -> str | None:
 def query_tencent_api(stock_code: str) -> str | None:
     """使用腾讯财经API查询.
 
+    网络错误和非 200 响应抛出 requests.RequestException, 查不到时返回 None.
+
     Args:
         stock_code: 完整股票代码, 如 "513050.SH" 或 "513050.SZ"
     """
@@ -89,13 +108,13 @@ def query_tencent_api(stock_code: str) -> str | None:
 
         url = f"http://qt.gtimg.cn/q={prefix}{code}"
         response = requests.get(url, timeout=config.stock_api_timeout)
-        if response.status_code == HTTP_OK:
-            content = response.text
-            if "~" in content:
-                data = content.split("~")
-                if len(data) > 1 and data[1]:
-                    return str(data[1])  # 股票名称
-    except (ValueError, ConnectionError, TimeoutError) as e:
+        response.raise_for_status()
+        content = response.text
+        if "~" in content:
+            data = content.split("~")
+            if len(data) > 1 and data[1]:
+                return str(data[1])  # 股票名称
+    except ValueError as e:
         logger.debug("腾讯API查询失败: %s", e)
     return None
 
@@ -141,9 +160,241 @@ def validate_stock_code(stock_code: str) -> bool:
     return normalized is not None
 
 
+@dataclass
+class ProviderHealth:
+    """单个查询渠道的耗时、错误统计和熔断状态.
+
+    连续失败 failure_threshold 次后熔断 cooldown 秒; 冷却结束后进入半开状态,
+    放行一次探测请求, 成功则恢复, 失败则重新熔断.
+    """
+
+    name: str
+    query: Callable[[str], str | None]
+    failure_threshold: int = 3
+    cooldown: float = 60.0
+    # 最近的请求耗时(秒), 失败请求也计入, 超时的渠道中位数会随之变大
+    latencies: deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+    requests: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    # 作为首选渠道发出的次数 / 作为对冲请求发出的次数 / 返回被采用结果的次数
+    primary: int = 0
+    hedged: int = 0
+    wins: int = 0
+    open_until: float = 0.0
+    # 半开状态下是否已有探测请求在进行
+    probing: bool = False
+
+    def state(self, now: float) -> str:
+        """熔断器状态."""
+        if self.consecutive_failures < self.failure_threshold:
+            return CIRCUIT_CLOSED
+        return CIRCUIT_OPEN if now < self.open_until else CIRCUIT_HALF_OPEN
+
+    def quantile(self, q: float) -> float | None:
+        """最近耗时的分位数(秒), 没有样本时返回 None."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def record(self, elapsed: float, *, ok: bool, now: float) -> None:
+        """记录一次请求的结果."""
+        self.latencies.append(elapsed)
+        self.requests += 1
+        self.probing = False
+        if ok:
+            self.consecutive_failures = 0
+            return
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            if self.open_until <= now:
+                logger.warning("%s 连续失败 %d 次, 熔断 %.0f 秒", self.name, self.consecutive_failures, self.cooldown)
+            self.open_until = now + self.cooldown
+
+    def to_dict(self, now: float) -> dict[str, Any]:
+        """转换为字典."""
+        p50, p90 = self.quantile(0.5), self.quantile(0.9)
+        return {
+            "name": self.name,
+            "state": self.state(now),
+            "p50Ms": None if p50 is None else round(p50 * 1000, 1),
+            "p90Ms": None if p90 is None else round(p90 * 1000, 1),
+            "samples": len(self.latencies),
+            "requests": self.requests,
+            "failures": self.failures,
+            "consecutiveFailures": self.consecutive_failures,
+            "primary": self.primary,
+            "hedged": self.hedged,
+            "wins": self.wins,
+        }
+
+
+class HedgedNameResolver:
+    """按延迟选择渠道并对冲的股票名称查询.
+
+    每次查询先发给最近中位耗时最低的可用渠道, 在自适应的对冲延迟(该渠道最近 p90 耗时,
+    限制在 [hedge_min, hedge_max] 内)内没有结果才发出下一个渠道的请求; 渠道失败或查不到时
+    立即尝试下一个. 正常情况下每次查询只请求一个上游, 慢或故障的渠道会被自动降级和熔断.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        providers: Sequence[tuple[str, Callable[[str], str | None]]],
+        *,
+        max_workers: int = 3,
+        hedge_min: float = 0.05,
+        hedge_max: float = 1.0,
+        failure_threshold: int = 3,
+        cooldown: float = 60.0,
+    ) -> None:
+        """初始化.
+
+        Args:
+            providers: (渠道名称, 查询函数) 列表, 顺序作为没有耗时样本时的优先级
+            max_workers: 查询线程数
+            hedge_min: 对冲延迟下限(秒)
+            hedge_max: 对冲延迟上限(秒), 渠道还没有耗时样本时使用
+            failure_threshold: 连续失败多少次后熔断
+            cooldown: 熔断时长(秒)
+        """
+        self.providers = [
+            ProviderHealth(name, query, failure_threshold=failure_threshold, cooldown=cooldown)
+            for name, query in providers
+        ]
+        self.hedge_min = hedge_min
+        self.hedge_max = hedge_max
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stock-name")
+
+    def _plan(self) -> list[ProviderHealth]:
+        """确定本次查询的渠道顺序.
+
+        半开渠道排在最前(作为探测, 对冲延迟取下限), 然后是按中位耗时排序的正常渠道,
+        没有耗时样本的渠道排在有样本的之后; 熔断中的渠道跳过, 全部熔断时按中位耗时全部尝试.
+        """
+        now = time.monotonic()
+
+        def by_latency(provider: ProviderHealth) -> tuple[bool, float]:
+            p50 = provider.quantile(0.5)
+            return p50 is None, p50 or 0.0
+
+        with self._lock:
+            probes: list[ProviderHealth] = []
+            closed: list[ProviderHealth] = []
+            for provider in self.providers:
+                state = provider.state(now)
+                if state == CIRCUIT_CLOSED:
+                    closed.append(provider)
+                elif state == CIRCUIT_HALF_OPEN and not provider.probing:
+                    provider.probing = True
+                    probes.append(provider)
+            plan = probes + sorted(closed, key=by_latency)
+            return plan or sorted(self.providers, key=by_latency)
+
+    def _hedge_delay(self, provider: ProviderHealth) -> float:
+        """发出 provider 的请求后, 等待多久再发出下一个渠道的请求."""
+        with self._lock:
+            if provider.state(time.monotonic()) != CIRCUIT_CLOSED:
+                return self.hedge_min
+            p90 = provider.quantile(0.9)
+        if p90 is None:
+            return self.hedge_max
+        return min(max(p90, self.hedge_min), self.hedge_max)
+
+    def _call(self, provider: ProviderHealth, stock_code: str) -> str | None:
+        """在工作线程中调用渠道并记录耗时和结果(包括对冲中落败的请求)."""
+        start = time.monotonic()
+        try:
+            result = provider.query(stock_code)
+        except (requests.RequestException, ValueError) as e:
+            now = time.monotonic()
+            with self._lock:
+                provider.record(now - start, ok=False, now=now)
+            logger.debug("%s查询失败: %s", provider.name, e)
+            raise
+        now = time.monotonic()
+        with self._lock:
+            provider.record(now - start, ok=True, now=now)
+        return result
+
+    def resolve(self, stock_code: str) -> tuple[str, str] | None:
+        """查询股票名称.
+
+        Args:
+            stock_code: 标准化后的股票代码
+
+        Returns:
+            (渠道名称, 股票名称), 所有渠道都查不到或失败时返回 None
+        """
+        plan = self._plan()
+        pending: dict[Future[str | None], ProviderHealth] = {}
+        launched = 0
+
+        def launch(*, hedge: bool) -> ProviderHealth:
+            nonlocal launched
+            provider = plan[launched]
+            launched += 1
+            with self._lock:
+                if hedge:
+                    provider.hedged += 1
+                else:
+                    provider.primary += 1
+            pending[self._executor.submit(self._call, provider, stock_code)] = provider
+            return provider
+
+        latest = launch(hedge=False)
+        while pending:
+            timeout = self._hedge_delay(latest) if launched < len(plan) else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # 对冲: 当前渠道在预期时间内没有返回, 发出下一个渠道的请求
+                latest = launch(hedge=True)
+                continue
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    name = future.result()
+                except (requests.RequestException, ValueError):
+                    name = None
+                if name and name.strip():
+                    with self._lock:
+                        provider.wins += 1
+                    # 仍在进行的请求不等待, 其结果只用于统计
+                    return provider.name, name.strip()
+            if not pending and launched < len(plan):
+                # 已发出的渠道都失败或查不到, 立即尝试下一个
+                latest = launch(hedge=False)
+        return None
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        """各渠道的统计和熔断状态."""
+        now = time.monotonic()
+        with self._lock:
+            return [provider.to_dict(now) for provider in self.providers]
+
+
+# 所有查询渠道, 顺序作为没有耗时样本时的优先级
+STOCK_NAME_PROVIDERS: list[tuple[str, Callable[[str], str | None]]] = [
+    ("新浪财经API", query_sina_api),
+    ("东方财富API", query_eastmoney_api),
+    ("腾讯财经API", query_tencent_api),
+]
+
+name_resolver = HedgedNameResolver(
+    STOCK_NAME_PROVIDERS,
+    max_workers=config.stock_api_max_workers,
+    hedge_min=config.stock_api_hedge_min_ms / 1000,
+    hedge_max=config.stock_api_hedge_max_ms / 1000,
+    failure_threshold=config.stock_api_breaker_failures,
+    cooldown=config.stock_api_breaker_cooldown,
+)
+
+
 def get_stock_name(stock_code: str) -> dict[str, str] | None:
     """
-    使用多个数据源并行查询股票名称.
+    查询股票名称, 优先使用最近最快的渠道, 超过对冲延迟才请求其他渠道.
 
     Args:
         stock_code (str): 股票代码, 支持格式: "513050.SH", "513050.SZ", "SH513050", "SZ513050"
@@ -160,40 +411,16 @@ def get_stock_name(stock_code: str) -> dict[str, str] | None:
 
     logger.debug("标准化后的股票代码: %s", normalized_code)
 
-    # 定义所有查询方法和对应的渠道名称
-    query_methods = [
-        ("新浪财经API", query_sina_api),
-        ("东方财富API", query_eastmoney_api),
-        ("腾讯财经API", query_tencent_api),
-    ]
-
-    # 使用线程池并行查询
-    with ThreadPoolExecutor(max_workers=config.stock_api_max_workers) as executor:
-        # 提交所有查询任务, 使用标准化的完整代码(包含.SH/.SZ后缀)
-        future_to_source = {
-            executor.submit(method, normalized_code): source_name for source_name, method in query_methods
+    # 使用标准化的完整代码(包含.SH/.SZ后缀)查询
+    resolved = name_resolver.resolve(normalized_code)
+    if resolved:
+        source_name, name = resolved
+        return {
+            "code": normalized_code,
+            "name": name,
+            "source": source_name,
         }
 
-        # 获取第一个成功的结果
-        for future in as_completed(future_to_source):
-            source_name = future_to_source[future]
-            try:
-                result = future.result()
-                if result:
-                    # 取消其他未完成的任务
-                    for f in future_to_source:
-                        if f != future:
-                            f.cancel()
-
-                    return {
-                        "code": normalized_code,
-                        "name": result.strip(),  # 去除可能的空白字符
-                        "source": source_name,
-                    }
-            except (ValueError, ConnectionError, TimeoutError) as e:
-                logger.debug("%s查询失败: %s", source_name, e)
-                continue
-
     logger.warning("所有API都未能查询到股票信息: %s", normalized_code)
     return None
 
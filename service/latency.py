@@ -0,0 +1,275 @@
+"""端到端延迟追踪: 记录信号从 QMT 日志到用户屏幕的各阶段耗时.
+
+阶段(均为 epoch 秒, 时间差以毫秒统计):
+    log       QMT 写日志的时间(事件 timestamp, 保留毫秒)
+    receive   服务端收到请求的时间(submit_data / 批量导入的每个批次)
+    apply     DataHandler.accept 应用该事件的时间
+    publish   持久化和共享状态发布完成、释放命名空间锁的时间, 此后读接口即可看到
+    serve     读接口把该记录返回给客户端的时间
+
+统计的延迟:
+    receive     log -> receive, 采集和网络耗时(包含 QMT 与服务端的时钟偏差)
+    apply       receive -> apply, 等锁和处理耗时
+    publish     apply -> publish, 持久化和发布耗时
+    end_to_end  log -> publish
+    serve       log -> serve, 客户端看到数据时数据的年龄(按 ETF 统计)
+"""
+
+from __future__ import annotations
+
+import bisect
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any
+
+from config import log_rate_limiter
+from trading_calendar import EXCHANGE_TZ
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from data_handler import AcceptResult
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+STAGES = ("receive", "apply", "publish", "end_to_end", "serve")
+# 直方图桶的上界(毫秒), 最后一个桶收纳超出范围的样本
+BUCKET_BOUNDS_MS: tuple[float, ...] = (
+    1,
+    2,
+    5,
+    10,
+    20,
+    50,
+    100,
+    200,
+    500,
+    1000,
+    2000,
+    5000,
+    10000,
+    30000,
+    60000,
+    120000,
+    300000,
+    float("inf"),
+)
+# 统计维度
+DIMENSION_ETF = "etf"
+DIMENSION_LOG_TYPE = "log_type"
+DIMENSIONS = (DIMENSION_ETF, DIMENSION_LOG_TYPE)
+# 维度 -> 导出字典中的键
+DIMENSION_KEYS = {DIMENSION_ETF: "byEtf", DIMENSION_LOG_TYPE: "byLogType"}
+
+
+@lru_cache(maxsize=4096)
+def _epoch_seconds(second_prefix: str) -> float:
+    return datetime.fromisoformat(second_prefix).replace(tzinfo=EXCHANGE_TZ).timestamp()
+
+
+def parse_log_time(timestamp: str | None) -> float | None:
+    """QMT 事件时间 "YYYY-MM-DD HH:MM:SS,mmm"(交易所时间) 转换为 epoch 秒, 无法解析时返回 None.
+
+    同一秒内的事件很多, 按秒缓存解析结果, 毫秒部分单独加上.
+    """
+    if not timestamp or len(timestamp) < 19:  # noqa: PLR2004
+        return None
+    try:
+        seconds = _epoch_seconds(timestamp[:19])
+        millis = int(timestamp[20:23]) if len(timestamp) >= 23 else 0  # noqa: PLR2004
+    except ValueError:
+        return None
+    return seconds + millis / 1000
+
+
+def to_epoch_ms(seconds: float | None) -> int | None:
+    """将 epoch 秒转换为整数毫秒."""
+    return None if seconds is None else round(seconds * 1000)
+
+
+def from_epoch_ms(millis: Any) -> float | None:  # noqa: ANN401
+    """将整数毫秒(来自持久化数据, 可能缺失或类型不对)转换为 epoch 秒."""
+    return millis / 1000 if isinstance(millis, int | float) and not isinstance(millis, bool) else None
+
+
+@dataclass
+class LatencyHistogram:
+    """固定桶的延迟直方图(毫秒)."""
+
+    # 超出预算的阈值(毫秒), 0 表示不统计
+    budget_ms: float = 0.0
+    counts: list[int] = field(default_factory=lambda: [0] * len(BUCKET_BOUNDS_MS))
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    over_budget: int = 0
+
+    def add(self, value_ms: float) -> None:
+        """记录一个样本, 负值(时钟偏差)按 0 计."""
+        value_ms = max(value_ms, 0.0)
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS_MS, value_ms)] += 1
+        self.count += 1
+        self.total_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+        if self.budget_ms and value_ms > self.budget_ms:
+            self.over_budget += 1
+
+    def quantile(self, q: float) -> float | None:
+        """按桶估算分位数(返回所在桶的上界, 最后一个桶返回最大值)."""
+        if not self.count:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for bound, bucket_count in zip(BUCKET_BOUNDS_MS, self.counts, strict=True):
+            cumulative += bucket_count
+            if cumulative >= target and bucket_count:
+                return round(min(bound, self.max_ms), 1)
+        return round(self.max_ms, 1)
+
+    def to_dict(self, *, with_buckets: bool = False) -> dict[str, Any]:
+        """转换为字典."""
+        result: dict[str, Any] = {
+            "count": self.count,
+            "meanMs": round(self.total_ms / self.count, 1) if self.count else None,
+            "p50Ms": self.quantile(0.5),
+            "p90Ms": self.quantile(0.9),
+            "p99Ms": self.quantile(0.99),
+            "maxMs": round(self.max_ms, 1),
+            "overBudget": self.over_budget,
+        }
+        if with_buckets:
+            # 按上界升序的 [上界, 计数] 列表, 最后一个桶的上界为 None(无穷大)
+            result["buckets"] = [
+                [None if bound == float("inf") else bound, bucket_count]
+                for bound, bucket_count in zip(BUCKET_BOUNDS_MS, self.counts, strict=True)
+            ]
+        return result
+
+
+class LatencyTracker:
+    """按阶段统计延迟直方图: 全部、按 ETF、按 log_type 三个维度, 线程安全."""
+
+    def __init__(self, budget_ms: float = 0.0) -> None:
+        """初始化.
+
+        Args:
+            budget_ms: 端到端延迟预算(毫秒), 超出时计数并输出限流告警, 0 表示不告警
+        """
+        self.budget_ms = budget_ms
+        self._lock = threading.Lock()
+        self._overall: dict[str, LatencyHistogram] = {}
+        # (阶段, 维度) -> 维度取值 -> 直方图
+        self._by_key: dict[tuple[str, str], dict[str, LatencyHistogram]] = {}
+        # etf_code -> 最近一次计入 serve 统计的 appliedAt, 同一次更新只计一次
+        self._served: dict[str | None, int] = {}
+
+    def _histogram(self, stage: str, dimension: str | None = None, key: str | None = None) -> LatencyHistogram:
+        if dimension is None:
+            histogram = self._overall.get(stage)
+            if histogram is None:
+                histogram = self._overall[stage] = LatencyHistogram(self.budget_ms)
+            return histogram
+        histograms = self._by_key.setdefault((stage, dimension), {})
+        histogram = histograms.get(key or "")
+        if histogram is None:
+            histogram = histograms[key or ""] = LatencyHistogram(self.budget_ms)
+        return histogram
+
+    def _add(self, stage: str, etf_code: str | None, log_type: str | None, value_ms: float) -> None:
+        self._histogram(stage).add(value_ms)
+        if etf_code:
+            self._histogram(stage, DIMENSION_ETF, etf_code).add(value_ms)
+        if log_type:
+            self._histogram(stage, DIMENSION_LOG_TYPE, log_type).add(value_ms)
+
+    def record_accept(self, result: AcceptResult, received_at: float, published_at: float) -> None:
+        """记录一个批次中已应用事件的各阶段延迟."""
+        if not result.traces:
+            return
+        worst_ms = 0.0
+        worst: tuple[str, str] | None = None
+        with self._lock:
+            for etf_code, log_type, log_time, applied_at in result.traces:
+                self._add("apply", etf_code, log_type, (applied_at - received_at) * 1000)
+                self._add("publish", etf_code, log_type, (published_at - applied_at) * 1000)
+                if log_time is None:
+                    continue
+                self._add("receive", etf_code, log_type, (received_at - log_time) * 1000)
+                end_to_end_ms = (published_at - log_time) * 1000
+                self._add("end_to_end", etf_code, log_type, end_to_end_ms)
+                if end_to_end_ms > worst_ms:
+                    worst_ms, worst = end_to_end_ms, (etf_code, log_type)
+        if self.budget_ms and worst is not None and worst_ms > self.budget_ms:
+            log_rate_limiter.log(
+                logger,
+                logging.WARNING,
+                "latency.budget",
+                "端到端延迟超出预算 %.0f ms: %s %s 延迟 %.0f ms",
+                self.budget_ms,
+                worst[0],
+                worst[1],
+                worst_ms,
+            )
+
+    def record_serve(self, rows: Iterable[dict[str, Any]], served_at: float) -> None:
+        """记录读接口返回的记录(to_dict 的结果)在返回时的数据年龄.
+
+        每次更新只在第一次被返回时计入(按 appliedAt 判断), 客户端反复轮询同一份数据不会重复计数,
+        统计的是"信号第一次出现在屏幕上"的延迟.
+        """
+        with self._lock:
+            for row in rows:
+                etf_code, log_time_ms, applied_at_ms = row.get("etfCode"), row.get("logTime"), row.get("appliedAt")
+                if log_time_ms is None or applied_at_ms is None or self._served.get(etf_code) == applied_at_ms:
+                    continue
+                self._served[etf_code] = applied_at_ms
+                value_ms = served_at * 1000 - log_time_ms
+                self._histogram("serve").add(value_ms)
+                if etf_code:
+                    self._histogram("serve", DIMENSION_ETF, etf_code).add(value_ms)
+
+    def reset(self) -> None:
+        """清空所有统计."""
+        with self._lock:
+            self._overall.clear()
+            self._by_key.clear()
+            self._served.clear()
+
+    def to_dict(
+        self,
+        dimensions: Iterable[str] = (DIMENSION_LOG_TYPE,),
+        *,
+        stage: str | None = None,
+        key: str | None = None,
+        with_buckets: bool = False,
+    ) -> dict[str, Any]:
+        """导出统计.
+
+        Args:
+            dimensions: 需要展开的维度(etf / log_type)
+            stage: 只导出指定阶段
+            key: 只导出维度取值等于 key 的直方图(如某个 ETF 代码)
+            with_buckets: 是否包含各桶计数
+        """
+        dimensions = [dimension for dimension in dimensions if dimension in DIMENSIONS]
+        stages = [stage] if stage else list(STAGES)
+        result: dict[str, Any] = {}
+        with self._lock:
+            for name in stages:
+                overall = self._overall.get(name)
+                entry: dict[str, Any] = {
+                    "all": overall.to_dict(with_buckets=with_buckets) if overall else LatencyHistogram().to_dict(),
+                }
+                for dimension in dimensions:
+                    histograms = self._by_key.get((name, dimension), {})
+                    entry[DIMENSION_KEYS[dimension]] = {
+                        value: histogram.to_dict(with_buckets=with_buckets)
+                        for value, histogram in sorted(histograms.items())
+                        if key is None or value == key
+                    }
+                result[name] = entry
+        return result
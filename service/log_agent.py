@@ -0,0 +1,697 @@
+"""QMT 日志采集代理: 实时跟踪策略日志, 解析后批量压缩推送到服务端.
+
+可替代 client/config/vector.yml. Vector 的内存缓冲(max_events 1000, when_full drop_newest)
+在突发流量或服务端不可达时会丢弃信号; 本代理在发送失败时把批次写入磁盘暂存目录,
+恢复后按顺序补发. 每个文件的读取位置按 (设备号, inode) 记录在检查点文件中,
+只有在批次发送成功或落盘后才推进, 重启后从上次位置继续, 不丢不漏(至多重复, 由服务端去重).
+
+解析规则复用 qmt_log_parser(与 Vector 的 multiline / parse_data / validate_data 一致).
+Linux 上用 inotify 等待文件变化, 其他平台退化为定时轮询.
+
+用法:
+    python log_agent.py C:/QMT/userdata/log --server https://dataview.example.com
+    python log_agent.py /var/log/qmt --server http://127.0.0.1:5000 --namespace termA
+    python log_agent.py --benchmark 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import ctypes
+import ctypes.util
+import gzip
+import json
+import logging
+import os
+import random
+import select
+import signal
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from config import config, setup_logging
+from qmt_log_parser import LINE_START_PATTERN, parse_message
+
+if TYPE_CHECKING:
+    from types import FrameType
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 常量定义
+LOG_FILE_PATTERN = "XtClient_FormulaOutput_*.log"
+BULK_ENDPOINT = "/data/bulk"
+DEFAULT_BATCH_SIZE = 500
+# 批次最长等待时间(秒), 到时即使未满也发送
+DEFAULT_LINGER = 1.0
+# 多行消息在没有新数据多久后视为结束(对应 Vector multiline timeout_ms)
+DEFAULT_MULTILINE_TIMEOUT = 1.0
+# 单次从一个文件读取的最大字节数, 限制追赶大文件时的内存占用
+MAX_READ_BYTES = 4 * 1024 * 1024
+DEFAULT_SPOOL_MAX_BYTES = 512 * 1024 * 1024
+# 发送失败后的重试退避(秒)
+RETRY_BACKOFF_INITIAL = 1.0
+RETRY_BACKOFF_MAX = 60.0
+# 这些状态码视为暂时性错误, 批次保留在暂存目录中重试; 其他 4xx 视为批次本身被拒绝
+RETRYABLE_STATUS = frozenset({401, 403, 408, 429})
+
+# inotify 事件掩码
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+
+
+class PollingWatcher:
+    """定时轮询: 不支持 inotify 的平台(如 Windows)使用."""
+
+    def wait(self, timeout: float) -> bool:
+        """等待 timeout 秒, 返回 True 表示需要重新扫描文件."""
+        time.sleep(max(timeout, 0))
+        return True
+
+    def close(self) -> None:
+        """无需释放资源."""
+
+
+class InotifyWatcher:
+    """基于 inotify 的目录监视, 文件有写入或新建时立即唤醒, 空闲时不消耗 CPU."""
+
+    def __init__(self, directory: Path) -> None:
+        """监视目录.
+
+        Raises:
+            OSError: inotify 不可用
+        """
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            msg = "找不到 libc"
+            raise OSError(msg)
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(self._fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"inotify_add_watch 失败: {directory}")
+
+    def wait(self, timeout: float) -> bool:
+        """等待目录内的文件变化或超时, 返回是否有变化."""
+        readable, _, _ = select.select([self._fd], [], [], max(timeout, 0))
+        if not readable:
+            return False
+        # 只关心"有变化", 事件内容无需解析, 读空队列即可
+        try:
+            while os.read(self._fd, 64 * 1024):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self) -> None:
+        """关闭 inotify 文件描述符."""
+        os.close(self._fd)
+
+
+def create_watcher(directory: Path) -> InotifyWatcher | PollingWatcher:
+    """Linux 上使用 inotify, 不可用时退化为轮询."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError) as e:
+            logger.warning("inotify 不可用, 改为轮询: %s", e)
+    return PollingWatcher()
+
+
+@dataclass
+class TailedFile:
+    """一个被跟踪的日志文件的读取状态."""
+
+    device: int
+    inode: int
+    # 下一次读取的位置(已读入的完整行之后)
+    read_offset: int
+    # 尚未结束的多行消息
+    pending: list[str] = field(default_factory=list)
+    # pending 第一行的起始位置; 已交出的消息都在该位置之前, 即可以写入检查点的位置
+    pending_offset: int = 0
+    # 最近一次读到新数据的时间(单调时钟)
+    last_data: float = 0.0
+
+    @property
+    def committed_offset(self) -> int:
+        """所有已交出消息的结束位置."""
+        return self.pending_offset if self.pending else self.read_offset
+
+
+class LogTailer:
+    """跟踪目录下匹配模式的日志文件, 按时间戳起始行合并多行消息并解析为事件."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        directory: str | Path,
+        pattern: str = LOG_FILE_PATTERN,
+        *,
+        encoding: str = "utf-8",
+        read_from: str = "end",
+        multiline_timeout: float = DEFAULT_MULTILINE_TIMEOUT,
+        checkpoints: dict[str, dict[str, int]] | None = None,
+    ) -> None:
+        """初始化.
+
+        Args:
+            directory: 日志目录
+            pattern: 日志文件名模式
+            encoding: 日志编码
+            read_from: 没有检查点的文件从何处开始读: end(启动时已存在的文件只读新增内容) 或 beginning
+            multiline_timeout: 多行消息超时(秒)
+            checkpoints: 上次保存的检查点, 文件路径 -> {"device", "inode", "offset"}
+        """
+        self.directory = Path(directory)
+        self.pattern = pattern
+        self.encoding = encoding
+        self.read_from = read_from
+        self.multiline_timeout = multiline_timeout
+        self._checkpoints = checkpoints or {}
+        self._files: dict[str, TailedFile] = {}
+        self._first_scan = True
+
+    def checkpoints(self) -> dict[str, dict[str, int]]:
+        """当前可安全保存的检查点(只包含已交出的消息)."""
+        return {
+            path: {"device": state.device, "inode": state.inode, "offset": state.committed_offset}
+            for path, state in self._files.items()
+        }
+
+    def read_events(self, now: float | None = None) -> list[dict[str, Any]]:
+        """读取所有文件的新增内容, 返回新解析出的事件(按文件名和文件内顺序)."""
+        now = time.monotonic() if now is None else now
+        messages: list[str] = []
+        seen = set()
+        for path in sorted(self.directory.glob(self.pattern)):
+            key = str(path)
+            seen.add(key)
+            try:
+                self._read_file(path, key, now, messages)
+            except OSError as e:
+                logger.warning("读取日志文件失败 %s: %s", path, e)
+        for key in list(self._files):
+            if key not in seen:
+                # 文件被删除或改名: 交出未结束的消息后停止跟踪
+                state = self._files.pop(key)
+                if state.pending:
+                    messages.append("\n".join(state.pending))
+        self._first_scan = False
+
+        events = []
+        for message in messages:
+            event = parse_message(message)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def _initial_offset(self, key: str, stat: os.stat_result) -> int:
+        saved = self._checkpoints.get(key)
+        if saved and saved.get("device") == stat.st_dev and saved.get("inode") == stat.st_ino:
+            return min(int(saved.get("offset", 0)), stat.st_size)
+        if saved:
+            logger.info("日志文件已被替换, 从头读取: %s", key)
+            return 0
+        return stat.st_size if self.read_from == "end" and self._first_scan else 0
+
+    def _read_file(self, path: Path, key: str, now: float, messages: list[str]) -> None:
+        stat = path.stat()
+        state = self._files.get(key)
+        if (
+            state is None
+            or (state.device, state.inode) != (stat.st_dev, stat.st_ino)
+            or stat.st_size < state.read_offset
+        ):
+            if state is not None:
+                logger.info("日志文件已被替换或截断, 从头读取: %s", path)
+                if state.pending:
+                    messages.append("\n".join(state.pending))
+            offset = self._initial_offset(key, stat) if state is None else 0
+            state = TailedFile(stat.st_dev, stat.st_ino, offset, pending_offset=offset, last_data=now)
+            self._files[key] = state
+
+        if stat.st_size > state.read_offset:
+            with path.open("rb") as f:
+                f.seek(state.read_offset)
+                data = f.read(min(stat.st_size - state.read_offset, MAX_READ_BYTES))
+            # 只处理完整的行, 不完整的最后一行留到下次读取
+            end = data.rfind(b"\n") + 1
+            if end:
+                self._consume(state, data[:end], messages)
+                state.last_data = now
+
+        # 多行消息超时: 一段时间没有新行, 视为该消息已结束(对应 Vector multiline timeout_ms)
+        if state.pending and now - state.last_data >= self.multiline_timeout:
+            messages.append("\n".join(state.pending))
+            state.pending = []
+
+    def _consume(self, state: TailedFile, data: bytes, messages: list[str]) -> None:
+        offset = state.read_offset
+        for raw_line in data.splitlines(keepends=True):
+            line = raw_line.decode(self.encoding, errors="replace").rstrip("\r\n")
+            if LINE_START_PATTERN.match(line) and state.pending:
+                messages.append("\n".join(state.pending))
+                state.pending = []
+            if not state.pending:
+                state.pending_offset = offset
+            state.pending.append(line)
+            offset += len(raw_line)
+        state.read_offset = offset
+
+
+class Spool:
+    """磁盘暂存目录: 每个发送失败的批次保存为一个 gzip NDJSON 文件, 按文件名顺序补发."""
+
+    def __init__(self, directory: str | Path, max_bytes: int = DEFAULT_SPOOL_MAX_BYTES) -> None:
+        """初始化, 目录不存在时创建."""
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._counter = 0
+
+    def pending(self) -> list[Path]:
+        """待补发的批次文件, 按写入顺序排列."""
+        return sorted(self.directory.glob("*.ndjson.gz"))
+
+    def put(self, payload: bytes) -> Path:
+        """原子写入一个批次; 超出容量上限时删除最早的批次."""
+        self._counter += 1
+        path = self.directory / f"{time.time_ns():020d}-{self._counter:06d}.ndjson.gz"
+        tmp_path = path.with_suffix(".tmp")
+        with tmp_path.open("wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        tmp_path.replace(path)
+        self._enforce_limit()
+        return path
+
+    def reject(self, path: Path) -> None:
+        """被服务端拒绝的批次改名保留, 不再重试, 便于人工排查."""
+        path.replace(path.with_name(path.name + ".rejected"))
+
+    def _enforce_limit(self) -> None:
+        files = self.pending()
+        total = sum(path.stat().st_size for path in files)
+        while files and total > self.max_bytes:
+            oldest = files.pop(0)
+            total -= oldest.stat().st_size
+            oldest.unlink()
+            logger.error("暂存目录超过 %d 字节, 已丢弃最早的批次: %s", self.max_bytes, oldest.name)
+
+
+def encode_batch(events: list[dict[str, Any]]) -> bytes:
+    """事件列表编码为 gzip 压缩的 NDJSON."""
+    body = "\n".join(json.dumps(event, ensure_ascii=False) for event in events)
+    return gzip.compress(body.encode("utf-8"), compresslevel=6)
+
+
+class SendError(Exception):
+    """批次发送失败."""
+
+    def __init__(self, message: str, *, retryable: bool) -> None:
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class BulkSender:
+    """把 gzip NDJSON 批次推送到服务端的 /data/bulk 接口."""
+
+    def __init__(self, server: str, secret: str, namespace: str | None = None, timeout: float = 10.0) -> None:
+        """初始化.
+
+        Args:
+            server: 服务端地址, 如 http://127.0.0.1:5000
+            secret: Secret-Key 请求头
+            namespace: 写入的命名空间, 通过 config.namespace_header 请求头传递
+            timeout: 单次请求超时(秒)
+        """
+        self.url = server.rstrip("/") + BULK_ENDPOINT
+        self.headers = {
+            "Content-Type": "application/x-ndjson",
+            "Content-Encoding": "gzip",
+            "Secret-Key": secret,
+        }
+        if namespace:
+            self.headers[config.namespace_header] = namespace
+        self.timeout = timeout
+
+    def send(self, payload: bytes) -> dict[str, Any]:
+        """发送一个批次, 返回服务端的导入报告.
+
+        Raises:
+            SendError: 网络错误、超时或服务端返回错误状态
+        """
+        request = urllib.request.Request(self.url, data=payload, headers=self.headers, method="POST")  # noqa: S310
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:  # noqa: S310
+                body = json.loads(response.read() or b"{}")
+        except urllib.error.HTTPError as e:
+            retryable = e.code >= 500 or e.code in RETRYABLE_STATUS  # noqa: PLR2004
+            msg = f"服务端返回 {e.code}"
+            raise SendError(msg, retryable=retryable) from e
+        except (urllib.error.URLError, TimeoutError, OSError, ValueError) as e:
+            msg = f"请求失败: {e}"
+            raise SendError(msg, retryable=True) from e
+        return body.get("report", {}) if isinstance(body, dict) else {}
+
+
+@dataclass
+class AgentStats:
+    """代理运行统计."""
+
+    events: int = 0
+    batches_sent: int = 0
+    batches_spooled: int = 0
+    spool_drained: int = 0
+    payload_bytes: int = 0
+
+
+class IngestAgent:
+    """读取 -> 攒批 -> 发送/落盘 -> 推进检查点 的主循环."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        tailer: LogTailer,
+        sender: BulkSender,
+        spool: Spool,
+        checkpoint_path: str | Path,
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        linger: float = DEFAULT_LINGER,
+    ) -> None:
+        """初始化."""
+        self.tailer = tailer
+        self.sender = sender
+        self.spool = spool
+        self.checkpoint_path = Path(checkpoint_path)
+        self.batch_size = batch_size
+        self.linger = linger
+        self.stats = AgentStats()
+        self._batch: list[dict[str, Any]] = []
+        self._batch_started = 0.0
+        self._backoff = RETRY_BACKOFF_INITIAL
+        # 下一次允许尝试发送的时间(单调时钟), 发送失败后按指数退避推迟
+        self._retry_at = 0.0
+        self._stop = threading.Event()
+        self._saved_checkpoints: dict[str, dict[str, int]] | None = None
+
+    @staticmethod
+    def load_checkpoints(path: str | Path) -> dict[str, dict[str, int]]:
+        """读取检查点文件, 不存在或损坏时返回空."""
+        try:
+            with Path(path).open(encoding="utf-8") as f:
+                return json.load(f).get("files", {})
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning("检查点文件无法读取, 将按 --read-from 重新开始: %s", e)
+            return {}
+
+    def save_checkpoints(self) -> None:
+        """原子写入检查点, 调用方需保证当前批次已发送或落盘. 位置没有变化时不写入."""
+        checkpoints = self.tailer.checkpoints()
+        if checkpoints == self._saved_checkpoints:
+            return
+        tmp_path = self.checkpoint_path.with_name(self.checkpoint_path.name + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump({"files": checkpoints}, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        tmp_path.replace(self.checkpoint_path)
+        self._saved_checkpoints = checkpoints
+
+    def stop(self) -> None:
+        """请求停止主循环(可在信号处理函数中调用)."""
+        self._stop.set()
+
+    def run(self, watcher: InotifyWatcher | PollingWatcher, poll_interval: float = 1.0) -> None:
+        """持续运行直到 stop() 被调用, 退出前发送或落盘剩余批次."""
+        try:
+            while not self._stop.is_set():
+                self.run_once()
+                watcher.wait(self._next_wakeup(poll_interval))
+        finally:
+            self.flush()
+            watcher.close()
+
+    def run_once(self, now: float | None = None) -> None:
+        """执行一轮: 读取新事件, 满足条件时发送批次, 到时补发暂存批次."""
+        now = time.monotonic() if now is None else now
+        events = self.tailer.read_events(now)
+        if events:
+            if not self._batch:
+                self._batch_started = now
+            self._batch.extend(events)
+            self.stats.events += len(events)
+        if len(self._batch) >= self.batch_size or (self._batch and now - self._batch_started >= self.linger):
+            self.flush(now)
+        elif not self._batch:
+            # 无关日志或不完整的消息也会推进位置, 没有待发送的事件时即可保存检查点
+            self.save_checkpoints()
+        if now >= self._retry_at:
+            self.drain_spool(now)
+
+    def _next_wakeup(self, poll_interval: float) -> float:
+        now = time.monotonic()
+        deadlines = [now + poll_interval, now + self.tailer.multiline_timeout]
+        if self._batch:
+            deadlines.append(self._batch_started + self.linger)
+        if self.spool.pending():
+            deadlines.append(self._retry_at)
+        return max(min(deadlines) - now, 0.0)
+
+    def flush(self, now: float | None = None) -> None:
+        """按 batch_size 分批发送已攒的事件; 暂存目录非空或发送失败时落盘, 保证批次顺序. 随后推进检查点."""
+        now = time.monotonic() if now is None else now
+        events, self._batch = self._batch, []
+        for start in range(0, len(events), self.batch_size):
+            chunk = events[start : start + self.batch_size]
+            payload = encode_batch(chunk)
+            self.stats.payload_bytes += len(payload)
+            if self.spool.pending() or now < self._retry_at or not self._try_send(payload, now):
+                self.spool.put(payload)
+                self.stats.batches_spooled += 1
+                logger.info("批次已暂存到磁盘: %d 条事件", len(chunk))
+        self.save_checkpoints()
+
+    def drain_spool(self, now: float | None = None) -> None:
+        """按顺序补发暂存批次, 遇到失败时停止并退避."""
+        now = time.monotonic() if now is None else now
+        for path in self.spool.pending():
+            try:
+                payload = path.read_bytes()
+            except OSError:
+                continue
+            if not self._try_send(payload, now, spooled_path=path):
+                return
+            path.unlink(missing_ok=True)
+            self.stats.spool_drained += 1
+
+    def _try_send(self, payload: bytes, now: float, spooled_path: Path | None = None) -> bool:
+        """发送一个批次, 返回批次是否已处理完毕(发送成功, 或暂存批次被拒绝后已转为 .rejected)."""
+        try:
+            report = self.sender.send(payload)
+        except SendError as e:
+            return self._handle_send_error(e, now, spooled_path)
+
+        self._backoff = RETRY_BACKOFF_INITIAL
+        self._retry_at = 0.0
+        self.stats.batches_sent += 1
+        if report.get("errors"):
+            logger.warning("服务端报告部分事件处理失败: %s", report)
+        return True
+
+    def _handle_send_error(self, error: SendError, now: float, spooled_path: Path | None) -> bool:
+        if error.retryable:
+            self._retry_at = now + self._backoff * random.uniform(0.8, 1.2)  # noqa: S311
+            logger.warning("发送失败, %.1f 秒后重试: %s", self._retry_at - now, error)
+            self._backoff = min(self._backoff * 2, RETRY_BACKOFF_MAX)
+            return False
+        if spooled_path is None:
+            # 新批次被拒绝: 先落盘, 补发时再转为 .rejected, 不丢弃数据
+            logger.error("批次被服务端拒绝: %s", error)
+            return False
+        logger.error("批次被服务端拒绝, 已保留为 .rejected 文件: %s (%s)", spooled_path.name, error)
+        self.spool.reject(spooled_path)
+        return True
+
+
+def write_synthetic_log(path: Path, lines: int, seed: int = 0) -> int:
+    """生成模拟的 QMT 策略日志(加仓三线、加仓Mn股票多行消息和无关日志混合), 返回有效事件数.
+
+    最后写入一行无关日志, 使最后一条有效的多行消息不必等待超时即可结束.
+    """
+    rng = random.Random(seed)  # noqa: S311
+    codes = [f"{510000 + i}.{'SH' if i % 2 else 'SZ'}" for i in range(150)]
+    events = 0
+    written = 0
+    with path.open("w", encoding="utf-8") as f:
+        while written < lines:
+            seconds = 9 * 3600 + 30 * 60 + written * 5.5 * 3600 / lines
+            timestamp = (
+                f"2025-10-11 {int(seconds // 3600):02d}:{int(seconds % 3600 // 60):02d}:"
+                f"{int(seconds % 60):02d},{written % 1000:03d}"
+            )
+            code = rng.choice(codes)
+            kind = rng.random()
+            if kind < 0.2:  # noqa: PLR2004
+                f.write(
+                    f"{timestamp} [INFO] [0x00000d7c] reqid = 0C:\\QMT\\python\\加仓三线.py_15992090, "
+                    f"output = A.trade_stock= {code} Etf_last_price =  1.622 m5 = 1.64 m20 = 1.624 m10 = 1.635\n",
+                )
+                written += 1
+                events += 1
+            elif kind < 0.9:  # noqa: PLR2004
+                strategy = rng.choice(["M5", "M10", "M20", "M0"])
+                f.write(
+                    f"{timestamp} [INFO] [0x00000d7c] reqid = 0C:\\QMT\\python\\加仓{strategy}股票.py_512690132, "
+                    f"output = 计算仓位 = 0.419 仓位结果 = 1 当前仓位 = 0.0 成分股涨数 = {rng.randint(0, 31)} "
+                    "总成分股数 = 31\norder_volume =  1700 target_value =  991.1\n"
+                    f"最新价 = 0.583  买入ETF = {code} 名称 = 酒ETF 买入数量 = 1700 目标仓位 = 1\n",
+                )
+                written += 3
+                events += 1
+            else:
+                f.write(f"{timestamp} [INFO] [0x00000d7c] reqid = 0, output = index= 0 timetag 15:00:00\n")
+                written += 1
+        f.write("2025-10-11 15:00:00,000 [INFO] [0x00000d7c] reqid = 0, output = end\n")
+    return events
+
+
+def run_benchmark(lines: int, batch_size: int = DEFAULT_BATCH_SIZE) -> dict[str, Any]:
+    """吞吐基准: 生成模拟日志, 经完整流程(跟踪、解析、攒批、gzip、HTTP)推送到本地计数服务端."""
+    received = {"requests": 0, "events": 0, "bytes": 0}
+
+    class CountingHandler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            payload = self.rfile.read(int(self.headers["Content-Length"]))
+            received["requests"] += 1
+            received["bytes"] += len(payload)
+            received["events"] += gzip.decompress(payload).count(b"\n") + 1
+            body = json.dumps({"success": True, "report": {"errors": 0}}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *_: object) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CountingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        log_dir = tmp_dir / "log"
+        log_dir.mkdir()
+        log_path = log_dir / "XtClient_FormulaOutput_20251011.log"
+        expected = write_synthetic_log(log_path, lines)
+        size = log_path.stat().st_size
+
+        agent = IngestAgent(
+            LogTailer(log_dir, read_from="beginning"),
+            BulkSender(f"http://127.0.0.1:{server.server_address[1]}", config.api_secret_key),
+            Spool(tmp_dir / "spool"),
+            tmp_dir / "checkpoints.json",
+            batch_size=batch_size,
+            linger=0,
+        )
+        started = time.perf_counter()
+        previous = None
+        # 读到文件末尾(位置和事件数都不再变化)为止
+        while (progress := (agent.stats.events, agent.tailer.checkpoints())) != previous:
+            previous = progress
+            agent.run_once()
+        agent.flush()
+        elapsed = time.perf_counter() - started
+    server.shutdown()
+    server.server_close()
+    return {
+        "lines": lines,
+        "events": agent.stats.events,
+        "expected_events": expected,
+        "received_events": received["events"],
+        "requests": received["requests"],
+        "seconds": round(elapsed, 3),
+        "lines_per_second": round(lines / elapsed),
+        "events_per_second": round(agent.stats.events / elapsed),
+        "log_mib_per_second": round(size / elapsed / 1024 / 1024, 2),
+        "compression_ratio": round(size / max(received["bytes"], 1), 1),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    """命令行入口."""
+    parser = argparse.ArgumentParser(description="跟踪 QMT 日志并推送到数据服务, 服务端不可达时暂存到磁盘")
+    parser.add_argument("directory", nargs="?", help=f"日志目录(跟踪其中的 {LOG_FILE_PATTERN})")
+    parser.add_argument("--server", default=os.getenv("AGENT_SERVER_URL", "http://127.0.0.1:5000"), help="服务端地址")
+    parser.add_argument("--secret", default=config.api_secret_key, help="Secret-Key")
+    parser.add_argument("--namespace", help="写入的命名空间")
+    parser.add_argument("--pattern", default=LOG_FILE_PATTERN, help="日志文件名模式")
+    parser.add_argument("--encoding", default="utf-8", help="日志文件编码")
+    parser.add_argument("--read-from", choices=["end", "beginning"], default="end", help="没有检查点的文件从何处读起")
+    parser.add_argument("--checkpoint", default="agent_checkpoints.json", help="检查点文件")
+    parser.add_argument("--spool-dir", default="agent_spool", help="暂存目录")
+    parser.add_argument("--spool-max-bytes", type=int, default=DEFAULT_SPOOL_MAX_BYTES, help="暂存目录容量上限")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="每批最多事件数")
+    parser.add_argument("--linger", type=float, default=DEFAULT_LINGER, help="批次最长等待秒数")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="轮询间隔(inotify 不可用时)")
+    parser.add_argument("--benchmark", type=int, metavar="LINES", help="运行吞吐基准(指定模拟日志行数)后退出")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        result = run_benchmark(args.benchmark, args.batch_size)
+        logger.info("吞吐基准: %s", json.dumps(result, ensure_ascii=False))
+        return 0 if result["received_events"] == result["expected_events"] else 1
+
+    if not args.directory or not Path(args.directory).is_dir():
+        logger.error("日志目录不存在: %s", args.directory)
+        return 1
+
+    agent = IngestAgent(
+        LogTailer(
+            args.directory,
+            args.pattern,
+            encoding=args.encoding,
+            read_from=args.read_from,
+            checkpoints=IngestAgent.load_checkpoints(args.checkpoint),
+        ),
+        BulkSender(args.server, args.secret, args.namespace),
+        Spool(args.spool_dir, args.spool_max_bytes),
+        args.checkpoint,
+        batch_size=args.batch_size,
+        linger=args.linger,
+    )
+
+    def handle_signal(signum: int, _frame: FrameType | None) -> None:
+        logger.info("收到信号 %d, 正在停止...", signum)
+        agent.stop()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    logger.info("开始跟踪 %s/%s -> %s", args.directory, args.pattern, agent.sender.url)
+    agent.run(create_watcher(Path(args.directory)), args.poll_interval)
+    logger.info("代理已停止: %s", agent.stats)
+    return 0
+
+
+if __name__ == "__main__":
+    setup_logging(config)
+    sys.exit(main())
@@ -2,15 +2,26 @@ from __future__ import annotations
 
 import logging
 import os
-import threading
-from datetime import UTC, datetime
+import time
+import zlib
+from datetime import UTC, date, datetime, timedelta
+from functools import partial
+from typing import Any
 
 from flask import Flask, Response, jsonify, request, send_file
 from flask_cors import CORS
 
+from bulk_ingest import BulkIngestReport, ingest_ndjson, open_ndjson_stream
 from config import config, setup_logging
-from data_handler import DataHandler
-from data_persistence import DataPersistence
+from data_handler import AcceptResult, DataHandler
+from data_persistence import create_persistence
+from data_stock_name import name_resolver
+from latency import DIMENSION_LOG_TYPE, STAGES, LatencyTracker
+from namespaces import DEFAULT_NAMESPACE, MERGED_NAMESPACE, Namespace, NamespaceRegistry
+from replication import DEFAULT_CHANGE_LIMIT, ChangeLog, ReplicaFollower
+from rollover import ArchiveStore, RolloverScheduler, parse_clock
+from scoring import DEFAULT_STRATEGY_NAME, ScoringEngine
+from trading_calendar import TradingCalendar
 
 # 设置日志
 setup_logging(config)
@@ -33,24 +44,160 @@ CORS(app)
 # 移除SSE相关代码, 改为增量数据接口
 
 # 初始化服务
-data_persistence = DataPersistence(config.data_file_path)
-data_handler = DataHandler()
-data_lock = threading.Lock()
+scoring_engine = ScoringEngine.from_file(config.scoring_strategies_path)
+
+
+def create_data_handler() -> DataHandler:
+    """为命名空间创建数据处理器, 所有命名空间共用同一套评分策略."""
+    return DataHandler(
+        dedup_window=config.ingest_dedup_window,
+        drop_stale=config.ingest_drop_stale,
+        scoring=scoring_engine,
+    )
+
+
+# 主备复制的变更日志, 所有命名空间共用
+change_log = ChangeLog(config.replication_log_size) if config.replication_log_size > 0 else None
+
+# 每个命名空间有独立的数据处理器、锁和持久化文件
+if config.persistence_backend == "sqlite":
+    namespaces = NamespaceRegistry(
+        config.sqlite_file_path,
+        create_data_handler,
+        partial(create_persistence, backend="sqlite"),
+        shared_state_path=config.shared_state_path or None,
+        change_log=change_log,
+    )
+else:
+    namespaces = NamespaceRegistry(
+        config.data_file_path,
+        create_data_handler,
+        shared_state_path=config.shared_state_path or None,
+        change_log=change_log,
+    )
+# 配置了主节点地址时以备用节点运行
+replica_follower = (
+    ReplicaFollower(namespaces, config.replicate_from, config.api_secret_key, wait=config.replication_wait)
+    if config.replicate_from
+    else None
+)
+latency_tracker = LatencyTracker(budget_ms=config.latency_budget_ms)
+trading_calendar = TradingCalendar.from_file(
+    config.trading_calendar_path,
+    grace=timedelta(minutes=config.session_grace_minutes),
+)
+archive_store = ArchiveStore(config.archive_dir)
+rollover_scheduler = RolloverScheduler(
+    namespaces,
+    archive_store,
+    trading_calendar,
+    at=parse_clock(config.rollover_time or "15:30"),
+    ttl_days=config.row_ttl_days,
+)
 
 # 只在reloader的子进程中执行初始化, 避免重复执行
 # WERKZEUG_RUN_MAIN环境变量只在reloader的子进程中存在
 if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
-    # 启动时加载数据
-    loaded_data = data_persistence.load_data()
-    if loaded_data:
-        data_handler.load_from_dict_list(loaded_data)
+    # 启动时加载默认命名空间和磁盘上已有的命名空间
+    loaded_namespaces = namespaces.discover()
 
     # 启动自动保存
-    data_persistence.start_auto_save(
-        get_data_callback=lambda: data_handler.get_all_data(),
-        interval=config.auto_save_interval,
+    namespaces.start_auto_save(interval=config.auto_save_interval)
+
+    if replica_follower is not None:
+        # 备用节点: 从主节点同步数据, 归档由主节点负责, 提升后再启动
+        replica_follower.start()
+    elif config.rollover_time:
+        # 收盘后定时归档并移除过期记录
+        rollover_scheduler.start()
+    logger.info("数据服务初始化完成, 命名空间: %s", ", ".join(loaded_namespaces))
+
+
+def resolve_write_namespace(client_secret: str | None) -> str | None:
+    """校验密钥并确定写入的命名空间.
+
+    终端专用密钥固定写入其绑定的命名空间; 主密钥写入请求头指定的命名空间, 未指定时写入默认命名空间.
+    密钥无效时返回 None.
+    """
+    if client_secret is not None and client_secret in config.namespace_keys:
+        return config.namespace_keys[client_secret]
+    if client_secret == config.api_secret_key:
+        return request.headers.get(config.namespace_header) or DEFAULT_NAMESPACE
+    return None
+
+
+def requested_read_namespace() -> str:
+    """读接口的命名空间: namespace 查询参数 > 请求头 > 默认命名空间, "*" 表示合并视图."""
+    return request.args.get("namespace") or request.headers.get(config.namespace_header) or DEFAULT_NAMESPACE
+
+
+def get_read_namespace(name: str) -> Namespace | None:
+    """获取读接口的命名空间, 默认命名空间总是存在, 其他命名空间不存在时返回None(读请求不创建命名空间)."""
+    if name == DEFAULT_NAMESPACE:
+        return namespaces.get_or_create(name)
+    return namespaces.get(name)
+
+
+def is_standby() -> bool:
+    """是否为尚未提升的备用节点."""
+    return replica_follower is not None and replica_follower.active
+
+
+def standby_rejection() -> tuple[Response, int]:
+    """备用节点拒绝写入的错误响应."""
+    return (
+        jsonify(
+            {
+                "success": False,
+                "message": "备用节点只读, 请写入主节点或先提升本节点",
+                "primary": config.replicate_from,
+                "timestamp": get_current_timestamp(),
+            },
+        ),
+        503,
+    )
+
+
+def invalid_secret() -> tuple[Response, int]:
+    """主密钥无效的错误响应."""
+    return (
+        jsonify(
+            {
+                "success": False,
+                "message": "无效的密钥",
+                "timestamp": get_current_timestamp(),
+            },
+        ),
+        401,
+    )
+
+
+def invalid_namespace(error: ValueError) -> tuple[Response, int]:
+    """命名空间名称不合法的错误响应."""
+    return (
+        jsonify(
+            {
+                "success": False,
+                "message": str(error),
+                "timestamp": get_current_timestamp(),
+            },
+        ),
+        400,
+    )
+
+
+def namespace_not_found(name: str) -> tuple[Response, int]:
+    """命名空间不存在的错误响应."""
+    return (
+        jsonify(
+            {
+                "success": False,
+                "message": f"命名空间不存在: {name}",
+                "timestamp": get_current_timestamp(),
+            },
+        ),
+        404,
     )
-    logger.info("数据服务初始化完成")
 
 
 @app.route("/")
@@ -63,17 +210,27 @@ def index() -> Response:
 def api_endpoint() -> Response | tuple[Response, int]:
     """API健康检查端点."""
     try:
-        data_count = len(data_handler.data_record)
+        data_count = sum(len(namespace.handler.data_record) for namespace in namespaces.all())
 
         response_data = {
             "success": True,
             "message": "服务器正常运行",
             "timestamp": get_current_timestamp(),
             "data_count": data_count,
+            "namespaces": namespaces.names(),
+            # 股票名称查询各渠道的耗时、错误和熔断状态
+            "stock_name_providers": name_resolver.snapshot(),
             "server_info": {
                 "version": "1.0.0",
                 "endpoints": {
                     "all_data": "/allDataList",
+                    "stats": "/stats",
+                    "session": "/session",
+                    "strategies": "/strategies",
+                    "namespaces": "/namespaces",
+                    "latency": "/latency",
+                    "archive": "/archive",
+                    "replication": "/replication",
                 },
             },
         }
@@ -92,6 +249,22 @@ def api_endpoint() -> Response | tuple[Response, int]:
         return error_response, 500
 
 
+def data_response(data: list[dict[str, Any]], stats: dict[str, Any], *, with_stats: bool) -> Response:
+    """数据列表响应, with_stats 为 True 时返回 {"data": [...], "stats": {...}}.
+
+    每条记录附带返回时的数据年龄 dataAgeMs(距 QMT 写日志的毫秒数), 并计入 serve 阶段的延迟统计.
+    """
+    served_at = time.time()
+    served_ms = served_at * 1000
+    for row in data:
+        log_time = row.get("logTime")
+        row["dataAgeMs"] = round(served_ms - log_time) if log_time is not None else None
+    latency_tracker.record_serve(data, served_at)
+    if with_stats:
+        return jsonify({"data": data, "stats": stats})
+    return jsonify(data)
+
+
 @app.route("/allDataList", methods=["GET"])
 def get_all_data() -> Response | tuple[Response, int]:
     """获取数据, 支持可选的时间参数进行增量查询."""
@@ -99,10 +272,34 @@ def get_all_data() -> Response | tuple[Response, int]:
         # 获取可选的since参数
         since_time = request.args.get("since")
 
-        with data_lock:
-            # 增量查询或全量查询
-            response_data = data_handler.get_data_since(since_time) if since_time else data_handler.get_all_data()
-            return jsonify(response_data)
+        # stats=true 时返回 {"data": [...], "stats": {...}}, 附带全市场汇总统计
+        with_stats = request.args.get("stats", "false").lower() == "true"
+
+        namespace_name = requested_read_namespace()
+        query_hash = f"{zlib.crc32(request.query_string):08x}"
+
+        if namespace_name == MERGED_NAMESPACE:
+            # 合并视图: 各命名空间依次加锁复制, 不持有全局锁
+            etag = f"{MERGED_NAMESPACE}{namespaces.merged_version()}-{query_hash}"
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                view = namespaces.merged_view()
+                response = data_response(view.to_dicts(since_time), view.stats.to_dict(), with_stats=with_stats)
+        else:
+            namespace = get_read_namespace(namespace_name)
+            if namespace is None:
+                return namespace_not_found(namespace_name)
+            handler = namespace.handler
+            with namespace.lock:
+                # ETag 由数据版本号和查询参数组成, 数据未变化时直接返回 304, 不做任何序列化
+                etag = f"{handler.version}-{query_hash}"
+                if request.if_none_match.contains_weak(etag):
+                    response = Response(status=304)
+                else:
+                    # 增量查询或全量查询
+                    response_data = handler.get_data_since(since_time) if since_time else handler.get_all_data()
+                    response = data_response(response_data, handler.get_market_stats(), with_stats=with_stats)
 
     except (ValueError, KeyError, TypeError) as e:
         logger.exception("获取数据时出错")
@@ -115,17 +312,289 @@ def get_all_data() -> Response | tuple[Response, int]:
             },
         )
         return error_response, 500
+    else:
+        # 弱 ETag: 同一版本的响应中 dataAgeMs 随返回时间变化, 其余内容相同
+        response.set_etag(etag, weak=True)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+
+@app.route("/stats", methods=["GET"])
+def get_market_stats() -> Response | tuple[Response, int]:
+    """获取全市场汇总统计(增量维护, 不需要拉取全表)."""
+    namespace_name = requested_read_namespace()
+    if namespace_name == MERGED_NAMESPACE:
+        stats = namespaces.merged_view().stats.to_dict()
+    else:
+        namespace = get_read_namespace(namespace_name)
+        if namespace is None:
+            return namespace_not_found(namespace_name)
+        with namespace.lock:
+            stats = namespace.handler.get_market_stats()
+    return jsonify({**stats, "namespace": namespace_name, "timestamp": get_current_timestamp()})
+
+
+@app.route("/namespaces", methods=["GET"])
+def get_namespaces() -> Response:
+    """列出所有命名空间及其记录数和数据版本号."""
+    return jsonify(
+        {
+            "namespaces": [
+                {
+                    "name": namespace.name,
+                    "rowCount": len(namespace.handler.data_record),
+                    "version": namespace.handler.version,
+                }
+                for namespace in namespaces.all()
+            ],
+            "default": DEFAULT_NAMESPACE,
+            "merged": MERGED_NAMESPACE,
+            "timestamp": get_current_timestamp(),
+        },
+    )
+
+
+@app.route("/latency", methods=["GET"])
+def get_latency() -> Response | tuple[Response, int]:
+    """获取各阶段的延迟直方图.
+
+    查询参数:
+        by: 展开的维度, 逗号分隔的 etf / log_type, 默认 log_type
+        stage: 只返回指定阶段
+        key: 只返回指定 ETF 代码或 log_type 的统计
+        buckets: true 时包含各桶计数
+    """
+    stage = request.args.get("stage")
+    if stage is not None and stage not in STAGES:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "message": f"未知的阶段: {stage}, 可选: {', '.join(STAGES)}",
+                    "timestamp": get_current_timestamp(),
+                },
+            ),
+            400,
+        )
+    dimensions = [item.strip() for item in request.args.get("by", DIMENSION_LOG_TYPE).split(",") if item.strip()]
+    return jsonify(
+        {
+            "budgetMs": latency_tracker.budget_ms,
+            "stages": latency_tracker.to_dict(
+                dimensions,
+                stage=stage,
+                key=request.args.get("key"),
+                with_buckets=request.args.get("buckets", "false").lower() == "true",
+            ),
+            "timestamp": get_current_timestamp(),
+        },
+    )
+
+
+@app.route("/session", methods=["GET"])
+def get_trading_session() -> Response:
+    """获取交易时段状态和建议的轮询间隔, 供前端调整轮询频率."""
+    status = trading_calendar.status()
+    poll_interval = config.poll_interval_open if status.is_open else config.poll_interval_closed
+    return jsonify(
+        {
+            **status.to_dict(),
+            "pollInterval": poll_interval,
+            "timestamp": get_current_timestamp(),
+        },
+    )
+
+
+@app.route("/strategies", methods=["GET"])
+def get_scoring_strategies() -> Response:
+    """获取评分策略定义, 各策略的分数和信号见数据行的 strategyScores / strategySignals."""
+    return jsonify(
+        {
+            "primary": DEFAULT_STRATEGY_NAME,
+            "strategies": scoring_engine.to_dict(),
+            "timestamp": get_current_timestamp(),
+        },
+    )
+
+
+@app.route("/archive", methods=["GET"])
+def list_archive_days() -> Response | tuple[Response, int]:
+    """列出命名空间已归档的交易日和最近一次滚动的结果."""
+    namespace_name = requested_read_namespace()
+    try:
+        days = archive_store.days(namespace_name)
+    except ValueError as e:
+        return invalid_namespace(e)
+    return jsonify(
+        {
+            "namespace": namespace_name,
+            "days": days,
+            "nextRollover": (
+                next_run.isoformat() if config.rollover_time and (next_run := rollover_scheduler.next_run()) else None
+            ),
+            "rowTtlDays": config.row_ttl_days,
+            "lastRollover": [report.to_dict() for report in rollover_scheduler.last_reports],
+            "timestamp": get_current_timestamp(),
+        },
+    )
+
+
+@app.route("/archive/<day>", methods=["GET"])
+def get_archive_day(day: str) -> Response | tuple[Response, int]:
+    """获取某个交易日的归档快照, codes 参数(逗号分隔)只返回指定代码的记录."""
+    namespace_name = requested_read_namespace()
+    try:
+        archive_day = date.fromisoformat(day)
+        archive = archive_store.load(namespace_name, archive_day)
+    except ValueError as e:
+        return invalid_namespace(e)
+    if archive is None:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "message": f"没有 {day} 的归档: {namespace_name}",
+                    "timestamp": get_current_timestamp(),
+                },
+            ),
+            404,
+        )
+    rows = archive["data"]
+    codes = {code.strip() for code in request.args.get("codes", "").split(",") if code.strip()}
+    if codes:
+        rows = [row for row in rows if row.get("etfCode") in codes]
+    response = jsonify({**archive, "data": rows})
+    # 归档生成后不再变化(除非手动重新滚动同一天)
+    response.headers["Cache-Control"] = "max-age=300"
+    return response
+
+
+@app.route("/rollover", methods=["POST"])
+def trigger_rollover() -> Response | tuple[Response, int]:
+    """立即执行一次滚动(归档所有命名空间的当前快照并移除过期记录), 需要主密钥."""
+    if request.headers.get("Secret-Key") != config.api_secret_key:
+        return invalid_secret()
+    if is_standby():
+        return standby_rejection()
+    reports = rollover_scheduler.run_once()
+    return jsonify(
+        {
+            "success": True,
+            "reports": [report.to_dict() for report in reports],
+            "timestamp": get_current_timestamp(),
+        },
+    )
+
+
+@app.route("/replication", methods=["GET"])
+def get_replication_status() -> Response:
+    """主备复制状态: 本节点角色、变更日志序号, 备用节点附带同步状态."""
+    return jsonify(
+        {
+            "role": "standby" if is_standby() else "primary",
+            "epoch": change_log.epoch if change_log else None,
+            "seq": change_log.seq if change_log else None,
+            "follower": replica_follower.status() if replica_follower else None,
+            "timestamp": get_current_timestamp(),
+        },
+    )
+
+
+@app.route("/replication/changes", methods=["GET"])
+def get_replication_changes() -> Response | tuple[Response, int]:
+    """备用节点拉取变更, 需要主密钥.
+
+    查询参数:
+        epoch / since: 备用节点的游标, 返回序号大于 since 的变更; 游标无效时返回全量快照
+        wait: 没有新变更时最多等待的秒数(长轮询)
+        limit: 最多返回的变更条数
+    """
+    if request.headers.get("Secret-Key") != config.api_secret_key:
+        return invalid_secret()
+    if change_log is None:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "message": "未启用复制(REPLICATION_LOG_SIZE=0)",
+                    "timestamp": get_current_timestamp(),
+                },
+            ),
+            404,
+        )
+    try:
+        cursor = int(request.args.get("since", "0"))
+        wait = min(float(request.args.get("wait", "0")), config.replication_wait)
+        limit = int(request.args.get("limit", str(DEFAULT_CHANGE_LIMIT)))
+    except ValueError as e:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "message": f"参数错误: {e}",
+                    "timestamp": get_current_timestamp(),
+                },
+            ),
+            400,
+        )
+
+    epoch = request.args.get("epoch") or None
+    changes = change_log.changes_since(epoch, cursor, limit=max(limit, 1), wait=max(wait, 0.0))
+    if changes is None:
+        # 先取序号再复制数据: 快照至少包含该序号之前的全部变更, 之后的变更重复应用也不会改变结果
+        seq = change_log.seq
+        snapshot = {namespace.name: [row.to_dict() for row in namespace.snapshot()] for namespace in namespaces.all()}
+        return jsonify({"epoch": change_log.epoch, "seq": seq, "snapshot": snapshot})
+    return jsonify(
+        {
+            "epoch": change_log.epoch,
+            "seq": changes[-1].seq if changes else cursor,
+            "changes": [change.to_dict() for change in changes],
+        },
+    )
+
+
+@app.route("/replication/promote", methods=["POST"])
+def promote_standby() -> Response | tuple[Response, int]:
+    """把备用节点提升为主节点: 停止复制并开放写接口, 内存中的数据直接沿用, 需要主密钥."""
+    if request.headers.get("Secret-Key") != config.api_secret_key:
+        return invalid_secret()
+    if not is_standby():
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "message": "本节点已是主节点",
+                    "timestamp": get_current_timestamp(),
+                },
+            ),
+            409,
+        )
+    assert replica_follower is not None  # noqa: S101
+    replica_follower.promote()
+    if config.rollover_time:
+        rollover_scheduler.start()
+    return jsonify(
+        {
+            "success": True,
+            "message": "已提升为主节点",
+            "replication": replica_follower.status(),
+            "timestamp": get_current_timestamp(),
+        },
+    )
 
 
 # SSE端点已移除, 改为增量数据接口
 
 
 @app.route("/data", methods=["POST"])
-def submit_data() -> tuple[Response, int] | Response:
+def submit_data() -> tuple[Response, int] | Response:  # noqa: PLR0911
     """HTTP接口接收数据."""
+    received_at = time.time()
     try:
         client_secret = request.headers.get("Secret-Key")
-        if client_secret != config.api_secret_key:
+        namespace_name = resolve_write_namespace(client_secret)
+        if namespace_name is None:
             logger.warning("HTTP数据提交被拒绝: 无效的secret_key: %s", client_secret)
             return (
                 jsonify(
@@ -138,6 +607,9 @@ def submit_data() -> tuple[Response, int] | Response:
                 401,
             )
 
+        if is_standby():
+            return standby_rejection()
+
         if not request.is_json:
             return (
                 jsonify(
@@ -179,10 +651,33 @@ def submit_data() -> tuple[Response, int] | Response:
                 400,
             )
 
-        with data_lock:
-            data_handler.accept(data_list)
-            # 数据处理后立即保存
-            data_persistence.save_data(data_handler.get_all_data())
+        try:
+            namespace = namespaces.get_or_create(namespace_name)
+        except ValueError as e:
+            return invalid_namespace(e)
+
+        # strict=true 时整批校验, 任一数据项不合法则整批拒绝
+        strict = request.args.get("strict", "false").lower() == "true"
+
+        # 只持有本命名空间的锁, 不同终端的数据并行处理
+        with namespace.lock:
+            result = namespace.handler.accept(data_list, strict=strict)
+            if result.rejected:
+                return (
+                    jsonify(
+                        {
+                            "success": False,
+                            "message": "数据校验失败, 整批已拒绝",
+                            "errors": [{"index": index, "error": error} for index, error in result.rejected],
+                            "timestamp": get_current_timestamp(),
+                        },
+                    ),
+                    400,
+                )
+            # 数据处理后立即保存(SQLite 后端只写入本批次修改的行), 并原地更新共享状态文件
+            namespace.save(result.changed_codes)
+            namespace.publish(result.changed_codes)
+        latency_tracker.record_accept(result, received_at, time.time())
 
         return jsonify(
             {
@@ -206,17 +701,113 @@ def submit_data() -> tuple[Response, int] | Response:
         )
 
 
+def _accept_locked(namespace: Namespace, data_list: list[Any]) -> AcceptResult:
+    """在命名空间的锁内处理一个批次, 锁只覆盖单个批次.
+
+    增量持久化的后端在同一把锁内以一个事务提交本批次修改的行, 共享状态文件也按批次更新.
+    批次从请求体中解析完成的时间作为该批事件的接收时间.
+    """
+    received_at = time.time()
+    with namespace.lock:
+        result = namespace.handler.accept(data_list)
+        if namespace.incremental and result.changed_codes:
+            namespace.save(result.changed_codes)
+        namespace.publish(result.changed_codes)
+    latency_tracker.record_accept(result, received_at, time.time())
+    return result
+
+
+@app.route("/data/bulk", methods=["POST"])
+def submit_bulk_data() -> tuple[Response, int] | Response:
+    """批量导入NDJSON数据(每行一个JSON对象), 支持gzip压缩.
+
+    请求体按行流式解析并分批应用, 内存占用与请求大小无关;
+    不合法的行记入逐行错误报告, 其余行照常处理.
+    """
+    client_secret = request.headers.get("Secret-Key")
+    namespace_name = resolve_write_namespace(client_secret)
+    if namespace_name is None:
+        logger.warning("批量数据提交被拒绝: 无效的secret_key: %s", client_secret)
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "message": "无效的密钥",
+                    "timestamp": get_current_timestamp(),
+                },
+            ),
+            401,
+        )
+
+    if is_standby():
+        return standby_rejection()
+
+    try:
+        namespace = namespaces.get_or_create(namespace_name)
+    except ValueError as e:
+        return invalid_namespace(e)
+
+    report = BulkIngestReport(max_error_details=config.bulk_ingest_max_errors)
+    try:
+        stream = open_ndjson_stream(request.stream, request.headers.get("Content-Encoding"))
+        ingest_ndjson(
+            stream,
+            partial(_accept_locked, namespace),
+            report,
+            batch_size=config.bulk_ingest_batch_size,
+        )
+    except (OSError, EOFError, zlib.error) as e:
+        # gzip.BadGzipFile 是 OSError 的子类; 已应用的批次不会回滚
+        logger.exception("读取批量数据失败")
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "message": f"读取请求体失败: {e!s}",
+                    "report": report.to_dict(),
+                    "timestamp": get_current_timestamp(),
+                },
+            ),
+            400,
+        )
+    finally:
+        if report.processed and not namespace.incremental:
+            with namespace.lock:
+                namespace.save()
+
+    return jsonify(
+        {
+            "success": report.errors == 0,
+            "message": "数据已接收",
+            "report": report.to_dict(),
+            "timestamp": get_current_timestamp(),
+        },
+    )
+
+
 if __name__ == "__main__":
     logger.info("启动服务器...")
     logger.info("HTTP API密钥: %s", config.api_secret_key)
     logger.info("API端点:")
-    logger.info("  POST /data - 提交数据 (需要secret_key头)")
-    logger.info("  GET /allDataList - 获取数据 (支持since参数进行增量查询)")
+    logger.info("  POST /data - 提交数据 (需要secret_key头, 支持strict参数整批校验)")
+    logger.info("  POST /data/bulk - 批量导入NDJSON数据 (需要secret_key头, 支持gzip)")
+    logger.info("  GET /allDataList - 获取数据 (支持since参数进行增量查询, stats参数附带汇总统计)")
+    logger.info("  GET /stats - 获取全市场汇总统计")
+    logger.info("  GET /session - 获取交易时段状态和建议轮询间隔")
+    logger.info("  GET /latency - 获取各阶段延迟直方图 (支持by、stage、key、buckets参数)")
+    logger.info("  GET /strategies - 获取评分策略定义")
+    logger.info("  GET /archive - 列出已归档的交易日, GET /archive/<YYYY-MM-DD> 获取归档快照 (支持codes参数)")
+    logger.info("  POST /rollover - 立即归档当日快照并移除过期记录 (需要主密钥)")
+    logger.info("  GET /replication - 主备复制状态, POST /replication/promote 提升备用节点 (需要主密钥)")
+    logger.info("  GET /namespaces - 列出命名空间 (写接口用 %s 头或终端专用密钥区分命名空间)", config.namespace_header)
     logger.info("HTTP服务端点: http://%s:%d", config.host, config.port)
 
     try:
         app.run(debug=config.debug, host=config.host, port=config.port)
     except KeyboardInterrupt:
         logger.info("收到中断信号, 正在关闭服务器...")
-        data_persistence.stop_auto_save_thread()
+        namespaces.stop_auto_save()
+        rollover_scheduler.stop()
+        if replica_follower is not None:
+            replica_follower.stop()
         logger.info("服务器已关闭")
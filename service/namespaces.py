@@ -0,0 +1,285 @@
+"""数据命名空间: 每个 QMT 终端/账户使用独立的数据处理器、锁和持久化文件."""
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import zlib
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from data_handler import MarketStats
+from data_persistence import DataPersistence, SqlitePersistence
+from shared_state import SharedStateWriter
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+    from data_handler import DataHandler, FinalDataLine
+    from replication import ChangeLog
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 默认命名空间, 持久化文件沿用 data_file_path, 兼容单终端部署
+DEFAULT_NAMESPACE = "default"
+# 合并读视图的命名空间名称
+MERGED_NAMESPACE = "*"
+# 命名空间名称只允许字母、数字、下划线和连字符(会出现在文件名中)
+NAMESPACE_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def validate_namespace(name: str) -> str:
+    """校验命名空间名称.
+
+    Raises:
+        ValueError: 名称不合法
+    """
+    if not NAMESPACE_PATTERN.match(name):
+        msg = f"无效的命名空间: {name!r}"
+        raise ValueError(msg)
+    return name
+
+
+@dataclass
+class Namespace:
+    """一个命名空间: 独立的数据处理器、锁和持久化文件, 不同命名空间之间互不阻塞."""
+
+    name: str
+    handler: DataHandler
+    persistence: DataPersistence
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    # 内存映射的共享状态文件, 未启用时为 None
+    shared_state: SharedStateWriter | None = None
+    # 主备复制的变更日志(所有命名空间共用), 未启用时为 None
+    changes: ChangeLog | None = None
+
+    @property
+    def incremental(self) -> bool:
+        """持久化后端是否支持只写入变化的行."""
+        return isinstance(self.persistence, SqlitePersistence)
+
+    def save(self, changed_codes: Iterable[str] | None = None) -> bool:
+        """保存数据, 调用方需持有 self.lock.
+
+        支持增量写入的后端只写入 changed_codes 对应的行(一个事务), 否则重写全部数据.
+        """
+        if changed_codes is not None and isinstance(self.persistence, SqlitePersistence):
+            return self.persistence.upsert_rows(self.handler.get_data_by_codes(changed_codes))
+        return self.persistence.save_data(self.handler.get_all_data())
+
+    def publish(self, changed_codes: Iterable[str] | None = None) -> None:
+        """将变化的行原地写入共享状态文件并记入复制日志(均未启用时忽略), 调用方需持有 self.lock."""
+        if self.shared_state is None and self.changes is None:
+            return
+        if changed_codes is None:
+            rows = self.handler.data_record
+        elif changed_codes:
+            rows = self.handler.get_rows_by_codes(changed_codes)
+        else:
+            return
+        if self.shared_state is not None:
+            self.shared_state.publish(rows)
+        if self.changes is not None:
+            self.changes.record(self.name, rows)
+
+    def remove_published(self, codes: Iterable[str]) -> None:
+        """从共享状态文件中移除记录并记入复制日志, 调用方需持有 self.lock."""
+        codes = list(codes)
+        if self.shared_state is not None:
+            self.shared_state.remove(codes)
+        if self.changes is not None:
+            self.changes.record(self.name, (), codes)
+
+    def evict_before(self, cutoff: str) -> list[str]:
+        """移除更新时间早于 cutoff 的记录, 并同步到持久化文件和共享状态文件, 调用方需持有 self.lock."""
+        evicted = self.handler.evict_before(cutoff)
+        if evicted:
+            # 全量保存: JSON 重写文件, SQLite 在同一事务内删除已不存在的行
+            self.save()
+            self.remove_published(evicted)
+        return evicted
+
+    def apply_replicated(self, rows: Iterable[dict[str, Any]], deletes: Iterable[str] = ()) -> None:
+        """应用主节点复制的变化(备用节点), 并同步到本地持久化、共享状态文件和本节点的复制日志.
+
+        调用方需持有 self.lock. JSON 后端与批量导入一样依赖自动保存, 有记录移除时全量保存.
+        """
+        upserted, removed = self.handler.apply_replicated(rows, deletes)
+        if removed:
+            self.save()
+            self.remove_published(removed)
+        elif upserted and self.incremental:
+            self.save(upserted)
+        self.publish(upserted)
+
+    def snapshot(self) -> list[FinalDataLine]:
+        """在锁内复制当前全部记录(浅拷贝, 记录字段均为不可变值或整体替换的字典)."""
+        with self.lock:
+            return [replace(row) for row in self.handler.data_record]
+
+
+@dataclass
+class MergedView:
+    """所有命名空间的合并读视图."""
+
+    # 每个 ETF 取更新时间最新的一条记录: (来源命名空间, 记录)
+    rows: list[tuple[str, FinalDataLine]]
+    # 按合并后的记录计算的全市场统计
+    stats: MarketStats
+    # 由各命名空间版本号组成, 任一命名空间数据变化时都会改变
+    version: str
+
+    def to_dicts(self, since_time: str | None = None) -> list[dict[str, Any]]:
+        """转换为字典列表, 每条记录附带来源命名空间, 可按更新时间筛选."""
+        return [
+            {**row.to_dict(), "namespace": name}
+            for name, row in self.rows
+            if since_time is None or (row.update_time and row.update_time > since_time)
+        ]
+
+
+class NamespaceRegistry:
+    """命名空间注册表.
+
+    命名空间在首次使用时创建并加载各自的持久化文件. 注册表的锁只保护命名空间的创建,
+    数据写入只持有所属命名空间的锁, 不同终端的数据可以并行处理.
+    """
+
+    def __init__(
+        self,
+        base_path: str | Path,
+        handler_factory: Callable[[], DataHandler],
+        persistence_factory: Callable[[str], DataPersistence] = DataPersistence,
+        shared_state_path: str | Path | None = None,
+        change_log: ChangeLog | None = None,
+    ) -> None:
+        """初始化.
+
+        Args:
+            base_path: 默认命名空间的持久化文件, 其他命名空间为同目录下的 <stem>.<命名空间><suffix>
+            handler_factory: 为新命名空间创建数据处理器的函数
+            persistence_factory: 按文件路径创建持久化服务的函数
+            shared_state_path: 默认命名空间的共享状态文件, 其他命名空间按同样规则命名; None 表示不启用
+            change_log: 主备复制的变更日志, None 表示不启用
+        """
+        self.base_path = Path(base_path)
+        self.shared_state_path = Path(shared_state_path) if shared_state_path else None
+        self.change_log = change_log
+        self.handler_factory = handler_factory
+        self.persistence_factory = persistence_factory
+        self._namespaces: dict[str, Namespace] = {}
+        self._lock = threading.Lock()
+        # 自动保存间隔(秒), None 表示未启动自动保存
+        self._auto_save_interval: int | None = None
+
+    def path_for(self, name: str, base_path: Path | None = None) -> Path:
+        """命名空间的文件路径(默认为持久化文件), 非默认命名空间在文件名中插入命名空间名称."""
+        base_path = base_path or self.base_path
+        if name == DEFAULT_NAMESPACE:
+            return base_path
+        return base_path.with_name(f"{base_path.stem}.{name}{base_path.suffix}")
+
+    def get(self, name: str) -> Namespace | None:
+        """获取已存在的命名空间."""
+        return self._namespaces.get(name)
+
+    def get_or_create(self, name: str) -> Namespace:
+        """获取命名空间, 不存在时创建并加载其持久化文件.
+
+        Raises:
+            ValueError: 名称不合法
+        """
+        namespace = self._namespaces.get(name)
+        if namespace is not None:
+            return namespace
+
+        validate_namespace(name)
+        with self._lock:
+            namespace = self._namespaces.get(name)
+            if namespace is None:
+                persistence = self.persistence_factory(str(self.path_for(name)))
+                handler = self.handler_factory()
+                loaded_data = persistence.load_data()
+                if loaded_data:
+                    handler.load_from_dict_list(loaded_data)
+                namespace = Namespace(name, handler, persistence, changes=self.change_log)
+                if self.shared_state_path is not None:
+                    namespace.shared_state = SharedStateWriter(self.path_for(name, self.shared_state_path))
+                # 新命名空间的全部记录写入共享状态文件和复制日志
+                namespace.publish()
+                if self._auto_save_interval is not None:
+                    self._start_auto_save(namespace, self._auto_save_interval)
+                self._namespaces[name] = namespace
+                logger.info("命名空间 %s 已创建, 持久化文件: %s", name, persistence.data_file_path)
+        return namespace
+
+    def discover(self) -> list[str]:
+        """加载默认命名空间和磁盘上已有持久化文件的命名空间."""
+        self.get_or_create(DEFAULT_NAMESPACE)
+        pattern = f"{self.base_path.stem}.*{self.base_path.suffix}"
+        for path in sorted(self.base_path.parent.glob(pattern)):
+            name = path.name[len(self.base_path.stem) + 1 : len(path.name) - len(self.base_path.suffix)]
+            if NAMESPACE_PATTERN.match(name):
+                self.get_or_create(name)
+        return self.names()
+
+    def names(self) -> list[str]:
+        """所有已创建的命名空间名称."""
+        with self._lock:
+            return list(self._namespaces)
+
+    def all(self) -> list[Namespace]:
+        """所有已创建的命名空间."""
+        with self._lock:
+            return list(self._namespaces.values())
+
+    def merged_version(self) -> str:
+        """合并视图的版本号, 不复制数据, 用于判断客户端缓存是否仍然有效."""
+        versions = ",".join(f"{namespace.name}:{namespace.handler.version}" for namespace in self.all())
+        return f"{zlib.crc32(versions.encode()):08x}"
+
+    def merged_view(self) -> MergedView:
+        """合并读视图: 同一 ETF 在多个命名空间中都有记录时, 取更新时间最新的一条.
+
+        依次持有各命名空间的锁复制记录, 不会同时持有多把锁.
+        """
+        version = self.merged_version()
+        latest: dict[str | None, tuple[str, FinalDataLine]] = {}
+        for namespace in self.all():
+            for row in namespace.snapshot():
+                current = latest.get(row.etf_code)
+                if current is None or (row.update_time or "") > (current[1].update_time or ""):
+                    latest[row.etf_code] = (namespace.name, row)
+
+        stats = MarketStats()
+        for _, row in latest.values():
+            stats.add(row)
+        return MergedView(rows=list(latest.values()), stats=stats, version=version)
+
+    def start_auto_save(self, interval: int) -> None:
+        """为所有命名空间(包括之后创建的)启动自动保存."""
+        with self._lock:
+            self._auto_save_interval = interval
+            namespaces = list(self._namespaces.values())
+        for namespace in namespaces:
+            self._start_auto_save(namespace, interval)
+
+    def stop_auto_save(self) -> None:
+        """停止所有命名空间的自动保存."""
+        for namespace in self.all():
+            namespace.persistence.stop_auto_save_thread()
+
+    @staticmethod
+    def _start_auto_save(namespace: Namespace, interval: int) -> None:
+        # 增量持久化的后端每个批次都已提交, 不需要定时全量保存
+        if namespace.incremental:
+            return
+
+        def get_data() -> list[dict[str, Any]]:
+            with namespace.lock:
+                return namespace.handler.get_all_data()
+
+        namespace.persistence.start_auto_save(get_data_callback=get_data, interval=interval)
@@ -0,0 +1,120 @@
+"""QMT 策略日志解析.
+
+与 client/config/vector.yml 中的 multiline、filter_logs、parse_data、validate_data
+和 format_output 保持同样的规则, 供离线回灌等不经过 Vector 的场景使用.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import IO, TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+# 多行日志的起始行: 以时间戳开头
+LINE_START_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}")
+TIMESTAMP_PATTERN = re.compile(r"(?P<timestamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3})")
+
+# 加仓三线
+TRADE_STOCK_PATTERN = re.compile(r"trade_stock=\s*(?P<etf>\d+\.\w+)")
+ETF_LAST_PRICE_PATTERN = re.compile(r"Etf_last_price\s*=\s*(?P<price>[\d.]+)")
+M5_PATTERN = re.compile(r"m5\s*=\s*(?P<m5>[\d.]+)")
+M10_PATTERN = re.compile(r"m10\s*=\s*(?P<m10>[\d.]+)")
+M20_PATTERN = re.compile(r"m20\s*=\s*(?P<m20>[\d.]+)")
+
+# 加仓Mn股票
+STRATEGY_PATTERN = re.compile(r"加仓(?P<strategy>M\d+)股票\.py")
+BUY_ETF_PATTERN = re.compile(r"买入ETF\s*=\s*(?P<etf>\d+\.\w+)")
+RISE_COUNT_PATTERN = re.compile(r"成分股涨数\s*=\s*(?P<rise>\d+)")
+TOTAL_COUNT_PATTERN = re.compile(r"总成分股数\s*=\s*(?P<total>\d+)")
+LATEST_PRICE_PATTERN = re.compile(r"最新价\s*=\s*(?P<price>[\d.]+)")
+
+THREE_LINE_TYPE = "加仓三线"
+
+
+def iter_messages(lines: Iterable[str]) -> Iterator[str]:
+    """按时间戳起始行把日志行合并为多行消息(对应 Vector multiline halt_before)."""
+    buffer: list[str] = []
+    for raw_line in lines:
+        line = raw_line.rstrip("\r\n")
+        if LINE_START_PATTERN.match(line) and buffer:
+            yield "\n".join(buffer)
+            buffer = []
+        buffer.append(line)
+    if buffer:
+        yield "\n".join(buffer)
+
+
+def _search_float(pattern: re.Pattern[str], message: str) -> float | None:
+    """匹配并转换为浮点数, 不匹配返回None; 无法转换时抛出ValueError(对应 to_float!)."""
+    match = pattern.search(message)
+    return float(match.group(1)) if match else None
+
+
+def parse_message(message: str) -> dict[str, Any] | None:  # noqa: PLR0912
+    """解析一条日志消息, 不满足过滤或校验规则时返回None."""
+    # filter_logs
+    is_buy = "买入ETF" in message
+    is_three_line = "trade_stock" in message
+    if not is_buy and not is_three_line:
+        return None
+
+    timestamp_match = TIMESTAMP_PATTERN.search(message)
+    if timestamp_match is None:
+        return None
+
+    event: dict[str, Any] = {"timestamp": timestamp_match.group("timestamp")}
+    try:
+        # parse_data: 加仓三线
+        if is_three_line and THREE_LINE_TYPE in message:
+            event["log_type"] = THREE_LINE_TYPE
+            if match := TRADE_STOCK_PATTERN.search(message):
+                event["buy_etf"] = match.group("etf")
+            for key, pattern in (
+                ("last_price", ETF_LAST_PRICE_PATTERN),
+                ("m5", M5_PATTERN),
+                ("m10", M10_PATTERN),
+                ("m20", M20_PATTERN),
+            ):
+                value = _search_float(pattern, message)
+                if value is not None:
+                    event[key] = value
+
+        # parse_data: 加仓Mn股票
+        if is_buy:
+            if match := STRATEGY_PATTERN.search(message):
+                event["log_type"] = f"加仓{match.group('strategy')}股票"
+            event.setdefault("log_type", "加仓M0股票")
+            if match := BUY_ETF_PATTERN.search(message):
+                event["buy_etf"] = match.group("etf")
+            if match := RISE_COUNT_PATTERN.search(message):
+                event["rise_count"] = int(match.group("rise"))
+            if match := TOTAL_COUNT_PATTERN.search(message):
+                event["total_count"] = int(match.group("total"))
+            value = _search_float(LATEST_PRICE_PATTERN, message)
+            if value is not None:
+                event["last_price"] = value
+    except ValueError:
+        # VRL 中 to_float!/to_int! 失败会中止 remap, 事件随后被 validate_data 过滤
+        return None
+
+    return event if is_valid_event(event) else None
+
+
+def is_valid_event(event: dict[str, Any]) -> bool:
+    """数据完整性校验(对应 validate_data)."""
+    log_type = event.get("log_type")
+    if log_type is None or "buy_etf" not in event:
+        return False
+    if log_type == THREE_LINE_TYPE and all(key in event for key in ("last_price", "m5", "m10", "m20")):
+        return True
+    return log_type.startswith("加仓M") and "rise_count" in event and "total_count" in event
+
+
+def iter_events(stream: IO[str]) -> Iterator[dict[str, Any]]:
+    """从日志文本流中逐条解析出事件."""
+    for message in iter_messages(stream):
+        event = parse_message(message)
+        if event is not None:
+            yield event
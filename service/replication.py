@@ -0,0 +1,265 @@
+"""主备复制: 主节点把已应用的行变化写入带序号的变更日志, 备用节点按游标长轮询拉取并应用.
+
+备用节点维护自己的 DataHandler, 读接口随时可用; 断线重连后从游标继续追赶, 游标已不在日志中
+(日志被截断或主节点重启)时才拉取全量快照. 提升为主节点只是停止复制并开放写接口, 不需要重新加载数据.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import logging
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import deque
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Any
+
+from config import log_rate_limiter
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from data_handler import FinalDataLine
+    from namespaces import NamespaceRegistry
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 单次响应最多返回的变更条数, 追赶时分多次拉取
+DEFAULT_CHANGE_LIMIT = 1000
+# 连接失败后的重试间隔上限(秒)
+MAX_RETRY_DELAY = 30.0
+
+
+@dataclass
+class ChangeEntry:
+    """一条变更: 某个命名空间一次写入后变化的行(浅拷贝)和被移除的代码."""
+
+    seq: int
+    namespace: str
+    rows: list[FinalDataLine]
+    deletes: list[str]
+
+    def to_dict(self) -> dict[str, Any]:
+        """转换为字典."""
+        return {
+            "seq": self.seq,
+            "namespace": self.namespace,
+            "rows": [row.to_dict() for row in self.rows],
+            "deletes": self.deletes,
+        }
+
+
+class ChangeLog:
+    """所有命名空间共用的变更日志, 序号连续递增, 只保留最近 max_entries 条.
+
+    epoch 在每次启动时重新生成, 备用节点的游标只在同一 epoch 内有效.
+    """
+
+    def __init__(self, max_entries: int = 10000) -> None:
+        self.epoch = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self._entries: deque[ChangeEntry] = deque(maxlen=max_entries)
+        self._condition = threading.Condition()
+
+    def record(self, namespace: str, rows: Iterable[FinalDataLine], deletes: Iterable[str] = ()) -> int:
+        """记录一次变更, 返回其序号. 调用方需持有命名空间的锁(保证同一命名空间的变更按顺序记录)."""
+        # 记录字段均为不可变值或整体替换的字典, 浅拷贝即可, 序列化推迟到拉取时
+        copies = [replace(row) for row in rows]
+        with self._condition:
+            self.seq += 1
+            self._entries.append(ChangeEntry(self.seq, namespace, copies, list(deletes)))
+            self._condition.notify_all()
+            return self.seq
+
+    def changes_since(
+        self,
+        epoch: str | None,
+        cursor: int,
+        *,
+        limit: int = DEFAULT_CHANGE_LIMIT,
+        wait: float = 0.0,
+    ) -> list[ChangeEntry] | None:
+        """获取序号大于 cursor 的变更, 没有新变更时最多等待 wait 秒.
+
+        Returns:
+            变更列表(可能为空); 游标无效(epoch 不同、超前或已被截断)时返回 None, 需要拉取全量快照
+        """
+        with self._condition:
+            if epoch != self.epoch or cursor > self.seq:
+                return None
+            if cursor == self.seq and wait > 0:
+                self._condition.wait_for(lambda: self.seq > cursor, timeout=wait)
+            if cursor == self.seq:
+                return []
+            first_seq = self._entries[0].seq if self._entries else self.seq + 1
+            if first_seq > cursor + 1:
+                return None
+            start = cursor + 1 - first_seq
+            return list(itertools.islice(self._entries, start, start + limit))
+
+
+class StandbyError(Exception):
+    """复制请求失败."""
+
+
+class ReplicaFollower:
+    """备用节点: 从主节点长轮询拉取变更并应用到本地命名空间."""
+
+    def __init__(
+        self,
+        registry: NamespaceRegistry,
+        primary_url: str,
+        secret_key: str,
+        wait: float = 25.0,
+    ) -> None:
+        """初始化.
+
+        Args:
+            registry: 本地命名空间注册表
+            primary_url: 主节点地址, 如 http://127.0.0.1:5000
+            secret_key: 主节点的主密钥
+            wait: 长轮询等待时间(秒)
+        """
+        self.registry = registry
+        self.primary_url = primary_url.rstrip("/")
+        self.secret_key = secret_key
+        self.wait = wait
+        # 游标: 主节点的 epoch 和已应用的最大序号
+        self.epoch: str | None = None
+        self.seq = 0
+        self.connected = False
+        self.last_error: str | None = None
+        self.last_sync_at: float | None = None
+        self.applied_changes = 0
+        self.snapshots = 0
+        self.promoted = False
+        self._stop = threading.Event()
+        # 应用变更与提升互斥, 提升后不会再应用任何变更
+        self._apply_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def active(self) -> bool:
+        """是否仍处于备用状态(写接口关闭)."""
+        return not self.promoted
+
+    def start(self) -> None:
+        """启动复制线程."""
+        if self._thread is not None or self.promoted:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._worker, daemon=True, name="ReplicaFollower")
+        self._thread.start()
+        logger.info("备用节点已启动, 主节点: %s", self.primary_url)
+
+    def stop(self) -> None:
+        """停止复制线程(仍保持备用状态)."""
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=1)
+        self._thread = None
+
+    def promote(self) -> None:
+        """提升为主节点: 停止复制, 之后不再应用主节点的变更. 进行中的长轮询在后台自行结束."""
+        self._stop.set()
+        with self._apply_lock:
+            self.promoted = True
+        self._thread = None
+        logger.warning("备用节点已提升为主节点, 最后应用的序号: %s/%d", self.epoch, self.seq)
+
+    def status(self) -> dict[str, Any]:
+        """复制状态."""
+        return {
+            "primary": self.primary_url,
+            "epoch": self.epoch,
+            "seq": self.seq,
+            "connected": self.connected,
+            "lastSyncAt": self.last_sync_at,
+            "lastError": self.last_error,
+            "appliedChanges": self.applied_changes,
+            "snapshots": self.snapshots,
+            "promoted": self.promoted,
+        }
+
+    def _fetch(self) -> dict[str, Any]:
+        query = urllib.parse.urlencode({"epoch": self.epoch or "", "since": self.seq, "wait": self.wait})
+        request = urllib.request.Request(  # noqa: S310
+            f"{self.primary_url}/replication/changes?{query}",
+            headers={"Secret-Key": self.secret_key},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.wait + 10) as response:  # noqa: S310
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            msg = f"HTTP {e.code}: {e.read()[:200].decode('utf-8', 'replace')}"
+            raise StandbyError(msg) from e
+        except (OSError, ValueError) as e:
+            raise StandbyError(str(e)) from e
+
+    def sync_once(self) -> int:
+        """拉取并应用一次变更, 返回应用的变更条数(全量快照计为其记录数).
+
+        Raises:
+            StandbyError: 请求主节点失败
+        """
+        payload = self._fetch()
+        with self._apply_lock:
+            if self.promoted:
+                return 0
+            if "snapshot" in payload:
+                applied = self._apply_snapshot(payload["snapshot"])
+                self.snapshots += 1
+                logger.info("已从主节点加载全量快照: %d 条记录, 序号 %s/%d", applied, payload["epoch"], payload["seq"])
+            else:
+                applied = self._apply_changes(payload["changes"])
+            self.epoch, self.seq = payload["epoch"], payload["seq"]
+            self.applied_changes += applied
+        self.last_sync_at = time.time()
+        return applied
+
+    def _apply_snapshot(self, snapshot: dict[str, list[dict[str, Any]]]) -> int:
+        """用全量快照替换各命名空间的数据(快照中没有的本地记录被移除)."""
+        applied = 0
+        for name, rows in snapshot.items():
+            namespace = self.registry.get_or_create(name)
+            with namespace.lock:
+                incoming = {row.get("etfCode") for row in rows}
+                stale = [
+                    row.etf_code
+                    for row in namespace.handler.data_record
+                    if row.etf_code is not None and row.etf_code not in incoming
+                ]
+                namespace.apply_replicated(rows, stale)
+            applied += len(rows)
+        return applied
+
+    def _apply_changes(self, changes: list[dict[str, Any]]) -> int:
+        for change in changes:
+            namespace = self.registry.get_or_create(change["namespace"])
+            with namespace.lock:
+                namespace.apply_replicated(change["rows"], change["deletes"])
+        return len(changes)
+
+    def _worker(self) -> None:
+        delay = 1.0
+        while not self._stop.is_set():
+            try:
+                self.sync_once()
+            except (StandbyError, ValueError, KeyError) as e:
+                self.connected = False
+                self.last_error = str(e)
+                log_rate_limiter.log(logger, logging.WARNING, "replication.sync", "从主节点同步失败: %s", e)
+                self._stop.wait(delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+                continue
+            if not self.connected:
+                logger.info("已连接主节点 %s", self.primary_url)
+            self.connected = True
+            self.last_error = None
+            delay = 1.0
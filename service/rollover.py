@@ -0,0 +1,250 @@
+"""交易日滚动: 收盘后把当日最终快照归档为按日期命名的压缩文件, 并从实时表中移除长期没有更新的记录.
+
+实时表只保留最近若干个交易日有更新的 ETF, get_all_data、保存和前端轮询等 O(全表) 的路径随之有界;
+归档文件按需加载查询, 不常驻内存.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from namespaces import validate_namespace
+from trading_calendar import EXCHANGE_TZ, MAX_LOOKAHEAD_DAYS
+
+if TYPE_CHECKING:
+    from namespaces import Namespace, NamespaceRegistry
+    from trading_calendar import TradingCalendar
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 归档文件后缀: <归档目录>/<命名空间>/<YYYY-MM-DD>.json.gz
+ARCHIVE_SUFFIX = ".json.gz"
+
+
+def parse_clock(value: str) -> time:
+    """解析 "HH:MM" 格式的时间.
+
+    Raises:
+        ValueError: 格式错误
+    """
+    return time.fromisoformat(value.strip())
+
+
+class ArchiveStore:
+    """按命名空间和交易日存放的归档文件, 内容为紧凑 JSON 的 gzip 压缩."""
+
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+
+    def path_for(self, namespace: str, day: date) -> Path:
+        """归档文件路径."""
+        return self.directory / validate_namespace(namespace) / f"{day.isoformat()}{ARCHIVE_SUFFIX}"
+
+    def write(self, namespace: str, day: date, rows: list[dict[str, Any]], stats: dict[str, Any]) -> Path:
+        """写入(覆盖)某个交易日的归档, 先写临时文件再原子替换."""
+        path = self.path_for(namespace, day)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "date": day.isoformat(),
+            "namespace": namespace,
+            "archivedAt": datetime.now(EXCHANGE_TZ).isoformat(timespec="seconds"),
+            "stats": stats,
+            "data": rows,
+        }
+        tmp_path = path.with_name(path.name + ".tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+        tmp_path.replace(path)
+        return path
+
+    def days(self, namespace: str) -> list[str]:
+        """命名空间已归档的交易日(升序)."""
+        directory = self.directory / validate_namespace(namespace)
+        return sorted(path.name.removesuffix(ARCHIVE_SUFFIX) for path in directory.glob(f"*{ARCHIVE_SUFFIX}"))
+
+    def exists(self, namespace: str, day: date) -> bool:
+        """某个交易日是否已归档."""
+        return self.path_for(namespace, day).exists()
+
+    def load(self, namespace: str, day: date) -> dict[str, Any] | None:
+        """加载某个交易日的归档, 不存在时返回 None. 最近加载的归档按文件修改时间缓存."""
+        path = self.path_for(namespace, day)
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+        return _load_archive(path, mtime)
+
+
+@lru_cache(maxsize=8)
+def _load_archive(path: Path, _mtime: int) -> dict[str, Any]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@dataclass
+class RolloverReport:
+    """一个命名空间一次滚动的结果."""
+
+    namespace: str
+    day: date
+    # 归档的记录数
+    archived: int = 0
+    # 从实时表移除的代码
+    evicted: list[str] = field(default_factory=list)
+    archive_path: Path | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        """转换为字典."""
+        return {
+            "namespace": self.namespace,
+            "date": self.day.isoformat(),
+            "archived": self.archived,
+            "evicted": len(self.evicted),
+            "evictedCodes": self.evicted,
+            "archivePath": str(self.archive_path) if self.archive_path else None,
+        }
+
+
+def roll_over(namespace: Namespace, store: ArchiveStore, day: date, cutoff: str | None) -> RolloverReport:
+    """归档一个命名空间的当前快照, 然后移除更新时间早于 cutoff 的记录.
+
+    快照在锁内复制, 压缩写盘在锁外进行; 归档成功后才移除过期记录, 写归档失败时实时表保持不变.
+    移除时在锁内重新判断更新时间, 期间收到新数据的记录不会被移除.
+    """
+    with namespace.lock:
+        rows = namespace.handler.get_all_data()
+        stats = namespace.handler.get_market_stats()
+    report = RolloverReport(namespace.name, day, archived=len(rows))
+    report.archive_path = store.write(namespace.name, day, rows, stats)
+    if cutoff is not None:
+        with namespace.lock:
+            report.evicted = namespace.evict_before(cutoff)
+    logger.info(
+        "命名空间 %s 已归档 %s: %d 条记录, 移除 %d 条过期记录",
+        namespace.name,
+        day.isoformat(),
+        report.archived,
+        len(report.evicted),
+    )
+    return report
+
+
+class RolloverScheduler:
+    """在每个交易日的指定时间(收盘后)对所有命名空间执行滚动."""
+
+    def __init__(
+        self,
+        registry: NamespaceRegistry,
+        store: ArchiveStore,
+        calendar: TradingCalendar,
+        at: time,
+        ttl_days: int = 0,
+    ) -> None:
+        """初始化.
+
+        Args:
+            registry: 命名空间注册表
+            store: 归档存储
+            calendar: 交易日历
+            at: 每个交易日执行滚动的时间(交易所时间)
+            ttl_days: 实时表保留最近多少个交易日(含当日)有更新的记录, 0 表示不移除
+        """
+        self.registry = registry
+        self.store = store
+        self.calendar = calendar
+        self.at = at
+        self.ttl_days = ttl_days
+        # 最近一次滚动的结果
+        self.last_reports: list[RolloverReport] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def cutoff_for(self, day: date) -> str | None:
+        """滚动 day 时的过期时间: 更新时间早于保留期第一个交易日零点的记录被移除."""
+        if self.ttl_days <= 0:
+            return None
+        first_day = self.calendar.previous_trading_day(day, self.ttl_days - 1)
+        return f"{first_day.isoformat()} 00:00:00"
+
+    def run_once(self, day: date | None = None) -> list[RolloverReport]:
+        """立即对所有命名空间执行一次滚动.
+
+        Args:
+            day: 归档的交易日, 默认为当天(交易所时间)
+        """
+        day = day or datetime.now(EXCHANGE_TZ).date()
+        cutoff = self.cutoff_for(day)
+        reports = []
+        # 滚动可能由定时线程和手动请求同时触发, 串行执行
+        with self._lock:
+            for namespace in self.registry.all():
+                try:
+                    reports.append(roll_over(namespace, self.store, day, cutoff))
+                except OSError:
+                    logger.exception("命名空间 %s 归档失败, 本次不移除过期记录", namespace.name)
+            self.last_reports = reports
+        return reports
+
+    def next_run(self, now: datetime | None = None) -> datetime | None:
+        """下一次定时滚动的时间."""
+        now = (now or datetime.now(EXCHANGE_TZ)).astimezone(EXCHANGE_TZ)
+        day = now.date()
+        for _ in range(MAX_LOOKAHEAD_DAYS):
+            run_at = datetime.combine(day, self.at, EXCHANGE_TZ)
+            if self.calendar.is_trading_day(day) and run_at > now:
+                return run_at
+            day += timedelta(days=1)
+        return None
+
+    def start(self) -> None:
+        """启动定时线程. 服务在当日滚动时间之后启动且当日尚未归档时, 立即补做一次."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._worker, daemon=True, name="Rollover")
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止定时线程."""
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def _missed_today(self) -> bool:
+        now = datetime.now(EXCHANGE_TZ)
+        today = now.date()
+        return (
+            self.calendar.is_trading_day(today)
+            and now >= datetime.combine(today, self.at, EXCHANGE_TZ)
+            and not any(self.store.exists(namespace.name, today) for namespace in self.registry.all())
+        )
+
+    def _worker(self) -> None:
+        if self._missed_today():
+            logger.info("当日尚未归档, 立即执行滚动")
+            self.run_once()
+        while not self._stop.is_set():
+            run_at = self.next_run()
+            if run_at is None:
+                logger.warning("未来 %d 天内没有交易日, 滚动线程退出", MAX_LOOKAHEAD_DAYS)
+                return
+            logger.info("下一次滚动时间: %s", run_at.isoformat())
+            delay = (run_at - datetime.now(EXCHANGE_TZ)).total_seconds()
+            if self._stop.wait(max(delay, 0)):
+                return
+            try:
+                self.run_once(run_at.date())
+            except Exception:
+                logger.exception("滚动异常")
@@ -0,0 +1,370 @@
+"""评分策略: 声明式评分规则注册表, 编译为单次遍历的评估函数."""
+
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from data_handler import FinalDataLine
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 常量定义
+SCORE_THRESHOLD = 0.5  # 评分阈值
+DEFAULT_STRATEGY_NAME = "default"  # 主策略名称, 其结果同时写入 totalScore / m5Signal
+
+# 可参与评分的记录字段
+SCORABLE_FIELDS = frozenset(
+    {
+        "m5_percent",
+        "m10_percent",
+        "m20_percent",
+        "m0_percent",
+        "ma_mean_ratio",
+        "greater_than_m5_price",
+        "greater_than_m10_price",
+        "greater_than_m20_price",
+        "growth_stock_count",
+        "total_stock_count",
+        "latest_price",
+    },
+)
+
+# 比较运算符 -> 生成代码中的表达式模板, {v} 为取值变量, {c} 为阈值常量
+RULE_OPERATORS = {
+    "gt": "{v} > {c}",
+    "ge": "{v} >= {c}",
+    "lt": "{v} < {c}",
+    "le": "{v} <= {c}",
+    "is_true": "{v} is True",
+    "is_false": "{v} is False",
+}
+# 不需要阈值的运算符
+UNARY_OPERATORS = frozenset({"is_true", "is_false"})
+
+
+def _growth_ratio(row: FinalDataLine) -> float | None:
+    """增长股占比."""
+    if row.growth_stock_count is None or not row.total_stock_count:
+        return None
+    return row.growth_stock_count / row.total_stock_count
+
+
+def _price_above_ma_count(row: FinalDataLine) -> int:
+    """最新价高于 M5/M10/M20 的均线条数."""
+    return (
+        (row.greater_than_m5_price is True)
+        + (row.greater_than_m10_price is True)
+        + (row.greater_than_m20_price is True)
+    )
+
+
+# 派生指标: 名称 -> 计算函数, 规则中可以像字段一样引用, 每条记录每次评估只计算一次
+INDICATORS: dict[str, Callable[[FinalDataLine], Any]] = {
+    "growth_ratio": _growth_ratio,
+    "price_above_ma_count": _price_above_ma_count,
+}
+
+
+def register_indicator(name: str, func: Callable[[FinalDataLine], Any]) -> None:
+    """注册派生指标, 需在创建 ScoringEngine 之前调用.
+
+    Raises:
+        ValueError: 名称不是合法标识符或与记录字段重名
+    """
+    if not name.isidentifier() or name in SCORABLE_FIELDS:
+        msg = f"无效的指标名称: {name}"
+        raise ValueError(msg)
+    INDICATORS[name] = func
+
+
+@dataclass(frozen=True)
+class ScoreRule:
+    """一条评分规则: 条件成立时加 weight 分, 取值为 None 时不加分."""
+
+    # 记录字段或派生指标名称
+    field: str
+    # 比较运算符, 见 RULE_OPERATORS
+    op: str = "gt"
+    # 比较阈值, is_true / is_false 不需要
+    value: float | None = None
+    # 条件成立时的加分
+    weight: float = 1
+
+    def validate(self) -> None:
+        """校验规则.
+
+        Raises:
+            ValueError: 字段、运算符或阈值不合法
+            TypeError: 权重不是数值
+        """
+        if self.field not in SCORABLE_FIELDS and self.field not in INDICATORS:
+            msg = f"未知的评分字段: {self.field}"
+            raise ValueError(msg)
+        if self.op not in RULE_OPERATORS:
+            msg = f"未知的运算符: {self.op}"
+            raise ValueError(msg)
+        if self.op not in UNARY_OPERATORS and not isinstance(self.value, int | float):
+            msg = f"运算符 {self.op} 需要数值阈值: {self.field}"
+            raise ValueError(msg)
+        if isinstance(self.weight, bool) or not isinstance(self.weight, int | float):
+            msg = f"规则权重必须是数值: {self.field}"
+            raise TypeError(msg)
+
+    def predicate_key(self) -> tuple[str, str, float | None]:
+        """判断条件的唯一标识, 不同策略中相同的条件只计算一次."""
+        value = None if self.op in UNARY_OPERATORS else float(self.value)  # type: ignore[arg-type]
+        return (self.field, self.op, value)
+
+
+@dataclass(frozen=True)
+class SignalRule:
+    """多空信号规则: 字段值大于阈值为 above, 否则为 below, 取值为 None 时无信号."""
+
+    field: str
+    threshold: float
+    above: str = "多"
+    below: str = "空"
+
+    def validate(self) -> None:
+        """校验规则.
+
+        Raises:
+            ValueError: 字段不合法
+            TypeError: 阈值不是数值或标签不是字符串
+        """
+        if self.field not in SCORABLE_FIELDS and self.field not in INDICATORS:
+            msg = f"未知的信号字段: {self.field}"
+            raise ValueError(msg)
+        if not isinstance(self.threshold, int | float):
+            msg = f"信号阈值必须是数值: {self.field}"
+            raise TypeError(msg)
+        if not isinstance(self.above, str) or not isinstance(self.below, str):
+            msg = f"信号标签必须是字符串: {self.field}"
+            raise TypeError(msg)
+
+
+@dataclass(frozen=True)
+class ScoringStrategy:
+    """评分策略: 一组评分规则和可选的多空信号规则."""
+
+    name: str
+    rules: tuple[ScoreRule, ...] = ()
+    signal: SignalRule | None = None
+    # 策略说明, 仅用于展示
+    description: str = ""
+
+    @classmethod
+    def from_dict(cls, raw: dict[str, Any]) -> ScoringStrategy:
+        """从配置字典创建策略.
+
+        格式:
+            {"name": "strict", "description": "...",
+             "rules": [{"field": "m5_percent", "op": "gt", "value": 0.6, "weight": 2}, ...],
+             "signal": {"field": "m5_percent", "threshold": 0.6}}
+
+        Raises:
+            ValueError: 配置不合法
+            TypeError: 配置中的值类型不合法
+        """
+        try:
+            rules = tuple(ScoreRule(**rule) for rule in raw.get("rules", []))
+            signal = SignalRule(**raw["signal"]) if raw.get("signal") else None
+            strategy = cls(
+                name=raw["name"],
+                rules=rules,
+                signal=signal,
+                description=raw.get("description", ""),
+            )
+        except (KeyError, TypeError) as e:
+            msg = f"评分策略配置不合法: {e}"
+            raise ValueError(msg) from e
+        strategy.validate()
+        return strategy
+
+    def validate(self) -> None:
+        """校验策略.
+
+        Raises:
+            ValueError: 名称或规则不合法
+            TypeError: 规则中的值类型不合法
+        """
+        if not isinstance(self.name, str) or not self.name:
+            msg = "评分策略名称不能为空"
+            raise ValueError(msg)
+        for rule in self.rules:
+            rule.validate()
+        if self.signal is not None:
+            self.signal.validate()
+
+    def to_dict(self) -> dict[str, Any]:
+        """将策略转换为字典."""
+        return {
+            "name": self.name,
+            "description": self.description,
+            "rules": [
+                {"field": rule.field, "op": rule.op, "value": rule.value, "weight": rule.weight} for rule in self.rules
+            ],
+            "signal": (
+                {
+                    "field": self.signal.field,
+                    "threshold": self.signal.threshold,
+                    "above": self.signal.above,
+                    "below": self.signal.below,
+                }
+                if self.signal
+                else None
+            ),
+        }
+
+
+# 内置主策略: 与原 cal_score / m5_signal 逻辑完全一致
+DEFAULT_STRATEGY = ScoringStrategy(
+    name=DEFAULT_STRATEGY_NAME,
+    description="[m5,m10,m20,m0]Percent 与 Ma均值大于阈值各得一分, 价格高于 M5/M10/M20 各得一分",
+    rules=(
+        ScoreRule("m5_percent", "gt", SCORE_THRESHOLD),
+        ScoreRule("m10_percent", "gt", SCORE_THRESHOLD),
+        ScoreRule("m20_percent", "gt", SCORE_THRESHOLD),
+        ScoreRule("m0_percent", "gt", SCORE_THRESHOLD),
+        ScoreRule("ma_mean_ratio", "gt", SCORE_THRESHOLD),
+        ScoreRule("greater_than_m5_price", "is_true"),
+        ScoreRule("greater_than_m10_price", "is_true"),
+        ScoreRule("greater_than_m20_price", "is_true"),
+    ),
+    signal=SignalRule("m5_percent", SCORE_THRESHOLD),
+)
+
+
+@dataclass
+class ScoringEngine:
+    """评分引擎.
+
+    所有策略的规则在创建时编译为一个评估函数: 每个字段/指标只读取一次, 不同策略中
+    相同的判断条件只计算一次, 每条记录一次调用即可得到全部策略的分数和信号.
+    新增与已有策略共享条件的策略, 只增加一次加法.
+    """
+
+    strategies: tuple[ScoringStrategy, ...] = (DEFAULT_STRATEGY,)
+    # 编译后的评估函数: row -> (策略名 -> 分数, 策略名 -> 信号)
+    _evaluate: Callable[[FinalDataLine], tuple[dict[str, Any], dict[str, str | None]]] = field(
+        init=False,
+        repr=False,
+    )
+
+    def __post_init__(self) -> None:
+        """校验并编译策略."""
+        names = [strategy.name for strategy in self.strategies]
+        if len(set(names)) != len(names):
+            msg = f"评分策略名称重复: {names}"
+            raise ValueError(msg)
+        for strategy in self.strategies:
+            strategy.validate()
+        self._evaluate = self._compile()
+
+    @classmethod
+    def from_file(cls, path: str | Path) -> ScoringEngine:
+        """加载策略文件, 文件中的策略追加在内置主策略之后, 同名时覆盖内置策略.
+
+        文件格式: {"strategies": [<ScoringStrategy.from_dict 格式>, ...]}
+        文件不存在或格式错误时只使用内置主策略.
+        """
+        strategy_path = Path(path)
+        if not strategy_path.exists():
+            return cls()
+        try:
+            with strategy_path.open("r", encoding="utf-8") as f:
+                raw = json.load(f)
+            loaded = [ScoringStrategy.from_dict(item) for item in raw.get("strategies", [])]
+            builtin = [DEFAULT_STRATEGY] if all(s.name != DEFAULT_STRATEGY_NAME for s in loaded) else []
+            engine = cls(tuple(builtin + loaded))
+        except (ValueError, TypeError, AttributeError, OSError):
+            logger.exception("加载评分策略失败: %s, 仅使用内置策略", strategy_path)
+            return cls()
+        logger.info("从 %s 加载了 %d 个评分策略", strategy_path, len(loaded))
+        return engine
+
+    @property
+    def names(self) -> list[str]:
+        """所有策略名称."""
+        return [strategy.name for strategy in self.strategies]
+
+    def evaluate(self, row: FinalDataLine) -> tuple[dict[str, Any], dict[str, str | None]]:
+        """计算一条记录在所有策略下的分数和信号."""
+        return self._evaluate(row)
+
+    def to_dict(self) -> list[dict[str, Any]]:
+        """所有策略的定义."""
+        return [strategy.to_dict() for strategy in self.strategies]
+
+    def _compile(self) -> Callable[[FinalDataLine], tuple[dict[str, Any], dict[str, str | None]]]:
+        """生成评估函数源码并编译.
+
+        代码中只出现经过校验的字段名(白名单)、数值常量和字符串常量的 repr,
+        不会执行配置文件中的任意代码.
+        """
+        sources: dict[str, str] = {}  # 字段/指标 -> 局部变量名
+        predicates: dict[tuple[str, str, float | None], str] = {}  # 判断条件 -> 局部变量名
+        lines: list[str] = []
+
+        def source(name: str) -> str:
+            if name not in sources:
+                var = f"v{len(sources)}"
+                sources[name] = var
+                if name in INDICATORS:
+                    lines.append(f"    {var} = _indicators[{name!r}](row)")
+                else:
+                    lines.append(f"    {var} = row.{name}")
+            return sources[name]
+
+        def predicate(rule: ScoreRule) -> str:
+            key = rule.predicate_key()
+            if key not in predicates:
+                var = f"p{len(predicates)}"
+                predicates[key] = var
+                value_var = source(rule.field)
+                condition = RULE_OPERATORS[rule.op].format(v=value_var, c=repr(key[2]))
+                if rule.op in UNARY_OPERATORS:
+                    lines.append(f"    {var} = {condition}")
+                else:
+                    lines.append(f"    {var} = {value_var} is not None and {condition}")
+            return predicates[key]
+
+        score_items: list[str] = []
+        signal_items: list[str] = []
+        for strategy in self.strategies:
+            terms = []
+            for rule in strategy.rules:
+                var = predicate(rule)
+                terms.append(var if rule.weight == 1 else f"{rule.weight!r} * {var}")
+            score_items.append(f"{strategy.name!r}: {' + '.join(terms) if terms else '0'}")
+
+            if strategy.signal is None:
+                signal_items.append(f"{strategy.name!r}: None")
+            else:
+                signal = strategy.signal
+                var = source(signal.field)
+                threshold = repr(float(signal.threshold))
+                signal_items.append(
+                    f"{strategy.name!r}: None if {var} is None else "
+                    f"({signal.above!r} if {var} > {threshold} else {signal.below!r})",
+                )
+
+        code = "\n".join(
+            [
+                "def _evaluate(row):",
+                *lines,
+                f"    return {{{', '.join(score_items)}}}, {{{', '.join(signal_items)}}}",
+            ],
+        )
+        namespace: dict[str, Any] = {"_indicators": dict(INDICATORS)}
+        exec(compile(code, "<scoring>", "exec"), namespace)  # noqa: S102
+        logger.debug("评分函数已编译:\n%s", code)
+        return namespace["_evaluate"]
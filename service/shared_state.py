@@ -0,0 +1,515 @@
+"""内存映射的共享状态文件: 采集进程原地更新, 其他进程直接映射读取, 无需请求 API 或解析 JSON.
+
+文件布局(小端):
+    文件头(64 字节): 魔数、格式版本、行大小、seqlock 序号、行容量、行数、字符串表容量/已用、retired 标志
+    行区: capacity 个定长行, 每行为 ROW_FIELDS 描述的数值槽位, 字符串以 (偏移, 长度) 引用字符串表
+    字符串表: UTF-8 字节, 只追加; 代码、名称、信号的取值很少变化, 相同字符串只写一次
+
+一致性: 写入前 seq 加一(奇数表示正在写), 写完再加一. 读取方在 seq 为偶数且读前读后不变时
+得到一致的快照, 否则重试(seqlock). 容量不足时写入方生成更大的新文件原子替换旧文件,
+并在旧文件头设置 retired 标志, 读取方发现后重新映射.
+
+本模块只依赖标准库, 读取方(分析脚本、只读 API 进程)可以单独拷贝使用; NumPy 为可选依赖.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import mmap
+import struct
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from data_handler import FinalDataLine
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ETFSTATE"
+FORMAT_VERSION = 1
+
+# 交易所时区, update_time 字符串按该时区转换为 epoch 毫秒
+EXCHANGE_TZ = timezone(timedelta(hours=8), name="Asia/Shanghai")
+
+# 文件头: 魔数, 版本, 行大小, seq, 行容量, 行数, 字符串表容量, 字符串表已用, retired
+HEADER = struct.Struct("<8sIIQIIIII")
+HEADER_SIZE = 64
+SEQ_OFFSET = 16
+SEQ = struct.Struct("<Q")
+COUNTS_OFFSET = 24
+COUNTS = struct.Struct("<IIII")
+RETIRED_OFFSET = 40
+RETIRED = struct.Struct("<I")
+
+# 行字段: (字段名, struct 格式码). 8 字节字段在前, 便于 NumPy 结构化视图按列访问
+ROW_FIELDS: tuple[tuple[str, str], ...] = (
+    ("update_time_ms", "q"),
+    ("total_score", "d"),
+    ("m5_percent", "d"),
+    ("m10_percent", "d"),
+    ("m20_percent", "d"),
+    ("ma_mean_ratio", "d"),
+    ("m0_percent", "d"),
+    ("latest_price", "d"),
+    ("growth_stock_count", "i"),
+    ("total_stock_count", "i"),
+    ("code_offset", "I"),
+    ("name_offset", "I"),
+    ("signal_offset", "I"),
+    ("code_length", "H"),
+    ("name_length", "H"),
+    ("signal_length", "H"),
+    ("greater_than_m5_price", "b"),
+    ("greater_than_m10_price", "b"),
+    ("greater_than_m20_price", "b"),
+    ("flags", "B"),
+)
+ROW = struct.Struct("<" + "".join(code for _, code in ROW_FIELDS) + "2x")
+ROW_SIZE = ROW.size
+# flags 位: 该行已使用
+FLAG_IN_USE = 1
+
+# 缺失值编码: 浮点为 NaN, 计数和布尔为 -1, 时间为 0
+MISSING_INT = -1
+FLOAT_FIELDS = (
+    "total_score",
+    "m5_percent",
+    "m10_percent",
+    "m20_percent",
+    "ma_mean_ratio",
+    "m0_percent",
+    "latest_price",
+)
+COUNT_FIELDS = ("growth_stock_count", "total_stock_count")
+BOOL_FIELDS = ("greater_than_m5_price", "greater_than_m10_price", "greater_than_m20_price")
+STRING_FIELDS = ("etf_code", "etf_name", "m5_signal")
+
+# 字段 -> API 字典键, 与 FinalDataLine.to_dict 保持一致
+API_KEYS = {
+    "update_time": "updateTime",
+    "etf_code": "etfCode",
+    "etf_name": "etfName",
+    "m5_signal": "m5Signal",
+    "total_score": "totalScore",
+    "m5_percent": "m5Percent",
+    "m10_percent": "m10Percent",
+    "m20_percent": "m20Percent",
+    "ma_mean_ratio": "maMeanRatio",
+    "m0_percent": "m0Percent",
+    "greater_than_m5_price": "greaterThanM5Price",
+    "greater_than_m10_price": "greaterThanM10Price",
+    "greater_than_m20_price": "greaterThanM20Price",
+    "growth_stock_count": "growthStockCount",
+    "total_stock_count": "totalStockCount",
+    "latest_price": "latestPrice",
+}
+
+DEFAULT_CAPACITY = 1024
+DEFAULT_STRING_CAPACITY = 64 * 1024
+# 读取方在写入持续进行时的最大重试次数
+MAX_READ_RETRIES = 10000
+
+
+def _file_size(capacity: int, string_capacity: int) -> int:
+    return HEADER_SIZE + capacity * ROW_SIZE + string_capacity
+
+
+def time_to_ms(update_time: str | None) -> int:
+    """将 "YYYY-MM-DD HH:MM:SS"(交易所时间) 转换为 epoch 毫秒, 缺失或格式错误时为 0."""
+    if not update_time:
+        return 0
+    try:
+        return int(datetime.fromisoformat(update_time).replace(tzinfo=EXCHANGE_TZ).timestamp() * 1000)
+    except ValueError:
+        return 0
+
+
+def ms_to_time(update_time_ms: int) -> str | None:
+    """Epoch 毫秒转换回 "YYYY-MM-DD HH:MM:SS"(交易所时间), 0 表示缺失."""
+    if not update_time_ms:
+        return None
+    return datetime.fromtimestamp(update_time_ms / 1000, EXCHANGE_TZ).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _numeric_values(row: FinalDataLine) -> tuple[Any, ...]:
+    """记录的数值槽位, 顺序与 ROW_FIELDS 前缀一致(update_time_ms ~ total_stock_count)."""
+    floats = tuple(math.nan if (value := getattr(row, name)) is None else float(value) for name in FLOAT_FIELDS)
+    counts = tuple(MISSING_INT if (value := getattr(row, name)) is None else int(value) for name in COUNT_FIELDS)
+    return (time_to_ms(row.update_time), *floats, *counts)
+
+
+def _bool_values(row: FinalDataLine) -> tuple[int, ...]:
+    return tuple(MISSING_INT if (value := getattr(row, name)) is None else int(bool(value)) for name in BOOL_FIELDS)
+
+
+class SharedStateWriter:
+    """共享状态文件的写入方.
+
+    同一个文件只能有一个写入方, 调用方需保证 publish 不会并发执行(由命名空间锁保证).
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        capacity: int = DEFAULT_CAPACITY,
+        string_capacity: int = DEFAULT_STRING_CAPACITY,
+    ) -> None:
+        """创建(覆盖)共享状态文件.
+
+        Args:
+            path: 文件路径
+            capacity: 初始行容量, 不足时自动翻倍
+            string_capacity: 初始字符串表字节数, 不足时自动翻倍
+        """
+        self.path = Path(path)
+        self.capacity = capacity
+        self.string_capacity = string_capacity
+        # etf_code -> (数值槽位, 布尔槽位, 名称, 信号), 插入顺序即行号, 扩容时按此重建文件
+        self._rows: dict[str, tuple[tuple[Any, ...], tuple[int, ...], str | None, str | None]] = {}
+        self._slots: dict[str, int] = {}
+        # 字符串 -> (偏移, 长度)
+        self._strings: dict[str, tuple[int, int]] = {}
+        self._strings_used = 0
+        self._seq = 0
+        self._mm: mmap.mmap | None = None
+        self._rebuild()
+
+    @property
+    def version(self) -> int:
+        """已发布的版本号(每次 publish 加一)."""
+        return self._seq // 2
+
+    def publish(self, rows: Iterable[FinalDataLine]) -> int:
+        """原地写入变化的记录(新代码分配新行), 返回写入的行数."""
+        pending = []
+        for row in rows:
+            if not row.etf_code:
+                continue
+            self._rows[row.etf_code] = (_numeric_values(row), _bool_values(row), row.etf_name, row.m5_signal)
+            pending.append(row.etf_code)
+        if not pending:
+            return 0
+
+        if self._needs_rebuild(pending):
+            self._rebuild()
+            return len(pending)
+
+        mm = self._mm
+        assert mm is not None  # noqa: S101
+        self._seq += 1
+        SEQ.pack_into(mm, SEQ_OFFSET, self._seq)
+        for code in pending:
+            slot = self._slots.setdefault(code, len(self._slots))
+            self._write_row(mm, slot, code)
+        COUNTS.pack_into(mm, COUNTS_OFFSET, self.capacity, len(self._slots), self.string_capacity, self._strings_used)
+        self._seq += 1
+        SEQ.pack_into(mm, SEQ_OFFSET, self._seq)
+        return len(pending)
+
+    def remove(self, codes: Iterable[str]) -> int:
+        """移除指定代码的行并重建文件(同时回收字符串表), 返回移除的行数."""
+        removed = 0
+        for code in codes:
+            if self._rows.pop(code, None) is not None:
+                removed += 1
+        if removed:
+            self._rebuild()
+        return removed
+
+    def close(self) -> None:
+        """关闭映射(文件保留, 读取方仍可读取最后的状态)."""
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def _needs_rebuild(self, pending: list[str]) -> bool:
+        """行容量或字符串表放不下本批次时需要扩容重建."""
+        if len(self._rows) > self.capacity:
+            return True
+        new_strings = set()
+        for code in pending:
+            _, _, name, signal = self._rows[code]
+            new_strings.update(text for text in (code, name, signal) if text and text not in self._strings)
+        extra = sum(len(text.encode("utf-8")) for text in new_strings)
+        return self._strings_used + extra > self.string_capacity
+
+    def _intern(self, mm: mmap.mmap, value: str | None) -> tuple[int, int]:
+        """写入字符串表并返回 (偏移, 长度), 空值为 (0, 0)."""
+        if not value:
+            return (0, 0)
+        ref = self._strings.get(value)
+        if ref is None:
+            encoded = value.encode("utf-8")
+            start = HEADER_SIZE + self.capacity * ROW_SIZE + self._strings_used
+            mm[start : start + len(encoded)] = encoded
+            ref = (self._strings_used, len(encoded))
+            self._strings[value] = ref
+            self._strings_used += len(encoded)
+        return ref
+
+    def _write_row(self, mm: mmap.mmap, slot: int, code: str) -> None:
+        numeric, bools, name, signal = self._rows[code]
+        code_ref = self._intern(mm, code)
+        name_ref = self._intern(mm, name)
+        signal_ref = self._intern(mm, signal)
+        ROW.pack_into(
+            mm,
+            HEADER_SIZE + slot * ROW_SIZE,
+            *numeric,
+            code_ref[0],
+            name_ref[0],
+            signal_ref[0],
+            code_ref[1],
+            name_ref[1],
+            signal_ref[1],
+            *bools,
+            FLAG_IN_USE,
+        )
+
+    def _rebuild(self) -> None:
+        """按所需容量生成新文件并原子替换旧文件, 旧文件(包括上次运行留下的)标记为 retired."""
+        while self.capacity < len(self._rows):
+            self.capacity *= 2
+        needed_strings = sum(
+            len(text.encode("utf-8"))
+            for text in {text for code, (_, _, name, signal) in self._rows.items() for text in (code, name, signal)}
+            if text
+        )
+        while self.string_capacity < needed_strings:
+            self.string_capacity *= 2
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with tmp_path.open("w+b") as f:
+            f.truncate(_file_size(self.capacity, self.string_capacity))
+            mm = mmap.mmap(f.fileno(), 0)
+
+        self._strings = {}
+        self._strings_used = 0
+        self._slots = {}
+        for code in self._rows:
+            slot = self._slots.setdefault(code, len(self._slots))
+            self._write_row(mm, slot, code)
+        self._seq += 2
+        HEADER.pack_into(
+            mm,
+            0,
+            MAGIC,
+            FORMAT_VERSION,
+            ROW_SIZE,
+            self._seq,
+            self.capacity,
+            len(self._slots),
+            self.string_capacity,
+            self._strings_used,
+            0,
+        )
+
+        previous = self._mm if self._mm is not None else _map_existing(self.path)
+        tmp_path.replace(self.path)
+        self._mm = mm
+        if previous is not None:
+            RETIRED.pack_into(previous, RETIRED_OFFSET, 1)
+            previous.close()
+        logger.info(
+            "共享状态文件已生成: %s (%d 行容量, %d 字节字符串表)",
+            self.path,
+            self.capacity,
+            self.string_capacity,
+        )
+
+
+def _map_existing(path: Path) -> mmap.mmap | None:
+    """映射已存在的共享状态文件(用于标记 retired), 不是有效文件时返回 None."""
+    try:
+        with path.open("r+b") as f:
+            mm = mmap.mmap(f.fileno(), 0)
+    except (OSError, ValueError):
+        return None
+    if len(mm) < HEADER_SIZE or mm[: len(MAGIC)] != MAGIC:
+        mm.close()
+        return None
+    return mm
+
+
+class SharedStateReader:
+    """共享状态文件的读取方, 可在任意进程中使用, 不需要 Flask 等服务端依赖.
+
+    Example:
+        reader = SharedStateReader("data_record.state")
+        rows = reader.rows()              # 与 /api/allDataList 相同结构的字典列表(不含各策略的分数和信号)
+        arrays = reader.arrays()          # 需要 NumPy: 字段名 -> 一维数组
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        """映射文件.
+
+        Raises:
+            FileNotFoundError: 文件不存在
+            ValueError: 不是共享状态文件或版本不兼容
+        """
+        self.path = Path(path)
+        self._mm: mmap.mmap | None = None
+        self._open()
+
+    def _open(self) -> None:
+        with self.path.open("rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, row_size = struct.unpack_from("<8sII", mm, 0)
+        if magic != MAGIC:
+            mm.close()
+            msg = f"不是共享状态文件: {self.path}"
+            raise ValueError(msg)
+        if version != FORMAT_VERSION or row_size != ROW_SIZE:
+            mm.close()
+            msg = f"不支持的共享状态文件版本: {version} (行大小 {row_size})"
+            raise ValueError(msg)
+        if self._mm is not None:
+            self._mm.close()
+        self._mm = mm
+
+    def close(self) -> None:
+        """关闭映射."""
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    @property
+    def version(self) -> int:
+        """当前版本号, 可用于轮询判断数据是否变化."""
+        self._check_retired()
+        return SEQ.unpack_from(self._mm, SEQ_OFFSET)[0] // 2  # type: ignore[arg-type]
+
+    def _check_retired(self) -> None:
+        if RETIRED.unpack_from(self._mm, RETIRED_OFFSET)[0]:  # type: ignore[arg-type]
+            self._open()
+
+    def _consistent(self, read: Any) -> Any:  # noqa: ANN401
+        """在 seqlock 保护下执行 read(mm, row_count, string_base), 直到读到一致的结果."""
+        for _ in range(MAX_READ_RETRIES):
+            self._check_retired()
+            mm = self._mm
+            seq_before = SEQ.unpack_from(mm, SEQ_OFFSET)[0]  # type: ignore[arg-type]
+            if seq_before % 2:
+                time.sleep(0)
+                continue
+            capacity, row_count, _, _ = COUNTS.unpack_from(mm, COUNTS_OFFSET)  # type: ignore[arg-type]
+            result = read(mm, row_count, HEADER_SIZE + capacity * ROW_SIZE)
+            if SEQ.unpack_from(mm, SEQ_OFFSET)[0] == seq_before:  # type: ignore[arg-type]
+                return result
+        msg = "共享状态文件持续写入中, 读取重试次数超限"
+        raise TimeoutError(msg)
+
+    def raw(self) -> tuple[int, bytes, bytes]:
+        """一致的原始快照: (行数, 行区字节, 字符串表字节), 复制后即可脱离 seqlock 解析."""
+
+        def read(mm: mmap.mmap, row_count: int, string_base: int) -> tuple[int, bytes, bytes]:
+            _, _, _, strings_used = COUNTS.unpack_from(mm, COUNTS_OFFSET)
+            return (
+                row_count,
+                mm[HEADER_SIZE : HEADER_SIZE + row_count * ROW_SIZE],
+                mm[string_base : string_base + strings_used],
+            )
+
+        return self._consistent(read)
+
+    def rows(self) -> list[dict[str, Any]]:
+        """全部记录, 字典结构与 /api/allDataList 的 data 字段一致."""
+        row_count, row_bytes, strings = self.raw()
+        return [_decode_row(values, strings) for values in ROW.iter_unpack(row_bytes[: row_count * ROW_SIZE])]
+
+    def get(self, etf_code: str) -> dict[str, Any] | None:
+        """按代码查询一条记录."""
+        return next((row for row in self.rows() if row[API_KEYS["etf_code"]] == etf_code), None)
+
+    def arrays(self, *, copy: bool = True) -> dict[str, Any]:
+        """以 NumPy 数组返回数值字段, 另含 etf_code / etf_name / m5_signal 三个对象数组.
+
+        Args:
+            copy: True 时在 seqlock 保护下复制, 得到一致的快照; False 时数值字段为直接映射文件的只读视图,
+                无任何复制, 但并发写入时可能读到混合状态, 调用方可对比读取前后的 version 自行判断
+
+        Raises:
+            ImportError: 未安装 NumPy
+        """
+        import numpy as np  # noqa: PLC0415
+
+        dtype = numpy_row_dtype()
+        if copy:
+            row_count, row_bytes, strings = self.raw()
+            table = np.frombuffer(row_bytes, dtype=dtype, count=row_count).copy()
+        else:
+            self._check_retired()
+            mm = self._mm
+            capacity, row_count, _, strings_used = COUNTS.unpack_from(mm, COUNTS_OFFSET)  # type: ignore[arg-type]
+            table = np.frombuffer(mm, dtype=dtype, count=row_count, offset=HEADER_SIZE)  # type: ignore[arg-type]
+            string_base = HEADER_SIZE + capacity * ROW_SIZE
+            strings = mm[string_base : string_base + strings_used]  # type: ignore[index]
+
+        result: dict[str, Any] = {
+            name: table[name] for name, _ in ROW_FIELDS if not name.endswith(("_offset", "_length")) and name != "flags"
+        }
+        for field_name, prefix in zip(STRING_FIELDS, ("code", "name", "signal"), strict=True):
+            offsets = table[f"{prefix}_offset"]
+            lengths = table[f"{prefix}_length"]
+            result[field_name] = np.array(
+                [
+                    strings[offset : offset + length].decode("utf-8") if length else None
+                    for offset, length in zip(offsets.tolist(), lengths.tolist(), strict=True)
+                ],
+                dtype=object,
+            )
+        return result
+
+
+def numpy_row_dtype() -> Any:  # noqa: ANN401
+    """与 ROW 布局一致的 NumPy 结构化 dtype.
+
+    Raises:
+        ImportError: 未安装 NumPy
+    """
+    import numpy as np  # noqa: PLC0415
+
+    offset = 0
+    names, formats, offsets = [], [], []
+    for name, code in ROW_FIELDS:
+        names.append(name)
+        formats.append("<" + code if code not in ("b", "B") else code)
+        offsets.append(offset)
+        offset += struct.calcsize("<" + code)
+    return np.dtype({"names": names, "formats": formats, "offsets": offsets, "itemsize": ROW_SIZE})
+
+
+def _decode_row(values: tuple[Any, ...], strings: bytes) -> dict[str, Any]:
+    fields = dict(zip((name for name, _ in ROW_FIELDS), values, strict=True))
+
+    def text(prefix: str) -> str | None:
+        offset, length = fields[f"{prefix}_offset"], fields[f"{prefix}_length"]
+        return strings[offset : offset + length].decode("utf-8") if length else None
+
+    row: dict[str, Any] = {
+        API_KEYS["update_time"]: ms_to_time(fields["update_time_ms"]),
+        API_KEYS["etf_code"]: text("code"),
+        API_KEYS["etf_name"]: text("name"),
+        API_KEYS["m5_signal"]: text("signal"),
+    }
+    for name in FLOAT_FIELDS:
+        value = fields[name]
+        row[API_KEYS[name]] = None if math.isnan(value) else value
+    # 总分数以浮点槽位保存, 整数分数还原为 int, 与 API 输出一致
+    total_score = row[API_KEYS["total_score"]]
+    if total_score is not None and total_score.is_integer():
+        row[API_KEYS["total_score"]] = int(total_score)
+    for name in COUNT_FIELDS:
+        value = fields[name]
+        row[API_KEYS[name]] = None if value == MISSING_INT else value
+    for name in BOOL_FIELDS:
+        value = fields[name]
+        row[API_KEYS[name]] = None if value == MISSING_INT else bool(value)
+    return row
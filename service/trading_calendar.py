@@ -0,0 +1,135 @@
+"""A股交易日历: 交易时段、周末与节假日休市判断."""
+
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import Path
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 交易所时区(中国不实行夏令时, 固定偏移即可, 无需依赖 tzdata)
+EXCHANGE_TZ = timezone(timedelta(hours=8), name="Asia/Shanghai")
+
+# 默认交易时段: 上午 09:30-11:30, 下午 13:00-15:00
+DEFAULT_SESSIONS: tuple[tuple[time, time], ...] = (
+    (time(9, 30), time(11, 30)),
+    (time(13, 0), time(15, 0)),
+)
+
+# 周六的 weekday() 值, 之后为周末
+SATURDAY = 5
+
+# 查找下一个交易日时最多向后查找的天数
+MAX_LOOKAHEAD_DAYS = 60
+
+
+@dataclass(frozen=True)
+class SessionStatus:
+    """某一时刻的交易时段状态."""
+
+    # 是否处于交易时段内(含前后缓冲)
+    is_open: bool
+    # 当前时段开始或下一个时段开始时间
+    next_open: datetime | None
+    # 当前时段结束时间, 休市时为下一个时段的结束时间
+    next_close: datetime | None
+
+    def to_dict(self) -> dict[str, object]:
+        """将状态转换为字典."""
+        return {
+            "open": self.is_open,
+            "nextOpen": self.next_open.isoformat() if self.next_open else None,
+            "nextClose": self.next_close.isoformat() if self.next_close else None,
+        }
+
+
+class TradingCalendar:
+    """交易日历.
+
+    节假日从本地 JSON 文件加载, 格式:
+        {"holidays": ["2025-01-01", ...], "sessions": [["09:30", "11:30"], ["13:00", "15:00"]]}
+    sessions 可省略, 省略时使用默认交易时段.
+    """
+
+    def __init__(
+        self,
+        holidays: frozenset[date] = frozenset(),
+        sessions: tuple[tuple[time, time], ...] = DEFAULT_SESSIONS,
+        grace: timedelta = timedelta(0),
+    ) -> None:
+        """初始化.
+
+        Args:
+            holidays: 休市的工作日
+            sessions: 每个交易日的交易时段
+            grace: 时段前后的缓冲时间, 覆盖开盘前和收盘后的日志延迟
+        """
+        self.holidays = holidays
+        self.sessions = sessions
+        self.grace = grace
+
+    @classmethod
+    def from_file(cls, path: str | Path, grace: timedelta = timedelta(0)) -> TradingCalendar:
+        """从日历文件加载, 文件不存在或格式错误时只按周末判断休市."""
+        calendar_path = Path(path)
+        if not calendar_path.exists():
+            logger.warning("交易日历文件不存在: %s, 仅按周末判断休市", calendar_path)
+            return cls(grace=grace)
+        try:
+            with calendar_path.open("r", encoding="utf-8") as f:
+                raw = json.load(f)
+            holidays = frozenset(date.fromisoformat(day) for day in raw.get("holidays", []))
+            sessions = tuple(
+                (time.fromisoformat(start), time.fromisoformat(end)) for start, end in raw.get("sessions", [])
+            )
+        except (ValueError, TypeError, OSError):
+            logger.exception("加载交易日历失败: %s, 仅按周末判断休市", calendar_path)
+            return cls(grace=grace)
+        logger.info("从 %s 加载了 %d 个休市日", calendar_path, len(holidays))
+        return cls(holidays, sessions or DEFAULT_SESSIONS, grace)
+
+    def is_trading_day(self, day: date) -> bool:
+        """是否为交易日."""
+        return day.weekday() < SATURDAY and day not in self.holidays
+
+    def previous_trading_day(self, day: date, count: int = 1) -> date:
+        """从 day 向前数第 count 个交易日, count 为 0 时返回 day 本身."""
+        for _ in range(count):
+            day -= timedelta(days=1)
+            for _ in range(MAX_LOOKAHEAD_DAYS):
+                if self.is_trading_day(day):
+                    break
+                day -= timedelta(days=1)
+        return day
+
+    def _day_sessions(self, day: date) -> list[tuple[datetime, datetime]]:
+        """某个交易日的各时段起止时间(已含缓冲)."""
+        return [
+            (
+                datetime.combine(day, start, EXCHANGE_TZ) - self.grace,
+                datetime.combine(day, end, EXCHANGE_TZ) + self.grace,
+            )
+            for start, end in self.sessions
+        ]
+
+    def status(self, now: datetime | None = None) -> SessionStatus:
+        """获取某一时刻的交易时段状态."""
+        now = (now or datetime.now(EXCHANGE_TZ)).astimezone(EXCHANGE_TZ)
+        day = now.date()
+        for _ in range(MAX_LOOKAHEAD_DAYS):
+            if self.is_trading_day(day):
+                for start, end in self._day_sessions(day):
+                    if start <= now < end:
+                        return SessionStatus(is_open=True, next_open=start, next_close=end)
+                    if now < start:
+                        return SessionStatus(is_open=False, next_open=start, next_close=end)
+            day += timedelta(days=1)
+        return SessionStatus(is_open=False, next_open=None, next_close=None)
+
+    def next_open(self, now: datetime | None = None) -> datetime | None:
+        """下一个交易时段的开始时间, 当前处于交易时段时返回当前时段的开始时间."""
+        return self.status(now).next_open